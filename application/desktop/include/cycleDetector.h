@@ -0,0 +1,41 @@
+#pragma once
+#include <cstddef>
+#include <cstdint>
+#include <memory>
+#include "executionState.h"
+
+/**
+ * @class CycleDetector
+ * @brief Instruction budget plus Brent's cycle detection over machine states.
+ *
+ * The executor calls step() after every instruction. A program whose state
+ * repeats can never terminate (execution is deterministic), so it is stopped
+ * as soon as the repetition is seen instead of after the whole budget.
+ * Per step the cost is one O(1) hash comparison; the saved state is copied
+ * only at power-of-two steps.
+ */
+class CycleDetector
+{
+ public:
+    /**
+     * @param _maxSteps Instruction budget (0 means unlimited)
+     */
+    explicit CycleDetector(size_t _maxSteps);
+    /**
+     * @brief Registers the state reached after one instruction.
+     * @throws std::runtime_error If the budget is exhausted or the state repeats
+     */
+    void step(const ExecutionState& state);
+    void reset();
+    size_t getSteps() const;
+    bool isCycleDetected() const;
+    size_t getCycleLength() const;
+ private:
+    size_t maxSteps;
+    size_t steps;
+    size_t power;
+    size_t lambda;
+    size_t cycleLength;
+    uint64_t tortoiseHash;
+    std::unique_ptr<ExecutionState> tortoise;
+};
@@ -0,0 +1,50 @@
+#pragma once
+#include <cstddef>
+#include <cstdint>
+#include <string>
+#include <unordered_map>
+#include <vector>
+#include "cellCord.h"
+
+/**
+ * @class ExecutionState
+ * @brief Machine state of a running robot program: robot position, grid fill,
+ * variable values and program counter.
+ *
+ * Grid and variable parts of the hash are updated incrementally on every change
+ * (XOR of per-entry hashes), so hash() is O(1) and does not walk the grid.
+ */
+class ExecutionState
+{
+ public:
+    CellCoord position;     ///< Current robot cell
+    size_t programCounter;  ///< Index of the next instruction
+    /**
+     * @brief Constructs an empty (unfilled) state for a cols x rows grid.
+     * @throws std::invalid_argument If cols or rows is not positive
+     */
+    ExecutionState(int _cols, int _rows);
+    /**
+     * @brief Fills a cell with a color (0 means empty) and updates the grid hash.
+     * @throws std::out_of_range If the cell is outside the grid
+     */
+    void fill(int x, int y, int color);
+    int getColor(int x, int y) const;
+    /**
+     * @brief Sets a variable value and updates the variables hash.
+     */
+    void setVariable(const std::string& name, int value);
+    uint64_t hash() const;
+    bool operator==(const ExecutionState& other) const;
+ private:
+    int cols;
+    int rows;
+    std::vector<int> grid;
+    std::unordered_map<std::string, int> variables;
+    uint64_t gridHash;
+    uint64_t variablesHash;
+    size_t index(int x, int y) const;
+    static uint64_t mix(uint64_t value);
+    static uint64_t cellHash(size_t cell, int color);
+    static uint64_t variableHash(const std::string& name, int value);
+};
@@ -5,6 +5,7 @@
 #include "token.h"
 #include "tokenType.h"
 #include "baseStatement.h"
+#include "programOptimizer.h"
 
 class Parser {
  private:
@@ -14,6 +15,7 @@ class Parser {
     explicit Parser(std::string source);
     static Parser* instance;
     std::vector<BaseStatement*> enabledStatements;
+    size_t foldedTokens;
  public:
     static Parser* getInstance(std::string source);
     bool checkToken(int kind);
@@ -23,4 +25,8 @@ class Parser {
     void program();
     void statement();
     void nl();
+    /**
+     * @brief Number of tokens removed by ProgramOptimizer::optimize() so far.
+     */
+    size_t getFoldedTokens() const;
 };
@@ -0,0 +1,55 @@
+#pragma once
+#include <cstddef>
+#include <vector>
+#include "token.h"
+#include "tokenType.h"
+
+/**
+ * @class ProgramOptimizer
+ * @brief Constant folding applied to statements before they are executed.
+ *
+ * The parser passes every statement through optimize() before dispatching it,
+ * so assignments evaluate "x = 2 + 3 * 4" as "x = 14". Folding keeps observable
+ * results identical: expressions that would overflow the language's int or
+ * divide by zero are left untouched, so runtime errors still fire, and every
+ * emitted literal fits in int (INT_MIN is never emitted because its magnitude
+ * is not a valid literal).
+ */
+class ProgramOptimizer
+{
+ public:
+    /**
+     * @brief Folds the expression of an assignment statement in place.
+     * @param statement Statement tokens (a trailing NEWLINE is kept)
+     * @return Number of tokens removed from the statement (0 if nothing was folded)
+     */
+    static size_t optimize(std::vector<Token>& statement);
+    /**
+     * @brief Folds constant parts of an expression.
+     *
+     * Evaluation is left to right, so only the leading constant factors of each
+     * term and the leading constant terms of the sum are folded
+     * ("2 + 3 * 4 - a" becomes "14 - a", "a + 2 + 3" is kept as is).
+     * @param expression Expression tokens without the trailing NEWLINE
+     * @return Equivalent expression tokens
+     * @throws std::invalid_argument If the tokens are not an expression
+     */
+    static std::vector<Token> foldConstants(const std::vector<Token>& expression);
+ private:
+    struct Factor
+    {
+        bool negative;
+        Token primary;
+    };
+    struct Term
+    {
+        bool subtract;
+        std::vector<Factor> factors;
+        std::vector<int> operators;
+    };
+    static std::vector<Term> parseExpression(const std::vector<Token>& tokens, size_t begin, size_t end);
+    static bool foldTerm(Term& term, long long* value);
+    static bool fitsInt(long long value);
+    static bool fitsLiteral(long long value);
+    static Token numberToken(long long value);
+};
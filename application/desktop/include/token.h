@@ -1,6 +1,6 @@
 #pragma once
 #include <string>
-#include "tokentype.h"
+#include "tokenType.h"
 
 class Token
 {
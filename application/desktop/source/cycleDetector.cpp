@@ -0,0 +1,63 @@
+#include <stdexcept>
+#include <string>
+#include "cycleDetector.h"
+
+CycleDetector::CycleDetector(size_t _maxSteps) :
+	maxSteps(_maxSteps), steps(0), power(1), lambda(0), cycleLength(0), tortoiseHash(0)
+{
+}
+
+void CycleDetector::step(const ExecutionState& state)
+{
+	steps++;
+	if (maxSteps != 0 && steps > maxSteps)
+	{
+		throw std::runtime_error("Instruction budget of " + std::to_string(maxSteps) + " steps exceeded");
+	}
+	uint64_t stateHash = state.hash();
+	if (!tortoise)
+	{
+		tortoise.reset(new ExecutionState(state));
+		tortoiseHash = stateHash;
+		return;
+	}
+	lambda++;
+	if (stateHash == tortoiseHash && state == *tortoise)
+	{
+		cycleLength = lambda;
+		throw std::runtime_error("Program never terminates: state repeats every " +
+			std::to_string(cycleLength) + " steps");
+	}
+	if (lambda == power)
+	{
+		*tortoise = state;
+		tortoiseHash = stateHash;
+		power *= 2;
+		lambda = 0;
+	}
+}
+
+void CycleDetector::reset()
+{
+	steps = 0;
+	power = 1;
+	lambda = 0;
+	cycleLength = 0;
+	tortoiseHash = 0;
+	tortoise.reset();
+}
+
+size_t CycleDetector::getSteps() const
+{
+	return steps;
+}
+
+bool CycleDetector::isCycleDetected() const
+{
+	return cycleLength != 0;
+}
+
+size_t CycleDetector::getCycleLength() const
+{
+	return cycleLength;
+}
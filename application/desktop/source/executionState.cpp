@@ -0,0 +1,100 @@
+#include <functional>
+#include <stdexcept>
+#include "executionState.h"
+
+ExecutionState::ExecutionState(int _cols, int _rows) :
+	programCounter(0), cols(_cols), rows(_rows), gridHash(0), variablesHash(0)
+{
+	if (cols <= 0 || rows <= 0)
+	{
+		throw std::invalid_argument("Grid size must be positive");
+	}
+	grid.assign(static_cast<size_t>(cols) * rows, 0);
+}
+
+void ExecutionState::fill(int x, int y, int color)
+{
+	size_t cell = index(x, y);
+	if (grid[cell] == color)
+	{
+		return;
+	}
+	if (grid[cell] != 0)
+	{
+		gridHash ^= cellHash(cell, grid[cell]);
+	}
+	if (color != 0)
+	{
+		gridHash ^= cellHash(cell, color);
+	}
+	grid[cell] = color;
+}
+
+int ExecutionState::getColor(int x, int y) const
+{
+	return grid[index(x, y)];
+}
+
+void ExecutionState::setVariable(const std::string& name, int value)
+{
+	auto pos = variables.find(name);
+	if (pos != variables.end())
+	{
+		if (pos->second == value)
+		{
+			return;
+		}
+		variablesHash ^= variableHash(name, pos->second);
+		pos->second = value;
+	}
+	else
+	{
+		variables[name] = value;
+	}
+	variablesHash ^= variableHash(name, value);
+}
+
+uint64_t ExecutionState::hash() const
+{
+	uint64_t result = mix(static_cast<uint64_t>(static_cast<uint32_t>(position.x)) << 32 |
+		static_cast<uint32_t>(position.y));
+	result = mix(result ^ programCounter);
+	return result ^ gridHash ^ mix(variablesHash + 0x9e3779b97f4a7c15ULL);
+}
+
+bool ExecutionState::operator==(const ExecutionState& other) const
+{
+	return position == other.position && programCounter == other.programCounter &&
+		gridHash == other.gridHash && variablesHash == other.variablesHash &&
+		grid == other.grid && variables == other.variables;
+}
+
+size_t ExecutionState::index(int x, int y) const
+{
+	if (x < 0 || y < 0 || x >= cols || y >= rows)
+	{
+		throw std::out_of_range("Cell is outside the grid");
+	}
+	return static_cast<size_t>(y) * cols + x;
+}
+
+uint64_t ExecutionState::mix(uint64_t value)
+{
+	// splitmix64 finalizer
+	value ^= value >> 30;
+	value *= 0xbf58476d1ce4e5b9ULL;
+	value ^= value >> 27;
+	value *= 0x94d049bb133111ebULL;
+	value ^= value >> 31;
+	return value;
+}
+
+uint64_t ExecutionState::cellHash(size_t cell, int color)
+{
+	return mix(static_cast<uint64_t>(cell) << 32 | static_cast<uint32_t>(color));
+}
+
+uint64_t ExecutionState::variableHash(const std::string& name, int value)
+{
+	return mix(std::hash<std::string>()(name) ^ mix(static_cast<uint32_t>(value)));
+}
@@ -19,6 +19,7 @@ Parser::Parser(std::string _source)
         new Assignment,
     }; //  
     lexer = Lexer::getInstance(_source);
+    foldedTokens = 0;
     curToken;
     peekToken;
     nextToken();
@@ -70,11 +71,13 @@ void Parser::statement()
 {
     //    
     std::vector<Token> new_statement;
-    while (peekToken.getType() != static_cast<int>(TokenType::NEWLINE))
+    while (!checkToken(static_cast<int>(TokenType::NEWLINE)) && !checkToken(static_cast<int>(TokenType::ENDOFFILE)))
     {
         new_statement.push_back(curToken);
         nextToken();
     }
+    new_statement.push_back(curToken); // NEWLINE is matched by nl()
+    foldedTokens += ProgramOptimizer::optimize(new_statement);
     for (auto& statement : enabledStatements)
     {
         if (statement->match(new_statement))
@@ -95,3 +98,8 @@ void Parser::nl()
         nextToken();
     }
 }
+
+size_t Parser::getFoldedTokens() const
+{
+    return foldedTokens;
+}
@@ -0,0 +1,226 @@
+#include <climits>
+#include <stdexcept>
+#include <string>
+#include "programOptimizer.h"
+
+namespace
+{
+	bool isType(const Token& token, TokenType type)
+	{
+		return token.getType() == static_cast<int>(type);
+	}
+}
+
+size_t ProgramOptimizer::optimize(std::vector<Token>& statement)
+{
+	// assignment ::= IDENTIFIER "=" expression NEWLINE
+	if (statement.size() < 3 || !isType(statement[0], TokenType::IDENTIFIER) || !isType(statement[1], TokenType::EQ))
+	{
+		return 0;
+	}
+	size_t end = statement.size();
+	if (isType(statement[end - 1], TokenType::NEWLINE))
+	{
+		end--;
+	}
+	std::vector<Token> folded;
+	try
+	{
+		folded = foldConstants(std::vector<Token>(statement.begin() + 2, statement.begin() + end));
+	}
+	catch (const std::invalid_argument&)
+	{
+		return 0; // Reported by the statement matcher
+	}
+	size_t removed = end - 2 - folded.size();
+	statement.erase(statement.begin() + 2, statement.begin() + end);
+	statement.insert(statement.begin() + 2, folded.begin(), folded.end());
+	return removed;
+}
+
+std::vector<Token> ProgramOptimizer::foldConstants(const std::vector<Token>& expression)
+{
+	std::vector<Term> terms = parseExpression(expression, 0, expression.size());
+	std::vector<Token> result;
+	size_t first = 0;
+	long long sum = 0;
+	while (first < terms.size())
+	{
+		long long value = 0;
+		Term folded = terms[first];
+		if (!foldTerm(folded, &value) || !folded.factors.empty())
+		{
+			break;
+		}
+		long long next = terms[first].subtract ? sum - value : sum + value;
+		if (!fitsLiteral(next))
+		{
+			break;
+		}
+		sum = next;
+		first++;
+	}
+	if (first > 1 || (first == 1 && expression.size() > 1))
+	{
+		if (sum < 0)
+		{
+			result.push_back(Token("-", static_cast<int>(TokenType::MINUS)));
+		}
+		result.push_back(numberToken(sum < 0 ? -sum : sum));
+	}
+	else
+	{
+		first = 0;
+	}
+	for (size_t i = first; i < terms.size(); i++)
+	{
+		Term term = terms[i];
+		long long value = 0;
+		bool folded = foldTerm(term, &value);
+		if (i > 0 || term.subtract)
+		{
+			result.push_back(term.subtract ? Token("-", static_cast<int>(TokenType::MINUS)) :
+				Token("+", static_cast<int>(TokenType::PLUS)));
+		}
+		size_t factor = 0;
+		if (folded)
+		{
+			if (value < 0)
+			{
+				result.push_back(Token("-", static_cast<int>(TokenType::MINUS)));
+			}
+			result.push_back(numberToken(value < 0 ? -value : value));
+		}
+		for (; factor < term.factors.size(); factor++)
+		{
+			if (folded || factor > 0)
+			{
+				result.push_back(Token(term.operators[factor] == static_cast<int>(TokenType::SLASH) ? "/" : "*",
+					term.operators[factor]));
+			}
+			if (term.factors[factor].negative)
+			{
+				result.push_back(Token("-", static_cast<int>(TokenType::MINUS)));
+			}
+			result.push_back(term.factors[factor].primary);
+		}
+	}
+	return result;
+}
+
+std::vector<ProgramOptimizer::Term> ProgramOptimizer::parseExpression(
+	const std::vector<Token>& tokens, size_t begin, size_t end)
+{
+	std::vector<Term> terms;
+	size_t i = begin;
+	bool subtract = false;
+	while (true)
+	{
+		Term term;
+		term.subtract = subtract;
+		int op = static_cast<int>(TokenType::ASTERISK);
+		while (true)
+		{
+			Factor factor;
+			factor.negative = false;
+			while (i < end && (isType(tokens[i], TokenType::PLUS) || isType(tokens[i], TokenType::MINUS)))
+			{
+				factor.negative ^= isType(tokens[i], TokenType::MINUS);
+				i++;
+			}
+			if (i >= end || !(isType(tokens[i], TokenType::NUMBER) || isType(tokens[i], TokenType::IDENTIFIER)))
+			{
+				throw std::invalid_argument("Expected NUMBER or IDENTIFIER in expression");
+			}
+			factor.primary = tokens[i++];
+			term.factors.push_back(factor);
+			term.operators.push_back(op);
+			if (i < end && (isType(tokens[i], TokenType::ASTERISK) || isType(tokens[i], TokenType::SLASH)))
+			{
+				op = tokens[i++].getType();
+				continue;
+			}
+			break;
+		}
+		terms.push_back(term);
+		if (i < end && (isType(tokens[i], TokenType::PLUS) || isType(tokens[i], TokenType::MINUS)))
+		{
+			subtract = isType(tokens[i], TokenType::MINUS);
+			i++;
+			continue;
+		}
+		break;
+	}
+	if (i != end)
+	{
+		throw std::invalid_argument("Unexpected token in expression");
+	}
+	return terms;
+}
+
+bool ProgramOptimizer::foldTerm(Term& term, long long* value)
+{
+	// Folds the leading constant factors; returns false if the first factor is not constant
+	size_t count = 0;
+	long long result = 0;
+	for (; count < term.factors.size(); count++)
+	{
+		const Factor& factor = term.factors[count];
+		if (!isType(factor.primary, TokenType::NUMBER))
+		{
+			break;
+		}
+		long long number = std::stoll(factor.primary.getSource());
+		if (!fitsInt(number))
+		{
+			break;
+		}
+		number = factor.negative ? -number : number;
+		long long next;
+		if (count == 0)
+		{
+			next = number;
+		}
+		else if (term.operators[count] == static_cast<int>(TokenType::SLASH))
+		{
+			if (number == 0)
+			{
+				break;
+			}
+			next = result / number;
+		}
+		else
+		{
+			next = result * number;
+		}
+		if (!fitsLiteral(next))
+		{
+			break;
+		}
+		result = next;
+	}
+	if (count == 0 || (count == 1 && term.factors.size() > 1))
+	{
+		return false;
+	}
+	term.factors.erase(term.factors.begin(), term.factors.begin() + count);
+	term.operators.erase(term.operators.begin(), term.operators.begin() + count);
+	*value = result;
+	return true;
+}
+
+bool ProgramOptimizer::fitsInt(long long value)
+{
+	return value >= INT_MIN && value <= INT_MAX;
+}
+
+bool ProgramOptimizer::fitsLiteral(long long value)
+{
+	// A negative result is emitted as MINUS followed by its magnitude, which must itself be an int
+	return value > INT_MIN && value <= INT_MAX;
+}
+
+Token ProgramOptimizer::numberToken(long long value)
+{
+	return Token(std::to_string(value), static_cast<int>(TokenType::NUMBER));
+}
@@ -0,0 +1,79 @@
+#include <climits>
+#include <string>
+#include <vector>
+#include <gtest/gtest.h>
+#include "programOptimizer.h"
+
+namespace
+{
+    Token token(const std::string& source, TokenType type)
+    {
+        return Token(source, static_cast<int>(type));
+    }
+
+    Token number(const std::string& source)
+    {
+        return token(source, TokenType::NUMBER);
+    }
+
+    Token identifier(const std::string& source)
+    {
+        return token(source, TokenType::IDENTIFIER);
+    }
+
+    // Tokens of "<name> = <expression>\n" as Parser::statement() collects them
+    std::vector<Token> assignment(const std::string& name, const std::vector<Token>& expression)
+    {
+        std::vector<Token> statement = {identifier(name), token("=", TokenType::EQ)};
+        statement.insert(statement.end(), expression.begin(), expression.end());
+        statement.push_back(token("\n", TokenType::NEWLINE));
+        return statement;
+    }
+
+    std::string render(const std::vector<Token>& tokens)
+    {
+        std::string result;
+        for (const auto& item : tokens)
+        {
+            result += item.getType() == static_cast<int>(TokenType::NEWLINE) ? "\\n" : item.getSource();
+        }
+        return result;
+    }
+}
+
+TEST(ProgramOptimizerTest, FoldsWholeStatement)
+{
+    std::vector<Token> statement = assignment("x", {
+        number("2"), token("+", TokenType::PLUS), number("3"), token("*", TokenType::ASTERISK), number("4")});
+    EXPECT_EQ(ProgramOptimizer::optimize(statement), 4u);
+    EXPECT_EQ(render(statement), "x=14\\n");
+}
+
+TEST(ProgramOptimizerTest, FoldsConstantPrefixOnly)
+{
+    std::vector<Token> statement = assignment("x", {
+        number("2"), token("*", TokenType::ASTERISK), number("3"), token("-", TokenType::MINUS), identifier("a"),
+        token("+", TokenType::PLUS), number("1")});
+    EXPECT_EQ(ProgramOptimizer::optimize(statement), 2u);
+    EXPECT_EQ(render(statement), "x=6-a+1\\n");
+}
+
+TEST(ProgramOptimizerTest, KeepsDivisionByZeroAndOverflow)
+{
+    std::vector<Token> division = assignment("x", {
+        number("1"), token("/", TokenType::SLASH), number("0")});
+    EXPECT_EQ(ProgramOptimizer::optimize(division), 0u);
+    EXPECT_EQ(render(division), "x=1/0\\n");
+
+    std::vector<Token> overflow = assignment("x", {
+        number(std::to_string(INT_MAX)), token("+", TokenType::PLUS), number("1")});
+    EXPECT_EQ(ProgramOptimizer::optimize(overflow), 0u);
+    EXPECT_EQ(render(overflow), "x=" + std::to_string(INT_MAX) + "+1\\n");
+}
+
+TEST(ProgramOptimizerTest, IgnoresOtherStatements)
+{
+    std::vector<Token> statement = {token("LET", TokenType::LET), identifier("x"), token("\n", TokenType::NEWLINE)};
+    EXPECT_EQ(ProgramOptimizer::optimize(statement), 0u);
+    EXPECT_EQ(render(statement), "LETx\\n");
+}
@@ -48,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main_app.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,6 +87,23 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/ref/settings/#caches
+# Без REDIS_URL кэш локален для процесса: буфер реакций отключается,
+# лимиты запросов считаются отдельно в каждом воркере.
+
+REDIS_URL = os.getenv('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -150,3 +168,69 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880
 
 DOCS_DIR = os.path.join(BASE_DIR, 'docs/build')
+
+LEADERBOARD_SIZE = 10
+
+REPLAY_CHECKPOINT_INTERVAL = 256
+REPLAY_MAX_STEPS_PER_REQUEST = 500
+
+DIAGNOSTICS_CACHE_TIMEOUT = 3600
+DIAGNOSTICS_MAX_PROGRAM_SIZE = 100000
+
+REACTION_FLUSH_INTERVAL = 5
+REACTION_FLUSH_BATCH = 200
+REACTION_STATE_MAX_IDS = 100
+REACTION_BUFFER_BACKENDS = ['django.core.cache.backends.redis.RedisCache']
+
+COMMENT_MAX_DEPTH = 4
+COMMENT_THREADS_PER_PAGE = 20
+
+SSE_KEEPALIVE_INTERVAL = 15
+SSE_RETRY_MS = 5000
+SSE_QUEUE_SIZE = 100
+
+AUTO_MODERATION_RULES = {
+    'comment': {'reporters': 3, 'window': 3600},
+    'field': {'reporters': 5, 'window': 86400},
+}
+
+SPAM_MIN_TOKENS = 5
+SPAM_SIMHASH_MAX_DISTANCE = 3
+SPAM_DUPLICATE_WINDOW = 604800
+
+RATE_LIMITS = {
+    'main_app.views.add_comment': {'limit': 10, 'window': 60},
+    'main_app.views.add_profile_comment': {'limit': 10, 'window': 60},
+    'main_app.views.add_wall': {'limit': 120, 'window': 60},
+    'main_app.views.remove_wall': {'limit': 120, 'window': 60},
+    'main_app.views.toggle_like': {'limit': 60, 'window': 60},
+    'main_app.views.toggle_favorite': {'limit': 60, 'window': 60},
+    'main_app.views.toggle_comment_like': {'limit': 60, 'window': 60},
+    'main_app.views.report_comment': {'limit': 10, 'window': 60},
+    'main_app.views.search_fields': {'limit': 60, 'window': 60},
+}
+
+PROFILE_FIELDS_PAGE_SIZE = 20
+PROFILE_FIELDS_DESCRIPTION_LENGTH = 200
+PROFILE_FIELDS_CACHE_TIMEOUT = 300
+
+PROFILE_COMMENTS_PER_PAGE = 20
+
+AVATAR_THUMBNAIL_QUALITY = 85
+AVATAR_CACHE_MAX_AGE = 31536000
+
+TIMELINE_PAGE_SIZE = 20
+TIMELINE_EXCERPT_LENGTH = 100
+
+REPORT_QUEUE_HALF_LIFE = 86400
+MODERATION_QUEUE_PAGE_SIZE = 25
+
+BAN_CASCADE_CHUNK_SIZE = 500
+BAN_CASCADE_LEASE = 60
+BAN_CASCADE_BACKGROUND = True
+
+MODERATION_BULK_MAX_ITEMS = 500
+
+MODERATION_LOG_PAGE_SIZE = 50
+
+USER_STATS_RECONCILE_INTERVAL = 86400
@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 import main_app.views as views
+from main_app.avatars import THUMBNAIL_DIR
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.admin.views.decorators import staff_member_required
@@ -44,6 +45,12 @@ urlpatterns = [
     path('api/comment/<int:pk>/toggle-like/', views.toggle_comment_like, name='toggle_comment_like'),
     path('api/comment/<int:pk>/report/', views.report_comment, name='report_comment'),
     path('api/field/<int:pk>/state/', views.get_field_state, name='field_state'),
+    path('api/field/<int:pk>/leaderboard/', views.field_leaderboard, name='field_leaderboard'),
+    path('api/field/<int:pk>/comments/', views.field_comments, name='field_comments'),
+    path('api/field/<int:pk>/events/', views.field_events, name='field_events'),
+    path('api/reactions/', views.reaction_states, name='reaction_states'),
+    path('api/submissions/<int:pk>/replay/', views.submission_replay, name='submission_replay'),
+    path('api/diagnostics/', views.program_diagnostics, name='program_diagnostics'),
     path('api/walls/add/', views.add_wall, name='add_wall'),
     path('api/walls/<int:pk>/remove/', views.remove_wall, name='remove_wall'),
     path('api/search/', views.search_fields, name='search_fields'),
@@ -54,14 +61,24 @@ urlpatterns = [
     path('profile/', views.ProfileView.as_view(), name='profile'),
     path('profile/<str:username>/', views.ProfileView.as_view(), name='profile_view'),
     path('profile/<str:username>/comment/', views.add_profile_comment, name='add_profile_comment'),
+    path('api/profile/<str:username>/comments/', views.profile_comments, name='profile_comments'),
     path('profile/comment/<int:comment_id>/delete/', views.delete_profile_comment, name='delete_profile_comment'),
     path('fields/create/', views.FieldCreateView.as_view(), name='create_field'),
     path('files/download/<int:pk>/', views.download_file, name='download_file'),
     path('moderation/', views.ModerationPanelView.as_view(), name='moderation_panel'),
     path('moderation/field/<int:report_id>/', views.ResolveFieldReportView.as_view(), name='resolve_field_report'),
     path('moderation/comment/<int:report_id>/', views.ResolveCommentReportView.as_view(), name='resolve_comment_report'),
+    path('moderation/queue/<int:entry_id>/', views.ResolveReportQueueEntryView.as_view(),
+         name='resolve_report_queue_entry'),
+    path('moderation/bulk/', views.BulkModerationView.as_view(), name='bulk_moderation'),
+    path('moderation/log/', views.ModerationLogView.as_view(), name='moderation_log'),
     path('moderation/unblock/<str:content_type>/<int:content_id>/', views.UnblockContentView.as_view(), name='unblock_content'),
+    path('moderation/auto/<int:action_id>/', views.ReviewModerationActionView.as_view(),
+         name='review_moderation_action'),
     path('api/profile/fields/', views.ProfileFieldsAPIView.as_view(), name='profile_fields_api'),
+    path('api/activity/', views.activity_timeline, name='activity_timeline'),
+    path(f"{settings.MEDIA_URL.lstrip('/')}{THUMBNAIL_DIR}/<path:path>", views.avatar_thumbnail,
+         name='avatar_thumbnail'),
     path('docs/', RedirectView.as_view(url='/static/index.html')),
     path('moderation/block/<str:content_type>/<int:content_id>/', 
          staff_member_required(views.BlockContentView.as_view()), 
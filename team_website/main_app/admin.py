@@ -13,8 +13,9 @@ from django.contrib import admin
 from django.contrib import messages
 from django.shortcuts import render, redirect
 from django.urls import path
+from django.db import transaction
 from django.http import HttpResponse
-from main_app.models import FieldReport, Field
+from main_app.models import FieldReport, Field, ModerationLogEntry, ReportQueueEntry
 
 @admin.register(Field)
 class FieldAdmin(admin.ModelAdmin):
@@ -27,13 +28,10 @@ class FieldAdmin(admin.ModelAdmin):
     :type list_filter: tuple[str, ...]
     :attribute search_fields: Поля для поиска.
     :type search_fields: tuple[str, ...]
-    :attribute filter_horizontal: Поля с горизонтальным выбором для ManyToMany.
-    :type filter_horizontal: tuple[str, ...]
     """
     list_display: tuple[str, ...] = ('title', 'user', 'created_at')
     list_filter: tuple[str, ...] = ('created_at', 'user')
     search_fields: tuple[str, ...] = ('title', 'description')
-    filter_horizontal: tuple[str, ...] = ('likes', 'favorites')
 
 class FieldReportAdmin(admin.ModelAdmin):
     """
@@ -122,15 +120,21 @@ class FieldReportAdmin(admin.ModelAdmin):
             action = request.GET.get('action')
         try:
             report: FieldReport = FieldReport.objects.get(id=report_id)
-            if action == 'approve':
-                report.status = 'approved'
-                report.is_resolved = True
-                messages.success(request, f'Жалоба #{report_id} одобрена')
-            elif action == 'reject':
-                report.status = 'rejected'
-                report.is_resolved = True
-                messages.success(request, f'Жалоба #{report_id} отклонена')
-            report.save()
+            with transaction.atomic():
+                if action == 'approve':
+                    report.status = 'approved'
+                    report.is_resolved = True
+                    ModerationLogEntry.record(request.user, ModerationLogEntry.REPORT_APPROVED,
+                                              [('field', report.field_id)], note=f'жалоба #{report_id}')
+                    messages.success(request, f'Жалоба #{report_id} одобрена')
+                elif action == 'reject':
+                    report.status = 'rejected'
+                    report.is_resolved = True
+                    ModerationLogEntry.record(request.user, ModerationLogEntry.REPORT_REJECTED,
+                                              [('field', report.field_id)], note=f'жалоба #{report_id}')
+                    messages.success(request, f'Жалоба #{report_id} отклонена')
+                report.save()
+                ReportQueueEntry.settle_fields([report.field_id])
         except FieldReport.DoesNotExist:
             messages.error(request, f'Жалоба #{report_id} не найдена')
         return redirect('moderation:fieldreport_moderation_panel')
@@ -144,7 +148,12 @@ class FieldReportAdmin(admin.ModelAdmin):
         :param queryset: Набор выбранных жалоб.
         :type queryset: :class:`django.db.models.QuerySet`[:class:`main_app.models.FieldReport`]
         """
-        updated: int = queryset.update(status='approved', is_resolved=True)
+        field_ids: List[int] = list(queryset.values_list('field_id', flat=True).distinct())
+        with transaction.atomic():
+            updated: int = queryset.update(status='approved', is_resolved=True)
+            ModerationLogEntry.record(request.user, ModerationLogEntry.REPORT_APPROVED,
+                                      [('field', field_id) for field_id in field_ids], note='админ-панель')
+            ReportQueueEntry.settle_fields(field_ids)
         self.message_user(request, f'{updated} жалоб одобрено', messages.SUCCESS)
 
     approve_selected_reports.short_description = "Одобрить выбранные жалобы"
@@ -158,7 +167,12 @@ class FieldReportAdmin(admin.ModelAdmin):
         :param queryset: Набор выбранных жалоб.
         :type queryset: :class:`django.db.models.QuerySet`[:class:`main_app.models.FieldReport`]
         """
-        updated: int = queryset.update(status='rejected', is_resolved=True)
+        field_ids: List[int] = list(queryset.values_list('field_id', flat=True).distinct())
+        with transaction.atomic():
+            updated: int = queryset.update(status='rejected', is_resolved=True)
+            ModerationLogEntry.record(request.user, ModerationLogEntry.REPORT_REJECTED,
+                                      [('field', field_id) for field_id in field_ids], note='админ-панель')
+            ReportQueueEntry.settle_fields(field_ids)
         self.message_user(request, f'{updated} жалоб отклонено', messages.SUCCESS)
 
     reject_selected_reports.short_description = "Отклонить выбранные жалобы"
@@ -0,0 +1,129 @@
+"""
+Уменьшенные копии аватаров пользователей.
+
+Для каждого загруженного аватара один раз создаются квадратные копии размеров
+``SIZES`` в форматах WebP и JPEG. Имена копий строятся из хеша содержимого
+исходного файла, поэтому новый аватар всегда получает новые адреса, а старые
+адреса можно кэшировать в браузере без срока (см. :func:`main_app.views.avatar_thumbnail`).
+Одинаковые файлы разных пользователей дают одни и те же копии.
+
+:mod:`main_app.avatars`
+"""
+
+import hashlib
+from io import BytesIO
+from typing import Dict, Iterator, Tuple
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+from PIL import Image, ImageOps
+
+SIZES: Tuple[int, ...] = (32, 64, 128)
+FORMATS: Dict[str, str] = {'webp': 'WEBP', 'jpg': 'JPEG'}
+THUMBNAIL_DIR: str = 'avatars/thumbs'
+HASH_LENGTH: int = 16
+
+
+def content_hash(avatar: FieldFile) -> str:
+    """
+    Вычисляет хеш содержимого файла аватара.
+
+    :param avatar: Файл аватара.
+    :type avatar: :class:`django.db.models.fields.files.FieldFile`
+    :returns: Первые ``HASH_LENGTH`` символов SHA-256 в шестнадцатеричном виде.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    avatar.open('rb')
+    try:
+        for chunk in avatar.chunks():
+            digest.update(chunk)
+    finally:
+        avatar.close()
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def variant_name(digest: str, size: int, extension: str) -> str:
+    """
+    Возвращает имя копии в хранилище.
+
+    :param digest: Хеш исходного файла.
+    :type digest: str
+    :param size: Сторона копии в пикселях.
+    :type size: int
+    :param extension: Расширение формата (``webp`` или ``jpg``).
+    :type extension: str
+    :returns: Путь копии относительно ``MEDIA_ROOT``.
+    :rtype: str
+    """
+    return f'{THUMBNAIL_DIR}/{digest}-{size}.{extension}'
+
+
+def _variants(digest: str) -> Iterator[Tuple[int, str, str]]:
+    for size in SIZES:
+        for extension in FORMATS:
+            yield size, extension, variant_name(digest, size, extension)
+
+
+def render(image: Image.Image, size: int, image_format: str) -> bytes:
+    """
+    Обрезает изображение до квадрата по центру, уменьшает и кодирует его.
+
+    :param image: Исходное изображение в режиме RGB.
+    :type image: :class:`PIL.Image.Image`
+    :param size: Сторона копии в пикселях.
+    :type size: int
+    :param image_format: Формат Pillow (``WEBP`` или ``JPEG``).
+    :type image_format: str
+    :returns: Закодированное изображение.
+    :rtype: bytes
+    """
+    buffer = BytesIO()
+    ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS).save(
+        buffer, image_format, quality=settings.AVATAR_THUMBNAIL_QUALITY)
+    return buffer.getvalue()
+
+
+def generate(avatar: FieldFile) -> str:
+    """
+    Создаёт недостающие копии аватара.
+
+    Файл декодируется только если хотя бы одной копии ещё нет в хранилище.
+
+    :param avatar: Файл аватара.
+    :type avatar: :class:`django.db.models.fields.files.FieldFile`
+    :returns: Хеш содержимого, из которого строятся имена копий.
+    :rtype: str
+    :raises PIL.UnidentifiedImageError: Если файл не является изображением.
+    """
+    digest: str = content_hash(avatar)
+    missing = [(size, extension, name) for size, extension, name in _variants(digest)
+               if not default_storage.exists(name)]
+    if not missing:
+        return digest
+    avatar.open('rb')
+    try:
+        with Image.open(avatar) as source:
+            image: Image.Image = ImageOps.exif_transpose(source).convert('RGB')
+    finally:
+        avatar.close()
+    for size, extension, name in missing:
+        default_storage.save(name, ContentFile(render(image, size, FORMATS[extension])))
+    return digest
+
+
+def urls(digest: str) -> Dict[str, Dict[str, str]]:
+    """
+    Возвращает адреса копий по размерам и форматам.
+
+    :param digest: Хеш исходного файла.
+    :type digest: str
+    :returns: Словарь вида ``{'64': {'webp': url, 'jpg': url}, ...}``; ключи — строки,
+        чтобы шаблоны могли обращаться к ним как ``thumbnails.64.webp``.
+    :rtype: Dict[str, Dict[str, str]]
+    """
+    result: Dict[str, Dict[str, str]] = {}
+    for size, extension, name in _variants(digest):
+        result.setdefault(str(size), {})[extension] = default_storage.url(name)
+    return result
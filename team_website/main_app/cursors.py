@@ -0,0 +1,72 @@
+"""
+Курсоры для постраничной выборки по ключу (дата создания, ID).
+
+Курсор указывает на последнюю строку предыдущей страницы; следующая страница
+выбирается условием «раньше этой строки» по индексу, без ``OFFSET``. Индексы
+списков заканчиваются столбцами (дата создания, ID), поэтому условие задаёт
+границу поиска по индексу, а порядок не требует сортировки.
+
+:mod:`main_app.cursors`
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional, Tuple
+from django.db.models import Q
+
+Cursor = Tuple[datetime, int]
+
+_EPOCH: datetime = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND: timedelta = timedelta(microseconds=1)
+_MAX_ROW_ID: int = 2 ** 63 - 1
+
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    """
+    Кодирует позицию в списке.
+
+    :param moment: Дата последней строки страницы.
+    :type moment: :class:`datetime.datetime`
+    :param row_id: ID последней строки страницы.
+    :type row_id: int
+    :returns: Курсор.
+    :rtype: str
+    """
+    return f'{(moment - _EPOCH) // _MICROSECOND}.{row_id}'
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Разбирает курсор.
+
+    :param cursor: Курсор.
+    :type cursor: str
+    :returns: Дата и ID последней строки предыдущей страницы.
+    :rtype: Tuple[:class:`datetime.datetime`, int]
+    :raises ValueError: Если курсор некорректен.
+    """
+    micros, _, raw_id = cursor.partition('.')
+    row_id: int = int(raw_id)
+    if not 0 <= row_id <= _MAX_ROW_ID:
+        raise ValueError(f'Cursor row id out of range: {raw_id}')
+    try:
+        return _EPOCH + int(micros) * _MICROSECOND, row_id
+    except OverflowError as e:
+        raise ValueError(f'Cursor date out of range: {micros}') from e
+
+
+def after(cursor: Optional[Cursor]) -> Q:
+    """
+    Возвращает условие выборки строк, идущих после курсора при сортировке по убыванию.
+
+    Условие ``created_at <= момент`` дублирует дизъюнкцию, чтобы база могла
+    начать просмотр индекса с позиции курсора.
+
+    :param cursor: Позиция (``None`` для первой страницы).
+    :type cursor: Optional[Tuple[:class:`datetime.datetime`, int]]
+    :returns: Условие для ``filter``.
+    :rtype: :class:`django.db.models.Q`
+    """
+    if cursor is None:
+        return Q()
+    moment, row_id = cursor
+    return Q(created_at__lte=moment) & (Q(created_at__lt=moment) | Q(created_at=moment, id__lt=row_id))
@@ -0,0 +1,529 @@
+"""
+Инкрементальная проверка синтаксиса программ робота для редактора.
+
+Язык строчный (см. ``application/grammar.ebnf``): каждая инструкция занимает
+одну строку, а блоки ``IF/ELSE/ENDIF``, ``FOR/ENDFOR``, ``WHILE/ENDWHILE`` и
+``DOWHILE/ENDDOWHILE`` образуются парами строк. Поэтому документ хранит для
+каждой строки результат её разбора, а поверх — дерево блоков.
+
+При правке заново разбираются только затронутые строки, а проверка структуры
+выполняется только внутри наименьшего блока, целиком содержащего правку;
+если после правки этот блок перестаёт быть самодостаточным (появился
+незакрытый или лишний блок), проверка поднимается к родительскому блоку
+и в худшем случае — ко всему документу.
+
+:mod:`main_app.diagnostics`
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+KEYWORDS = frozenset({
+    'LET', 'PRINT', 'INPUT', 'GO', 'TURN', 'FILL', 'SCAN', 'GET',
+    'IF', 'THEN', 'ELSE', 'ENDIF', 'FOR', 'WHILE', 'DOWHILE', 'REPEAT', 'ENDFOR', 'ENDWHILE', 'ENDDOWHILE',
+    'NOT', 'AND', 'OR',
+    'UP', 'RIGHT', 'DOWN', 'LEFT', 'FRONT',
+    'RED', 'GREEN', 'BLUE', 'YELLOW', 'WHITE', 'BLACK',
+})
+DIRECTIONS = frozenset({'UP', 'RIGHT', 'DOWN', 'LEFT'})
+ORIENTATIONS = frozenset({'FRONT', 'DOWN'})
+COLORS = frozenset({'RED', 'GREEN', 'BLUE', 'YELLOW', 'WHITE', 'BLACK'})
+COMPARISONS = frozenset({'<', '>', '<=', '>=', '==', '!='})
+BLOCK_CLOSERS: Dict[str, str] = {'IF': 'ENDIF', 'FOR': 'ENDFOR', 'WHILE': 'ENDWHILE', 'DOWHILE': 'ENDDOWHILE'}
+BLOCK_OPENERS: Dict[str, str] = {closer: opener for opener, closer in BLOCK_CLOSERS.items()}
+
+TOKEN_RE = re.compile(r'\s*(?:(?P<comment>#.*)|(?P<number>\d+)|(?P<word>[A-Za-z_]\w*)|(?P<string>"[^"]*")'
+                      r'|(?P<op>==|!=|<=|>=|[-+*/=<>()]))')
+FIRST_WORD_RE = re.compile(r'\s*([A-Za-z_]\w*)')
+
+Diagnostic = Tuple[int, int, str]
+
+
+class SyntaxProblem(Exception):
+    """
+    Ошибка разбора строки с позицией (столбцом) проблемного токена.
+    """
+    def __init__(self, column: int, message: str) -> None:
+        super().__init__(message)
+        self.column = column
+        self.message = message
+
+
+class Token:
+    """
+    Лексема строки программы.
+
+    :attribute kind: Вид лексемы: ``number``, ``word``, ``keyword``, ``string`` или ``op``.
+    :type kind: str
+    :attribute text: Текст лексемы.
+    :type text: str
+    :attribute column: Столбец начала лексемы.
+    :type column: int
+    """
+    __slots__ = ('kind', 'text', 'column')
+
+    def __init__(self, kind: str, text: str, column: int) -> None:
+        self.kind = kind
+        self.text = text
+        self.column = column
+
+
+def lex_line(line: str) -> List[Token]:
+    """
+    Разбивает строку программы на лексемы, отбрасывая комментарий.
+
+    :param line: Строка программы.
+    :type line: str
+    :returns: Лексемы строки.
+    :rtype: List[Token]
+    :raises SyntaxProblem: Если в строке встречен недопустимый символ.
+    """
+    tokens: List[Token] = []
+    position = 0
+    length = len(line.rstrip())
+    while position < length:
+        match = TOKEN_RE.match(line, position)
+        if not match:
+            column = len(line) - len(line[position:].lstrip())
+            raise SyntaxProblem(column, f'Недопустимый символ «{line[column]}»')
+        kind = match.lastgroup
+        if kind == 'comment':
+            break
+        text = match.group(kind)
+        column = match.start(kind)
+        if kind == 'word' and text in KEYWORDS:
+            kind = 'keyword'
+        tokens.append(Token(kind, text, column))
+        position = match.end()
+    return tokens
+
+
+class LineParser:
+    """
+    Рекурсивный спуск по грамматике одной строки программы.
+    """
+    def __init__(self, tokens: List[Token], line: str) -> None:
+        self.tokens = tokens
+        self.end_column = len(line.rstrip())
+        self.index = 0
+
+    def peek(self) -> Optional[Token]:
+        """
+        Возвращает текущую лексему, не сдвигая позицию.
+        """
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def column(self) -> int:
+        """
+        Возвращает столбец текущей лексемы (или конца строки).
+        """
+        token = self.peek()
+        return token.column if token else self.end_column
+
+    def accept(self, *texts: str) -> Optional[Token]:
+        """
+        Сдвигает позицию, если текущая лексема совпадает с одним из текстов.
+        """
+        token = self.peek()
+        if token is not None and token.kind in ('keyword', 'op') and token.text in texts:
+            self.index += 1
+            return token
+        return None
+
+    def expect(self, text: str) -> None:
+        """
+        Требует лексему ``text``.
+        """
+        if not self.accept(text):
+            raise SyntaxProblem(self.column(), f'Ожидалось {text}')
+
+    def expect_from(self, allowed: frozenset, message: str) -> None:
+        """
+        Требует ключевое слово из множества ``allowed``.
+        """
+        token = self.peek()
+        if token is None or token.kind != 'keyword' or token.text not in allowed:
+            raise SyntaxProblem(self.column(), message)
+        self.index += 1
+
+    def identifier(self) -> None:
+        """
+        Требует идентификатор.
+        """
+        token = self.peek()
+        if token is None or token.kind != 'word':
+            raise SyntaxProblem(self.column(), 'Ожидался идентификатор')
+        self.index += 1
+
+    def end(self) -> None:
+        """
+        Требует конец строки.
+        """
+        if self.peek() is not None:
+            raise SyntaxProblem(self.column(), f'Лишняя лексема «{self.peek().text}»')
+
+    def primary(self) -> None:
+        """
+        ``<primary> ::= <number> | <identifier> | "(" <expression> ")"``
+        """
+        token = self.peek()
+        if token is not None and token.kind in ('number', 'word'):
+            self.index += 1
+        elif self.accept('('):
+            self.expression()
+            self.expect(')')
+        else:
+            raise SyntaxProblem(self.column(), 'Ожидалось выражение')
+
+    def unary(self) -> None:
+        """
+        ``<unary> ::= ("+" | "-")? <primary>``
+        """
+        self.accept('+', '-')
+        self.primary()
+
+    def term(self) -> None:
+        """
+        ``<term> ::= <unary> (("*" | "/") <unary>)*``
+        """
+        self.unary()
+        while self.accept('*', '/'):
+            self.unary()
+
+    def expression(self) -> None:
+        """
+        ``<expression> ::= <term> (("+" | "-") <term>)*``
+        """
+        self.term()
+        while self.accept('+', '-'):
+            self.term()
+
+    def comparison(self) -> None:
+        """
+        ``<comparison> ::= <expression> <op> <expression> | "(" <condition> ")"``
+        """
+        start = self.index
+        if self.accept('('):
+            try:
+                self.condition()
+                self.expect(')')
+                return
+            except SyntaxProblem:
+                self.index = start
+        self.expression()
+        if not self.accept(*COMPARISONS):
+            raise SyntaxProblem(self.column(), 'Ожидался оператор сравнения')
+        self.expression()
+
+    def condition(self) -> None:
+        """
+        ``<condition> ::= <not_condition> ("OR" <not_condition>)*``
+        """
+        self.not_condition()
+        while self.accept('OR'):
+            self.not_condition()
+
+    def not_condition(self) -> None:
+        """
+        ``<not_condition> ::= "NOT"? <and_condition>``
+        """
+        self.accept('NOT')
+        self.comparison()
+        while self.accept('AND'):
+            self.comparison()
+
+    def statement(self) -> str:
+        """
+        Разбирает строку целиком.
+
+        :returns: Вид строки: ``statement``, ``open``, ``else`` или ``close``.
+        :rtype: str
+        :raises SyntaxProblem: Если строка не соответствует грамматике.
+        """
+        token = self.peek()
+        if token.kind == 'word':
+            self.index += 1
+            self.expect('=')
+            self.expression()
+            self.end()
+            return 'statement'
+        if token.kind != 'keyword':
+            raise SyntaxProblem(token.column, 'Ожидалась инструкция')
+        keyword = token.text
+        self.index += 1
+        kind = 'statement'
+        if keyword in ('LET', 'INPUT'):
+            self.identifier()
+            while self.peek() is not None:
+                self.identifier()
+        elif keyword == 'PRINT':
+            while True:
+                current = self.peek()
+                if current is not None and current.kind == 'string':
+                    self.index += 1
+                else:
+                    self.expression()
+                if self.peek() is None:
+                    break
+        elif keyword == 'GO':
+            if self.peek() is not None:
+                self.expect_from(DIRECTIONS, 'Ожидалось направление')
+        elif keyword == 'TURN':
+            self.expect_from(DIRECTIONS, 'Ожидалось направление')
+        elif keyword == 'FILL':
+            if self.peek() is not None:
+                self.expect_from(COLORS, 'Ожидался цвет')
+        elif keyword == 'SCAN':
+            self.expect_from(ORIENTATIONS, 'Ожидалось FRONT или DOWN')
+        elif keyword == 'GET':
+            self.expect_from(ORIENTATIONS, 'Ожидалось FRONT или DOWN')
+            self.identifier()
+        elif keyword == 'IF':
+            self.condition()
+            self.expect('THEN')
+            kind = 'open'
+        elif keyword == 'FOR':
+            self.expression()
+            self.expect('REPEAT')
+            kind = 'open'
+        elif keyword in ('WHILE', 'DOWHILE'):
+            self.condition()
+            self.expect('REPEAT')
+            kind = 'open'
+        elif keyword == 'ELSE':
+            kind = 'else'
+        elif keyword in BLOCK_OPENERS:
+            kind = 'close'
+        else:
+            raise SyntaxProblem(token.column, f'Инструкция не может начинаться с {keyword}')
+        self.end()
+        return kind
+
+
+class LineInfo:
+    """
+    Результат разбора одной строки.
+
+    :attribute kind: Вид строки: ``blank``, ``statement``, ``open``, ``else``, ``close`` или ``error``.
+    :type kind: str
+    :attribute keyword: Первое ключевое слово строки (для блочных строк).
+    :type keyword: str
+    :attribute column: Столбец первой лексемы.
+    :type column: int
+    :attribute error: Ошибка строки (столбец, сообщение), если есть.
+    :type error: Optional[Tuple[int, str]]
+    """
+    __slots__ = ('kind', 'keyword', 'column', 'error')
+
+    def __init__(self, kind: str, keyword: str = '', column: int = 0,
+                 error: Optional[Tuple[int, str]] = None) -> None:
+        self.kind = kind
+        self.keyword = keyword
+        self.column = column
+        self.error = error
+
+
+def analyze_line(line: str) -> LineInfo:
+    """
+    Лексирует и разбирает одну строку.
+
+    :param line: Строка программы.
+    :type line: str
+    :returns: Результат разбора.
+    :rtype: LineInfo
+    """
+    try:
+        tokens = lex_line(line)
+        if not tokens:
+            return LineInfo('blank')
+        kind = LineParser(tokens, line).statement()
+        return LineInfo(kind, tokens[0].text, tokens[0].column)
+    except SyntaxProblem as problem:
+        # Строка блока с ошибкой всё равно открывает/закрывает блок, иначе одна
+        # опечатка в заголовке FOR порождала бы ложную ошибку у его ENDFOR.
+        first = FIRST_WORD_RE.match(line)
+        keyword = first.group(1) if first else ''
+        if keyword in BLOCK_CLOSERS:
+            kind = 'open'
+        elif keyword in BLOCK_OPENERS:
+            kind = 'close'
+        elif keyword == 'ELSE':
+            kind = 'else'
+        else:
+            kind = 'error'
+        return LineInfo(kind, keyword, first.start(1) if first else 0, (problem.column, problem.message))
+
+
+class Block:
+    """
+    Блок программы: строка открытия и строка закрытия.
+
+    :attribute start: Номер строки открытия.
+    :type start: int
+    :attribute end: Номер строки закрытия.
+    :type end: int
+    """
+    __slots__ = ('start', 'end')
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start = start
+        self.end = end
+
+
+def check_structure(infos: List[LineInfo], first: int, last: int) -> Tuple[List[Block], List[Diagnostic]]:
+    """
+    Проверяет парность блоков в строках ``first..last`` включительно.
+
+    :param infos: Результаты разбора строк.
+    :type infos: List[LineInfo]
+    :param first: Номер первой строки диапазона.
+    :type first: int
+    :param last: Номер последней строки диапазона.
+    :type last: int
+    :returns: Закрытые блоки диапазона и структурные ошибки.
+    :rtype: Tuple[List[Block], List[Tuple[int, int, str]]]
+    """
+    blocks: List[Block] = []
+    errors: List[Diagnostic] = []
+    stack: List[List] = []  # [строка открытия, ключевое слово, инструкций в текущей ветке, было ли ELSE]
+    for number in range(first, last + 1):
+        info = infos[number]
+        if info.kind == 'blank':
+            continue
+        if info.kind in ('statement', 'error', 'open') and stack:
+            stack[-1][2] += 1
+        if info.kind == 'open':
+            stack.append([number, info.keyword, 0, False])
+        elif info.kind == 'else':
+            if not stack or stack[-1][1] != 'IF' or stack[-1][3]:
+                errors.append((number, info.column, 'ELSE без соответствующего IF'))
+                continue
+            if stack[-1][2] == 0:
+                errors.append((number, info.column, 'Пустая ветка IF'))
+            stack[-1][2] = 0
+            stack[-1][3] = True
+        elif info.kind == 'close':
+            opener = BLOCK_OPENERS[info.keyword]
+            if not any(frame[1] == opener for frame in stack):
+                errors.append((number, info.column, f'{info.keyword} без соответствующего {opener}'))
+                continue
+            start, keyword, statements, _ = stack.pop()
+            while keyword != opener:
+                errors.append((start, infos[start].column, f'{keyword} без {BLOCK_CLOSERS[keyword]}'))
+                start, keyword, statements, _ = stack.pop()
+            if statements == 0:
+                errors.append((number, info.column, f'Пустое тело блока {keyword}'))
+            blocks.append(Block(start, number))
+    for start, keyword, _, _ in stack:
+        errors.append((start, infos[start].column, f'{keyword} без {BLOCK_CLOSERS[keyword]}'))
+    blocks.sort(key=lambda block: block.start)
+    return blocks, errors
+
+
+class Document:
+    """
+    Документ редактора с кэшированными результатами разбора строк и блоков.
+
+    :attribute lines: Строки программы.
+    :type lines: List[str]
+    :attribute infos: Результаты разбора строк.
+    :type infos: List[LineInfo]
+    :attribute blocks: Закрытые блоки, отсортированные по строке открытия.
+    :type blocks: List[Block]
+    :attribute structure_errors: Структурные ошибки.
+    :type structure_errors: List[Tuple[int, int, str]]
+    :attribute version: Номер версии документа, увеличивается при каждой правке.
+    :type version: int
+    """
+    def __init__(self, text: str) -> None:
+        self.lines: List[str] = text.split('\n')
+        self.infos: List[LineInfo] = [analyze_line(line) for line in self.lines]
+        self.blocks, self.structure_errors = check_structure(self.infos, 0, len(self.lines) - 1)
+        self.version = 0
+        self.last_relexed = len(self.lines)
+        self.last_region: Optional[Tuple[int, int]] = None
+
+    def apply_edit(self, start_line: int, start_column: int, end_line: int, end_column: int, text: str) -> None:
+        """
+        Применяет правку (замену диапазона текстом) и обновляет разбор инкрементально.
+
+        :param start_line: Строка начала диапазона (с нуля).
+        :type start_line: int
+        :param start_column: Столбец начала диапазона.
+        :type start_column: int
+        :param end_line: Строка конца диапазона.
+        :type end_line: int
+        :param end_column: Столбец конца диапазона.
+        :type end_column: int
+        :param text: Текст замены.
+        :type text: str
+        :raises ValueError: Если диапазон выходит за пределы документа.
+        """
+        if not 0 <= start_line <= end_line < len(self.lines):
+            raise ValueError('Диапазон правки вне документа')
+        if not (0 <= start_column <= len(self.lines[start_line]) and 0 <= end_column <= len(self.lines[end_line])):
+            raise ValueError('Столбец правки вне строки')
+        if (start_line, start_column) > (end_line, end_column):
+            raise ValueError('Начало правки после её конца')
+        prefix = self.lines[start_line][:start_column]
+        suffix = self.lines[end_line][end_column:]
+        new_lines = (prefix + text + suffix).split('\n')
+        delta = len(new_lines) - (end_line - start_line + 1)
+        self.lines[start_line:end_line + 1] = new_lines
+        self.infos[start_line:end_line + 1] = [analyze_line(line) for line in new_lines]
+        self.last_relexed = len(new_lines)
+        self.version += 1
+        self._update_structure(start_line, end_line, delta)
+
+    def _update_structure(self, first: int, last: int, delta: int) -> None:
+        """
+        Перепроверяет структуру в наименьшем блоке, содержащем изменённые строки ``first..last``.
+
+        :param first: Первая изменённая строка (в старой нумерации).
+        :type first: int
+        :param last: Последняя изменённая строка (в старой нумерации).
+        :type last: int
+        :param delta: Изменение количества строк.
+        :type delta: int
+        """
+        def shift(line: int) -> int:
+            return line + delta if line > last else line
+
+        enclosing = [] if self.structure_errors else [
+            block for block in self.blocks if block.start < first and block.end > last
+        ]
+        enclosing.sort(key=lambda block: block.start, reverse=True)
+        for block in enclosing:
+            region_first, region_last = block.start + 1, block.end + delta - 1
+            region_blocks, region_errors = check_structure(self.infos, region_first, region_last)
+            if region_errors or all(self.infos[n].kind == 'blank' for n in range(region_first, region_last + 1)):
+                continue
+            outside = [Block(shift(b.start), shift(b.end)) for b in self.blocks
+                       if not (block.start < b.start and b.end < block.end)]
+            self.blocks = sorted(outside + region_blocks, key=lambda b: b.start)
+            self.last_region = (block.start, block.end + delta)
+            return
+        self.blocks, self.structure_errors = check_structure(self.infos, 0, len(self.lines) - 1)
+        self.last_region = None
+
+    @property
+    def size(self) -> int:
+        """
+        Возвращает длину текста документа в символах.
+
+        :returns: Длина текста.
+        :rtype: int
+        """
+        return sum(len(line) for line in self.lines) + len(self.lines) - 1
+
+    def diagnostics(self) -> List[Dict[str, object]]:
+        """
+        Возвращает все ошибки документа, отсортированные по позиции.
+
+        :returns: Список ошибок со строкой, столбцом и сообщением (строки с нуля).
+        :rtype: List[Dict[str, object]]
+        """
+        found: List[Diagnostic] = [(number, info.error[0], info.error[1])
+                                   for number, info in enumerate(self.infos) if info.error]
+        found.extend(self.structure_errors)
+        return [{'line': line, 'column': column, 'message': message} for line, column, message in sorted(found)]
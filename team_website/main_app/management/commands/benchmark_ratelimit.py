@@ -0,0 +1,66 @@
+"""
+Команда управления для замера накладных расходов ограничения частоты запросов.
+
+Прогоняет проверку :class:`main_app.ratelimit.RateLimitMiddleware` для
+маршрута с лимитом и без него на настроенном кэше и выводит среднее время
+и 99-й перцентиль на запрос. Лимит на время замера поднимается, чтобы все
+запросы проходили полную проверку.
+
+:mod:`main_app.management.commands.benchmark_ratelimit`
+"""
+
+import statistics
+import time
+from typing import Any, List
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandParser
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+from main_app.ratelimit import RateLimitMiddleware
+
+
+class Command(BaseCommand):
+    """
+    Замеряет задержку проверки лимита запросов.
+    """
+    help = 'Замеряет накладные расходы ограничения частоты запросов'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """
+        Добавляет аргументы командной строки.
+
+        :param parser: Парсер аргументов.
+        :type parser: :class:`django.core.management.base.CommandParser`
+        """
+        parser.add_argument('--requests', type=int, default=10000, help='Количество запросов')
+        parser.add_argument('--clients', type=int, default=100, help='Количество разных IP-адресов')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        Выполняет замеры и выводит результаты.
+
+        :param args: Позиционные аргументы.
+        :type args: Any
+        :param options: Именованные аргументы команды.
+        :type options: Any
+        """
+        middleware = RateLimitMiddleware(lambda request: None)
+        factory = RequestFactory()
+        clients: int = options['clients']
+        rules = {'main_app.views.search_fields': {'limit': options['requests'] + 1, 'window': 60}}
+        with override_settings(RATE_LIMITS=rules):
+            for title, path in (('с лимитом', '/api/search/'), ('без лимита', '/')):
+                timings: List[float] = []
+                match = resolve(path)
+                for index in range(options['requests']):
+                    request = factory.get(path, REMOTE_ADDR=f'10.0.{index % clients // 256}.{index % clients % 256}')
+                    request.user = AnonymousUser()
+                    request.resolver_match = match
+                    started = time.perf_counter()
+                    response = middleware.process_view(request, match.func, match.args, match.kwargs)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    if response is not None:
+                        raise AssertionError('Запрос отклонён во время замера')
+                timings.sort()
+                self.stdout.write(f'Проверка {title}: среднее {statistics.mean(timings):.4f} мс, '
+                                  f'p99 {timings[int(len(timings) * 0.99) - 1]:.4f} мс')
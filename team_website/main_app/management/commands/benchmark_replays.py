@@ -0,0 +1,94 @@
+"""
+Команда управления для замера размера и скорости перемотки сжатых трасс.
+
+Генерирует синтетическую трассу исполнителя (обход поля с закраской клеток
+и счётчиком цикла) и сравнивает:
+
+* размер трассы в JSON с размером сжатых дельт с контрольными точками;
+* время перехода к случайному шагу от ближайшей контрольной точки
+  со временем проигрывания трассы с нулевого шага.
+
+:mod:`main_app.management.commands.benchmark_replays`
+"""
+
+import json
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+from django.core.management.base import BaseCommand, CommandParser
+from main_app.replay import encode_trace, seek
+
+
+def synthetic_trace(steps: int, cols: int = 20, rows: int = 20) -> List[Dict[str, Any]]:
+    """
+    Строит синтетическую трассу: робот обходит поле змейкой и закрашивает клетки.
+
+    :param steps: Количество шагов.
+    :type steps: int
+    :param cols: Количество столбцов поля.
+    :type cols: int
+    :param rows: Количество строк поля.
+    :type rows: int
+    :returns: Состояния исполнителя по шагам.
+    :rtype: List[Dict[str, Any]]
+    """
+    states: List[Dict[str, Any]] = []
+    cells: Dict[str, int] = {}
+    for step in range(steps):
+        row, col = divmod(step % (cols * rows), cols)
+        x = col if row % 2 == 0 else cols - 1 - col
+        if step % 3 == 0:
+            cells = dict(cells)
+            cells[f'{x},{row}'] = step % 6 + 1
+        states.append({'x': x, 'y': row, 'pc': step % 7, 'vars': {'i': step, 'n': steps}, 'cells': cells})
+    return states
+
+
+class Command(BaseCommand):
+    """
+    Замеряет размер хранения и задержку перемотки трасс исполнения.
+    """
+    help = 'Замеряет размер сжатых трасс и задержку перехода к шагу'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """
+        Добавляет аргументы командной строки.
+
+        :param parser: Парсер аргументов.
+        :type parser: :class:`django.core.management.base.CommandParser`
+        """
+        parser.add_argument('--steps', type=int, default=50000, help='Количество шагов трассы')
+        parser.add_argument('--interval', type=int, default=256, help='Расстояние между контрольными точками')
+        parser.add_argument('--seeks', type=int, default=50, help='Количество случайных переходов')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        Выполняет замеры и выводит результаты.
+
+        :param args: Позиционные аргументы.
+        :type args: Any
+        :param options: Именованные аргументы команды.
+        :type options: Any
+        """
+        steps: int = options['steps']
+        states = synthetic_trace(steps)
+        raw_size = len(json.dumps(states, separators=(',', ':')).encode('utf-8'))
+        data, offsets = encode_trace(states, options['interval'])
+        full_data, full_offsets = encode_trace(states, steps)
+        self.stdout.write(f'Шагов: {steps}')
+        self.stdout.write(f'JSON: {raw_size} байт; сжатые дельты: {len(data)} байт '
+                          f'({raw_size / max(len(data), 1):.1f}x), контрольных точек: {len(offsets)}')
+        targets = [random.randrange(steps) for _ in range(options['seeks'])]
+        for title, blob, index, interval in (
+                ('с контрольными точками', data, offsets, options['interval']),
+                ('с нулевого шага', full_data, full_offsets, steps)):
+            timings: List[float] = []
+            for target in targets:
+                started = time.perf_counter()
+                state = seek(blob, index, interval, target, steps)
+                timings.append((time.perf_counter() - started) * 1000)
+                if state != states[target]:
+                    raise AssertionError(f'Неверное состояние на шаге {target}')
+            self.stdout.write(f'Переход {title}: среднее {statistics.mean(timings):.3f} мс, '
+                              f'максимум {max(timings):.3f} мс')
@@ -0,0 +1,49 @@
+"""
+Команда управления для создания уменьшенных копий уже загруженных аватаров.
+
+Новые аватары получают копии при сохранении пользователя, а копии старых
+создаются при первом показе; команда позволяет подготовить их заранее.
+Повторный запуск пропускает аватары, у которых копии уже есть.
+
+:mod:`main_app.management.commands.build_avatar_thumbnails`
+"""
+
+from typing import Any
+from django.core.management.base import BaseCommand, CommandParser
+from main_app.models import User
+
+
+class Command(BaseCommand):
+    """
+    Создаёт уменьшенные копии аватаров пользователей.
+    """
+    help = 'Создаёт уменьшенные копии аватаров, у которых их ещё нет'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """
+        Добавляет аргументы командной строки.
+
+        :param parser: Парсер аргументов.
+        :type parser: :class:`django.core.management.base.CommandParser`
+        """
+        parser.add_argument('--all', action='store_true', help='Проверить копии всех аватаров, а не только новых')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        Выполняет создание копий.
+
+        :param args: Позиционные аргументы.
+        :type args: Any
+        :param options: Именованные аргументы команды.
+        :type options: Any
+        """
+        users = User.objects.exclude(avatar='').exclude(avatar__isnull=True)
+        if not options['all']:
+            users = users.filter(avatar_hash='')
+        built = failed = 0
+        for user in users.iterator():
+            if user.build_avatar_thumbnails():
+                built += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано аватаров: {built}, с ошибками: {failed}'))
@@ -0,0 +1,50 @@
+"""
+Команда управления для сброса буфера реакций в базу данных.
+
+Предназначена для запуска по расписанию, чтобы реакции попадали в базу даже
+в периоды, когда новых переключений нет: однократно из cron или постоянным
+процессом с ``--interval`` (сервис ``scheduler`` в ``docker-compose.yml``).
+
+:mod:`main_app.management.commands.flush_reactions`
+"""
+
+import time
+from typing import Any
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from main_app import reactions
+
+
+class Command(BaseCommand):
+    """
+    Применяет накопленные в кэше лайки и избранное.
+    """
+    help = 'Сбрасывает буфер лайков и избранного в базу данных'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """
+        Добавляет аргументы командной строки.
+
+        :param parser: Парсер аргументов.
+        :type parser: :class:`django.core.management.base.CommandParser`
+        """
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Повторять сброс с указанным интервалом в секундах '
+                                 '(0 — REACTION_FLUSH_INTERVAL); по умолчанию — один раз')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        Выполняет сброс буфера.
+
+        :param args: Позиционные аргументы.
+        :type args: Any
+        :param options: Именованные аргументы команды.
+        :type options: Any
+        """
+        interval = options['interval']
+        while True:
+            applied = reactions.flush()
+            self.stdout.write(self.style.SUCCESS(f'Буфер реакций сброшен, изменений: {applied}'))
+            if interval is None:
+                return
+            time.sleep(interval or settings.REACTION_FLUSH_INTERVAL)
@@ -0,0 +1,43 @@
+"""
+Команда управления для индексации отпечатков существующих комментариев.
+
+Новые комментарии получают отпечаток при создании; команда нужна после
+развёртывания поиска почти одинаковых текстов, чтобы заполнить индекс уже
+написанными комментариями. Повторный запуск пропускает проиндексированные тексты.
+
+:mod:`main_app.management.commands.index_fingerprints`
+"""
+
+from typing import Any
+from django.core.management.base import BaseCommand, CommandParser
+from main_app.models import TextFingerprint
+
+
+class Command(BaseCommand):
+    """
+    Индексирует отпечатки SimHash комментариев и комментариев к профилям.
+    """
+    help = 'Вычисляет отпечатки SimHash для комментариев, у которых их ещё нет'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """
+        Добавляет аргументы командной строки.
+
+        :param parser: Парсер аргументов.
+        :type parser: :class:`django.core.management.base.CommandParser`
+        """
+        parser.add_argument('--batch-size', type=int, default=500, help='Размер пачки вставки')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        Выполняет индексацию.
+
+        :param args: Позиционные аргументы.
+        :type args: Any
+        :param options: Именованные аргументы команды.
+        :type options: Any
+        """
+        total = 0
+        for source_type, _ in TextFingerprint.SOURCE_TYPES:
+            total += TextFingerprint.backfill(source_type, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано текстов: {total}'))
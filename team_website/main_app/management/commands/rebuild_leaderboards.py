@@ -0,0 +1,46 @@
+"""
+Команда управления для перестроения таблиц лидеров полей.
+
+Используется после изменения ``LEADERBOARD_SIZE`` или ручной правки решений,
+когда инкрементально поддерживаемые таблицы нужно пересчитать с нуля.
+
+:mod:`main_app.management.commands.rebuild_leaderboards`
+"""
+
+from typing import Any
+from django.core.management.base import BaseCommand, CommandParser
+from main_app.models import Field, LeaderboardEntry
+
+
+class Command(BaseCommand):
+    """
+    Перестраивает таблицы лидеров по успешным решениям.
+    """
+    help = 'Перестраивает таблицы лидеров полей по проверенным решениям'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """
+        Добавляет аргументы командной строки.
+
+        :param parser: Парсер аргументов.
+        :type parser: :class:`django.core.management.base.CommandParser`
+        """
+        parser.add_argument('--field', type=int, action='append', dest='fields',
+                            help='ID поля (можно указать несколько раз); по умолчанию — все поля')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        Выполняет перестроение таблиц лидеров.
+
+        :param args: Позиционные аргументы.
+        :type args: Any
+        :param options: Именованные аргументы команды.
+        :type options: Any
+        """
+        fields = Field.objects.all()
+        if options['fields']:
+            fields = fields.filter(id__in=options['fields'])
+        total = 0
+        for field in fields.only('id').iterator():
+            total += LeaderboardEntry.rebuild(field)
+        self.stdout.write(self.style.SUCCESS(f'Таблицы лидеров перестроены, записей: {total}'))
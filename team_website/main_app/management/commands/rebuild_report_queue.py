@@ -0,0 +1,31 @@
+"""
+Команда управления для пересборки очереди жалоб.
+
+Очередь обновляется при каждой жалобе; команда нужна после развёртывания
+очереди, чтобы внести в неё уже поданные жалобы, и после ручной правки жалоб.
+
+:mod:`main_app.management.commands.rebuild_report_queue`
+"""
+
+from typing import Any
+from django.core.management.base import BaseCommand
+from main_app.models import ReportQueueEntry
+
+
+class Command(BaseCommand):
+    """
+    Пересобирает очередь модерации по нерассмотренным жалобам.
+    """
+    help = 'Пересобирает очередь жалоб по нерассмотренным жалобам на карты и комментарии'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        Выполняет пересборку очереди.
+
+        :param args: Позиционные аргументы.
+        :type args: Any
+        :param options: Именованные аргументы команды.
+        :type options: Any
+        """
+        total: int = ReportQueueEntry.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Очередь жалоб пересобрана, объектов: {total}'))
@@ -0,0 +1,33 @@
+"""
+Команда управления для сверки счётчиков реакций.
+
+Счётчики :class:`main_app.models.ReactionCount` меняются вместе с реакциями,
+но каскадные удаления (например, вместе с пользователем) их не трогают.
+Команду следует запускать периодически (например, раз в сутки из cron),
+чтобы исправлять накопившиеся расхождения.
+
+:mod:`main_app.management.commands.reconcile_reaction_counts`
+"""
+
+from typing import Any
+from django.core.management.base import BaseCommand
+from main_app.models import ReactionCount
+
+
+class Command(BaseCommand):
+    """
+    Сверяет счётчики реакций с таблицей реакций.
+    """
+    help = 'Пересчитывает количества реакций на объекты и исправляет расхождения'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        Выполняет сверку.
+
+        :param args: Позиционные аргументы.
+        :type args: Any
+        :param options: Именованные аргументы команды.
+        :type options: Any
+        """
+        corrected = ReactionCount.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Счётчики реакций сверены, исправлено строк: {corrected}'))
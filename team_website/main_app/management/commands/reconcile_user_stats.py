@@ -0,0 +1,54 @@
+"""
+Команда управления для сверки материализованной статистики пользователей.
+
+Счётчики :class:`main_app.models.UserStats` поддерживаются инкрементально на
+путях записи, но удаления и каскады их не меняют. Команда запускается
+периодически, чтобы исправлять накопившиеся расхождения: однократно из cron
+или постоянным процессом с ``--interval`` (сервис ``stats`` в ``docker-compose.yml``).
+
+:mod:`main_app.management.commands.reconcile_user_stats`
+"""
+
+import time
+from typing import Any
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from main_app.models import UserStats
+
+
+class Command(BaseCommand):
+    """
+    Сверяет статистику пользователей с исходными таблицами.
+    """
+    help = 'Пересчитывает статистику пользователей и исправляет расхождения'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """
+        Добавляет аргументы командной строки.
+
+        :param parser: Парсер аргументов.
+        :type parser: :class:`django.core.management.base.CommandParser`
+        """
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='ID пользователя (можно указать несколько раз); по умолчанию — все пользователи')
+        parser.add_argument('--batch-size', type=int, default=500, help='Количество пользователей в пачке')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Повторять сверку с указанным интервалом в секундах '
+                                 '(0 — USER_STATS_RECONCILE_INTERVAL); по умолчанию — один раз')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        Выполняет сверку.
+
+        :param args: Позиционные аргументы.
+        :type args: Any
+        :param options: Именованные аргументы команды.
+        :type options: Any
+        """
+        interval = options['interval']
+        while True:
+            corrected = UserStats.reconcile(options['users'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Статистика сверена, исправлено строк: {corrected}'))
+            if interval is None:
+                return
+            time.sleep(interval or settings.USER_STATS_RECONCILE_INTERVAL)
@@ -0,0 +1,53 @@
+"""
+Команда управления для выполнения незавершённых блокировок содержимого пользователей.
+
+Обычно задание выполняется фоновым потоком сразу после бана; команда
+продолжает задания, исполнитель которых завершился, не дойдя до конца
+(после истечения аренды), и выполняет задания при ``BAN_CASCADE_BACKGROUND = False``.
+Запускается по расписанию: однократно из cron или постоянным процессом
+с ``--interval`` (сервис ``cascades`` в ``docker-compose.yml``).
+
+:mod:`main_app.management.commands.run_ban_cascades`
+"""
+
+import time
+from typing import Any
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from main_app.models import BanCascade
+
+
+class Command(BaseCommand):
+    """
+    Выполняет незавершённые задания блокировки содержимого.
+    """
+    help = 'Продолжает незавершённые блокировки полей и комментариев заблокированных пользователей'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """
+        Добавляет аргументы командной строки.
+
+        :param parser: Парсер аргументов.
+        :type parser: :class:`django.core.management.base.CommandParser`
+        """
+        parser.add_argument('--chunk-size', type=int, default=None, help='Размер пачки')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Повторять проверку с указанным интервалом в секундах '
+                                 '(0 — BAN_CASCADE_LEASE); по умолчанию — один раз')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        Выполняет задания.
+
+        :param args: Позиционные аргументы.
+        :type args: Any
+        :param options: Именованные аргументы команды.
+        :type options: Any
+        """
+        interval = options['interval']
+        while True:
+            total: int = BanCascade.run_pending(options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'Выполнено заданий: {total}'))
+            if interval is None:
+                return
+            time.sleep(interval or settings.BAN_CASCADE_LEASE)
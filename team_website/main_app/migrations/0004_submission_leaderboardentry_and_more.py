@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0003_remove_reportcomment_comment_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Submission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('program', models.TextField()),
+                ('is_solved', models.BooleanField(default=False)),
+                ('steps', models.PositiveIntegerField(blank=True, null=True)),
+                ('program_length', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('graded_at', models.DateTimeField(blank=True, null=True)),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='main_app.field')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('steps', models.PositiveIntegerField()),
+                ('program_length', models.PositiveIntegerField()),
+                ('achieved_at', models.DateTimeField()),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard', to='main_app.field')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main_app.submission')),
+            ],
+            options={
+                'ordering': ['steps', 'program_length', 'achieved_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['field', 'is_solved', 'steps', 'program_length'], name='submission_field_best_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['field', 'steps', 'program_length', 'achieved_at'], name='leaderboard_rank_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('field', 'user'), name='leaderboard_unique_field_user'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0004_submission_leaderboardentry_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecutionReplay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('offsets', models.JSONField(default=list)),
+                ('step_count', models.PositiveIntegerField()),
+                ('checkpoint_interval', models.PositiveIntegerField()),
+                ('raw_size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='replay', to='main_app.submission')),
+            ],
+        ),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def copy_reactions(apps, schema_editor):
+    """
+    Переносит лайки и избранное из связей многие-ко-многим и старых моделей в таблицу реакций.
+    """
+    Field = apps.get_model('main_app', 'Field')
+    Comment = apps.get_model('main_app', 'Comment')
+    Reaction = apps.get_model('main_app', 'Reaction')
+    now = django.utils.timezone.now()
+    sources = [
+        (Field.likes.through.objects.values_list('field_id', 'user_id'), 'field', 'like'),
+        (Field.favorites.through.objects.values_list('field_id', 'user_id'), 'field', 'favorite'),
+        (Comment.likes.through.objects.values_list('comment_id', 'user_id'), 'comment', 'like'),
+    ]
+    for rows, target_type, kind in sources:
+        Reaction.objects.bulk_create(
+            (Reaction(target_type=target_type, target_id=target_id, user_id=user_id, kind=kind, created_at=now)
+             for target_id, user_id in rows.iterator()),
+            batch_size=BATCH_SIZE, ignore_conflicts=True)
+    legacy = [
+        (apps.get_model('main_app', 'LikeField').objects.values_list('field_id', 'user_id', 'created_at'),
+         'field', 'like'),
+        (apps.get_model('main_app', 'FavoriteField').objects.values_list('field_id', 'user_id', 'created_at'),
+         'field', 'favorite'),
+        (apps.get_model('main_app', 'LikeComment').objects.values_list('comment_id', 'user_id', 'created_at'),
+         'comment', 'like'),
+    ]
+    for rows, target_type, kind in legacy:
+        for target_id, user_id, created_at in rows.iterator():
+            Reaction.objects.update_or_create(
+                target_type=target_type, target_id=target_id, user_id=user_id, kind=kind,
+                defaults={'created_at': created_at})
+
+
+def restore_relations(apps, schema_editor):
+    """
+    Возвращает реакции в связи многие-ко-многим при откате миграции.
+    """
+    Field = apps.get_model('main_app', 'Field')
+    Comment = apps.get_model('main_app', 'Comment')
+    Reaction = apps.get_model('main_app', 'Reaction')
+    targets = [
+        (Field.likes.through, 'field_id', 'field', 'like'),
+        (Field.favorites.through, 'field_id', 'field', 'favorite'),
+        (Comment.likes.through, 'comment_id', 'comment', 'like'),
+    ]
+    for through, column, target_type, kind in targets:
+        rows = Reaction.objects.filter(target_type=target_type, kind=kind).values_list('target_id', 'user_id')
+        through.objects.bulk_create(
+            (through(**{column: target_id, 'user_id': user_id}) for target_id, user_id in rows.iterator()),
+            batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0005_executionreplay'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.CharField(choices=[('field', 'Карта'), ('comment', 'Комментарий')], max_length=16)),
+                ('target_id', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('like', 'Лайк'), ('favorite', 'Избранное')], max_length=16)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Реакция',
+                'verbose_name_plural': 'Реакции',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['target_type', 'target_id', 'kind', '-created_at'], name='reaction_target_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['user', 'target_type', 'kind', '-created_at'], name='reaction_user_recent_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reaction',
+            constraint=models.UniqueConstraint(fields=('target_type', 'target_id', 'kind', 'user'), name='reaction_unique_target_user'),
+        ),
+        migrations.RunPython(copy_reactions, restore_relations),
+        migrations.RemoveField(
+            model_name='comment',
+            name='likes',
+        ),
+        migrations.RemoveField(
+            model_name='field',
+            name='favorites',
+        ),
+        migrations.RemoveField(
+            model_name='field',
+            name='likes',
+        ),
+        migrations.DeleteModel(
+            name='FavoriteField',
+        ),
+        migrations.DeleteModel(
+            name='LikeComment',
+        ),
+        migrations.DeleteModel(
+            name='LikeField',
+        ),
+    ]
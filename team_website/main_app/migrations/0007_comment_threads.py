@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_paths(apps, schema_editor):
+    """
+    Делает существующие комментарии началами веток с путём из собственного ID.
+    """
+    Comment = apps.get_model('main_app', 'Comment')
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    batch = []
+    for comment in Comment.objects.only('id').iterator():
+        pk, segment = comment.id, ''
+        while pk:
+            pk, digit = divmod(pk, len(digits))
+            segment = digits[digit] + segment
+        comment.path = segment.rjust(8, '0')
+        batch.append(comment)
+        if len(batch) >= 1000:
+            Comment.objects.bulk_update(batch, ['path'])
+            batch = []
+    Comment.objects.bulk_update(batch, ['path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0006_reaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='main_app.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['field', 'path'], name='comment_field_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['field', 'depth', '-created_at'], name='comment_field_roots_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0007_comment_threads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.CharField(choices=[('field', 'Карта'), ('comment', 'Комментарий')], max_length=16)),
+                ('target_id', models.PositiveIntegerField()),
+                ('window_start', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reporters', models.PositiveIntegerField(default=0)),
+                ('auto_hidden', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Счётчик жалоб',
+                'verbose_name_plural': 'Счётчики жалоб',
+                'constraints': [models.UniqueConstraint(fields=('target_type', 'target_id'), name='report_counter_unique_target')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ModerationAction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.CharField(choices=[('field', 'Карта'), ('comment', 'Комментарий')], max_length=16)),
+                ('target_id', models.PositiveIntegerField()),
+                ('action', models.CharField(choices=[('hide', 'Скрытие')], max_length=16)),
+                ('reporters', models.PositiveIntegerField()),
+                ('window', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('decision', models.CharField(blank=True, choices=[('confirmed', 'Подтверждено'), ('reverted', 'Отменено')], max_length=16)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('reviewed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviewed_moderation_actions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Действие автомодерации',
+                'verbose_name_plural': 'Действия автомодерации',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['decision', '-created_at'], name='moderation_action_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0008_auto_moderation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('comment', 'Комментарий'), ('profile_comment', 'Комментарий к профилю')], max_length=16)),
+                ('source_id', models.PositiveIntegerField()),
+                ('fingerprint', models.BigIntegerField()),
+                ('band0', models.PositiveSmallIntegerField()),
+                ('band1', models.PositiveSmallIntegerField()),
+                ('band2', models.PositiveSmallIntegerField()),
+                ('band3', models.PositiveSmallIntegerField()),
+                ('band4', models.PositiveSmallIntegerField()),
+                ('band5', models.PositiveSmallIntegerField()),
+                ('band6', models.PositiveSmallIntegerField()),
+                ('band7', models.PositiveSmallIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('distance', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('duplicate_of', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='near_duplicates', to='main_app.textfingerprint')),
+            ],
+            options={
+                'verbose_name': 'Отпечаток текста',
+                'verbose_name_plural': 'Отпечатки текстов',
+                'indexes': [models.Index(fields=['band0', 'created_at'], name='fingerprint_band0_idx'), models.Index(fields=['band1', 'created_at'], name='fingerprint_band1_idx'), models.Index(fields=['band2', 'created_at'], name='fingerprint_band2_idx'), models.Index(fields=['band3', 'created_at'], name='fingerprint_band3_idx'), models.Index(fields=['band4', 'created_at'], name='fingerprint_band4_idx'), models.Index(fields=['band5', 'created_at'], name='fingerprint_band5_idx'), models.Index(fields=['band6', 'created_at'], name='fingerprint_band6_idx'), models.Index(fields=['band7', 'created_at'], name='fingerprint_band7_idx')],
+                'constraints': [models.UniqueConstraint(fields=('source_type', 'source_id'), name='fingerprint_unique_source')],
+            },
+        ),
+    ]
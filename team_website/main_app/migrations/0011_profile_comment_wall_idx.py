@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0010_user_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profilecomment',
+            index=models.Index(fields=['profile', '-created_at'], name='profile_comment_wall_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0011_profile_comment_wall_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_hash',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+    ]
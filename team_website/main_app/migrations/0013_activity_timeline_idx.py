@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0012_user_avatar_hash'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reaction',
+            name='reaction_user_recent_idx',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['author', 'created_at'], name='comment_author_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(fields=['user', 'created_at'], name='field_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['user', 'target_type', 'kind', 'created_at'], name='reaction_user_recent_idx'),
+        ),
+    ]
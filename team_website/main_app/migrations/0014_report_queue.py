@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0013_activity_timeline_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportQueueEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.CharField(choices=[('field', 'Карта'), ('comment', 'Комментарий')], max_length=16)),
+                ('target_id', models.PositiveIntegerField()),
+                ('reports', models.PositiveIntegerField(default=0)),
+                ('reporters', models.PositiveIntegerField(default=0)),
+                ('first_reported_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_reported_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('score', models.FloatField(default=0)),
+                ('is_resolved', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Элемент очереди жалоб',
+                'verbose_name_plural': 'Очередь жалоб',
+                'indexes': [models.Index(condition=models.Q(('is_resolved', False)), fields=['score'], name='report_queue_priority_idx')],
+                'constraints': [models.UniqueConstraint(fields=('target_type', 'target_id'), name='report_queue_unique_target')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0014_report_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BanCascade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('fields', 'Поля'), ('comments', 'Комментарии'), ('done', 'Завершено')], default='fields', max_length=16)),
+                ('last_id', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(blank=True, null=True)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('blocked', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ban_cascades', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Блокировка содержимого пользователя',
+                'verbose_name_plural': 'Блокировки содержимого пользователей',
+            },
+        ),
+    ]
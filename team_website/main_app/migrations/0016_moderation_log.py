@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0015_ban_cascade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('block', 'Блокировка'), ('unblock', 'Разблокировка'), ('ban', 'Бан'), ('report_approved', 'Жалобы одобрены'), ('report_rejected', 'Жалобы отклонены')], max_length=16)),
+                ('target_type', models.CharField(choices=[('field', 'Карта'), ('comment', 'Комментарий'), ('user', 'Пользователь')], max_length=16)),
+                ('target_id', models.PositiveIntegerField()),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='moderation_log', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Запись журнала модерации',
+                'verbose_name_plural': 'Журнал модерации',
+                'indexes': [models.Index(fields=['actor', 'created_at'], name='moderation_log_actor_idx'), models.Index(fields=['target_type', 'target_id', 'created_at'], name='moderation_log_target_idx'), models.Index(fields=['created_at'], name='moderation_log_recent_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def copy_reporters(apps, schema_editor):
+    """
+    Заполняет пожаловавшихся на поля и распределение причин в очереди по существующим жалобам.
+    """
+    Field = apps.get_model('main_app', 'Field')
+    FieldReport = apps.get_model('main_app', 'FieldReport')
+    ReportQueueEntry = apps.get_model('main_app', 'ReportQueueEntry')
+    Field.reporters.through.objects.bulk_create(
+        (Field.reporters.through(field_id=field_id, user_id=user_id)
+         for field_id, user_id in FieldReport.objects.filter(user__isnull=False).values_list(
+            'field_id', 'user_id').distinct().iterator()),
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+    reasons = {}
+    for field_id, reason, reports in FieldReport.objects.filter(is_resolved=False).values('field_id', 'reason').annotate(
+            reports=models.Count('id')).order_by().values_list('field_id', 'reason', 'reports'):
+        reasons.setdefault(field_id, {})[reason] = reports
+    entries = list(ReportQueueEntry.objects.filter(target_type='field', target_id__in=list(reasons)))
+    for entry in entries:
+        entry.reasons = reasons[entry.target_id]
+    ReportQueueEntry.objects.bulk_update(entries, ['reasons'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0016_moderation_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='field',
+            name='reporters',
+            field=models.ManyToManyField(blank=True, related_name='reported_fields', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='reportqueueentry',
+            name='reasons',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(copy_reporters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0017_report_aggregate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='wall',
+            name='field',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='walls', to='main_app.field'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_blocked', True)), fields=['created_at'], name='comment_blocked_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(condition=models.Q(('is_blocked', False)), fields=['created_at'], name='field_open_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(condition=models.Q(('is_blocked', True)), fields=['updated_at'], name='field_blocked_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fieldreport',
+            index=models.Index(fields=['status', 'created_at'], name='fieldreport_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fieldreport',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['field', 'user'], name='fieldreport_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wall',
+            index=models.Index(fields=['field', 'x', 'y', 'width', 'height'], name='wall_field_cells_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:29
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def count_reactions(apps, schema_editor):
+    """
+    Заполняет счётчики по существующим реакциям.
+    """
+    Reaction = apps.get_model('main_app', 'Reaction')
+    ReactionCount = apps.get_model('main_app', 'ReactionCount')
+    ReactionCount.objects.bulk_create(
+        (ReactionCount(target_type=target_type, target_id=target_id, kind=kind, count=total)
+         for target_type, target_id, kind, total in Reaction.objects.values(
+            'target_type', 'target_id', 'kind').annotate(total=models.Count('id')).order_by().values_list(
+            'target_type', 'target_id', 'kind', 'total').iterator()),
+        batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0018_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReactionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.CharField(choices=[('field', 'Карта'), ('comment', 'Комментарий')], max_length=16)),
+                ('target_id', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('like', 'Лайк'), ('favorite', 'Избранное')], max_length=16)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Количество реакций',
+                'verbose_name_plural': 'Количества реакций',
+                'constraints': [models.UniqueConstraint(fields=('target_type', 'target_id', 'kind'), name='reaction_count_unique_target')],
+            },
+        ),
+        migrations.RunPython(count_reactions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0019_reaction_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportcounter',
+            name='previous_reporters',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:42
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+BANDS = 4
+BAND_BITS = 16
+
+
+def split_bands(apps, schema_editor):
+    """
+    Пересчитывает полосы существующих отпечатков: четыре полосы по 16 бит.
+    """
+    TextFingerprint = apps.get_model('main_app', 'TextFingerprint')
+    mask = (1 << BAND_BITS) - 1
+    records = []
+    for record in TextFingerprint.objects.only('id', 'fingerprint').iterator(chunk_size=BATCH_SIZE):
+        value = record.fingerprint % (1 << 64)
+        for index in range(BANDS):
+            setattr(record, f'band{index}', (value >> (BAND_BITS * (BANDS - 1 - index))) & mask)
+        records.append(record)
+        if len(records) == BATCH_SIZE:
+            TextFingerprint.objects.bulk_update(records, [f'band{index}' for index in range(BANDS)])
+            records = []
+    TextFingerprint.objects.bulk_update(records, [f'band{index}' for index in range(BANDS)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0020_report_counter_sliding_window'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='textfingerprint',
+            name='fingerprint_band4_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='textfingerprint',
+            name='fingerprint_band5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='textfingerprint',
+            name='fingerprint_band6_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='textfingerprint',
+            name='fingerprint_band7_idx',
+        ),
+        migrations.RemoveField(
+            model_name='textfingerprint',
+            name='band4',
+        ),
+        migrations.RemoveField(
+            model_name='textfingerprint',
+            name='band5',
+        ),
+        migrations.RemoveField(
+            model_name='textfingerprint',
+            name='band6',
+        ),
+        migrations.RemoveField(
+            model_name='textfingerprint',
+            name='band7',
+        ),
+        migrations.AlterField(
+            model_name='textfingerprint',
+            name='band0',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='textfingerprint',
+            name='band1',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='textfingerprint',
+            name='band2',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='textfingerprint',
+            name='band3',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.RunPython(split_bands, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0021_fingerprint_wide_bands'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_author_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='field',
+            name='field_user_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='moderationlogentry',
+            name='moderation_log_actor_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='moderationlogentry',
+            name='moderation_log_target_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='moderationlogentry',
+            name='moderation_log_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='profilecomment',
+            name='profile_comment_wall_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reaction',
+            name='reaction_user_recent_idx',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['author', 'created_at', 'id'], name='comment_author_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='field',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='field_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moderationlogentry',
+            index=models.Index(fields=['actor', 'created_at', 'id'], name='moderation_log_actor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moderationlogentry',
+            index=models.Index(fields=['target_type', 'target_id', 'created_at', 'id'], name='moderation_log_target_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moderationlogentry',
+            index=models.Index(fields=['created_at', 'id'], name='moderation_log_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profilecomment',
+            index=models.Index(fields=['profile', '-created_at', '-id'], name='profile_comment_wall_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['user', 'target_type', 'kind', 'created_at', 'id'], name='reaction_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-19 19:54
+
+from django.db import migrations, models
+
+
+def resolve_duplicates(apps, schema_editor):
+    """
+    Оставляет открытой только первую нерассмотренную жалобу пользователя на поле.
+    """
+    FieldReport = apps.get_model('main_app', 'FieldReport')
+    first_ids = FieldReport.objects.filter(is_resolved=False, user__isnull=False).values(
+        'field_id', 'user_id').annotate(first_id=models.Min('id')).values('first_id')
+    FieldReport.objects.filter(is_resolved=False, user__isnull=False).exclude(id__in=first_ids).update(
+        is_resolved=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0022_cursor_seek_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='fieldreport',
+            name='fieldreport_open_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='fieldreport',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_resolved', False)), fields=('field', 'user'), name='fieldreport_open_unique'),
+        ),
+    ]
@@ -8,14 +8,27 @@
 :mod:`main_app.models`
 """
 
+import json
 import logging
-from typing import Optional, List, Tuple
-from django.db import models
+import math
+import threading
+from datetime import timedelta
+from typing import Any, Dict, Optional, List, Set, Tuple
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Q
+from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
+from django.core.paginator import Page, Paginator
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+from main_app import avatars, simhash
+from main_app.cursors import after, decode_cursor, encode_cursor
+from main_app.replay import DEFAULT_CHECKPOINT_INTERVAL, encode_trace, iter_states
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+
 class User(AbstractUser):
     """
     Модель пользователя, расширяющая базовую модель Django :class:`django.contrib.auth.models.AbstractUser`.
@@ -28,25 +41,80 @@ class User(AbstractUser):
     :type location: str
     :attribute avatar: Аватар пользователя, загружаемый в папку 'avatars/'.
     :type avatar: Optional[:class:`django.db.models.ImageField`]
+    :attribute avatar_hash: Хеш содержимого аватара, из которого строятся имена уменьшенных копий
+        (пустой, если копий ещё нет).
+    :type avatar_hash: str
     """
     birth_date = models.DateField(null=True, blank=True)
     bio = models.TextField(max_length=500, blank=True)
     location = models.CharField(max_length=100, blank=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    avatar_hash = models.CharField(max_length=avatars.HASH_LENGTH, blank=True, editable=False)
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Сохраняет пользователя и создаёт уменьшенные копии нового аватара.
+
+        :param args: Позиционные аргументы :meth:`django.db.models.Model.save`.
+        :type args: Any
+        :param kwargs: Именованные аргументы :meth:`django.db.models.Model.save`.
+        :type kwargs: Any
+        """
+        uploaded: bool = bool(self.avatar) and not self.avatar._committed
+        if uploaded or not self.avatar:
+            self.avatar_hash = ''
+        super().save(*args, **kwargs)
+        if uploaded:
+            self.build_avatar_thumbnails()
+
+    def build_avatar_thumbnails(self) -> bool:
+        """
+        Создаёт недостающие уменьшенные копии аватара и запоминает хеш его содержимого.
+
+        :returns: ``True``, если копии готовы, иначе ``False`` (аватара нет или он не читается).
+        :rtype: bool
+        """
+        if not self.avatar:
+            return False
+        try:
+            digest: str = avatars.generate(self.avatar)
+        except (OSError, ValueError) as e:
+            logger.error("Ошибка создания копий аватара User %s: %s", self.id, str(e))
+            return False
+        if digest != self.avatar_hash:
+            User.objects.filter(pk=self.pk).update(avatar_hash=digest)
+            self.avatar_hash = digest
+        return True
+
+    @property
+    def avatar_thumbnails(self) -> Dict[str, Dict[str, str]]:
+        """
+        Возвращает адреса уменьшенных копий аватара, создавая их при первом обращении.
+
+        :returns: Адреса по размерам и форматам (см. :func:`main_app.avatars.urls`)
+            или пустой словарь, если копий нет.
+        :rtype: Dict[str, Dict[str, str]]
+        """
+        if not self.avatar or (not self.avatar_hash and not self.build_avatar_thumbnails()):
+            return {}
+        return avatars.urls(self.avatar_hash)
 
     def safe_ban(self) -> bool:
         """
-        Безопасно блокирует пользователя, деактивируя аккаунт и блокируя связанные поля и комментарии.
+        Безопасно блокирует пользователя: сразу деактивирует аккаунт и ставит в очередь
+        блокировку его полей и комментариев (см. :class:`main_app.models.BanCascade`).
 
         :returns: ``True``, если блокировка успешна, иначе ``False``.
         :rtype: bool
         :raises Exception: Если происходит ошибка при сохранении изменений.
         """
         try:
-            self.is_active = False
-            self.save(update_fields=['is_active'])
-            Field.objects.filter(user=self).update(is_blocked=True)
-            Comment.objects.filter(author=self).update(is_blocked=True)
+            with transaction.atomic():
+                self.is_active = False
+                self.save(update_fields=['is_active'])
+                cascade: BanCascade = BanCascade.schedule(self)
+            if settings.BAN_CASCADE_BACKGROUND:
+                transaction.on_commit(lambda: BanCascade.start(cascade.pk))
             return True
         except Exception as e:
             logger.error("Ошибка бана User %s: %s", self.id, str(e))
@@ -85,8 +153,34 @@ class ProfileComment(models.Model):
 
         :attribute ordering: Сортировка по убыванию даты создания.
         :type ordering: List[str]
+        :attribute indexes: Индекс для постраничного вывода стены профиля.
+        :type indexes: List[:class:`django.db.models.Index`]
         """
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['profile', '-created_at', '-id'], name='profile_comment_wall_idx'),
+        ]
+
+    @classmethod
+    def wall(cls, profile_id: int, cursor: str = '') -> Tuple[List['ProfileComment'], Optional[str]]:
+        """
+        Возвращает страницу комментариев к профилю, начиная с последних.
+
+        :param profile_id: ID пользователя, к профилю которого относятся комментарии.
+        :type profile_id: int
+        :param cursor: Курсор из предыдущей страницы (пустой для первой).
+        :type cursor: str
+        :returns: Комментарии страницы с загруженными авторами и курсор следующей страницы.
+        :rtype: Tuple[List[:class:`main_app.models.ProfileComment`], Optional[str]]
+        :raises ValueError: Если курсор некорректен.
+        """
+        size: int = settings.PROFILE_COMMENTS_PER_PAGE
+        comments: List[ProfileComment] = list(cls.objects.filter(
+            after(decode_cursor(cursor) if cursor else None), profile_id=profile_id).select_related(
+            'author').order_by('-created_at', '-id')[:size + 1])
+        if len(comments) <= size:
+            return comments, None
+        return comments[:size], encode_cursor(comments[size - 1].created_at, comments[size - 1].id)
 
     def __str__(self) -> str:
         """
@@ -150,10 +244,6 @@ class Field(models.Model):
     :type created_at: :class:`django.db.models.DateTimeField`
     :attribute updated_at: Дата и время последнего обновления поля.
     :type updated_at: :class:`django.db.models.DateTimeField`
-    :attribute likes: Пользователи, лайкнувшие поле.
-    :type likes: :class:`django.db.models.ManyToManyField`
-    :attribute favorites: Пользователи, добавившие поле в избранное.
-    :type favorites: :class:`django.db.models.ManyToManyField`
     :attribute is_blocked: Флаг, указывающий, заблокировано ли поле.
     :type is_blocked: bool
     :attribute cols: Количество столбцов в поле (по умолчанию 10).
@@ -162,32 +252,58 @@ class Field(models.Model):
     :type rows: int
     :attribute file: Связанный файл (если есть).
     :type file: Optional[:class:`main_app.models.FieldFile`]
+    :attribute reporters: Пользователи, жаловавшиеся на поле; каждый учитывается один раз.
+    :type reporters: :class:`django.db.models.ManyToManyField`
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    likes = models.ManyToManyField(User, related_name='liked_cards', blank=True)
-    favorites = models.ManyToManyField(User, related_name='favorited_cards', blank=True)
     is_blocked = models.BooleanField(default=False, verbose_name="Заблокировано")
     cols = models.IntegerField(default=10)
     rows = models.IntegerField(default=10)
     file = models.OneToOneField(FieldFile, on_delete=models.SET_NULL, null=True, blank=True)
+    reporters = models.ManyToManyField(User, related_name='reported_fields', blank=True)
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Сохраняет поле; создание нового поля учитывается в статистике автора.
+        """
+        adding: bool = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                UserStats.bump(self.user_id, fields_created=1)
 
     def block(self) -> None:
         """
         Блокирует поле, устанавливая флаг ``is_blocked`` в ``True``.
         """
         self.is_blocked = True
-        self.save()
+        self.save(update_fields=['is_blocked', 'updated_at'])
 
     def unblock(self) -> None:
         """
         Разблокирует поле, устанавливая флаг ``is_blocked`` в ``False``.
         """
         self.is_blocked = False
-        self.save()
+        self.save(update_fields=['is_blocked', 'updated_at'])
+
+    def safe_block(self) -> bool:
+        """
+        Безопасно блокирует поле, обновляя только поля ``is_blocked`` и ``updated_at``.
+
+        :returns: ``True``, если блокировка успешна, иначе ``False``.
+        :rtype: bool
+        :raises Exception: Если происходит ошибка при сохранении изменений.
+        """
+        try:
+            self.block()
+            return True
+        except Exception as e:
+            logger.error("Ошибка блокировки Field %s: %s", self.id, str(e))
+            return False
 
     def safe_unblock(self) -> bool:
         """
@@ -205,6 +321,28 @@ class Field(models.Model):
             logger.error("Ошибка разблокировки Field %s: %s", self.id, str(e))
             return False
 
+    def toggle_like(self, user: User) -> Tuple[bool, int]:
+        """
+        Ставит или снимает лайк пользователя.
+
+        :param user: Пользователь.
+        :type user: :class:`main_app.models.User`
+        :returns: Стоит ли теперь лайк и количество лайков.
+        :rtype: Tuple[bool, int]
+        """
+        return Reaction.toggle(Reaction.FIELD, self.pk, user, Reaction.LIKE)
+
+    def toggle_favorite(self, user: User) -> Tuple[bool, int]:
+        """
+        Добавляет поле в избранное пользователя или убирает из него.
+
+        :param user: Пользователь.
+        :type user: :class:`main_app.models.User`
+        :returns: Находится ли теперь поле в избранном и количество добавивших.
+        :rtype: Tuple[bool, int]
+        """
+        return Reaction.toggle(Reaction.FIELD, self.pk, user, Reaction.FAVORITE)
+
     def get_absolute_url(self) -> str:
         """
         Возвращает абсолютный URL для поля.
@@ -225,12 +363,23 @@ class Field(models.Model):
         :type verbose_name_plural: str
         :attribute permissions: Разрешения для модели.
         :type permissions: List[Tuple[str, str]]
+        :attribute indexes: Индекс для выборки полей пользователя в порядке создания и частичные
+            индексы для списка открытых полей в порядке создания и списка заблокированных полей
+            в порядке изменения. Django записывает ``is_blocked=False`` как ``NOT is_blocked``,
+            и SQLite не использует такое условие для составного индекса, а частичный индекс
+            с тем же условием читается в нужном порядке без сортировки.
+        :type indexes: List[:class:`django.db.models.Index`]
         """
         verbose_name = "Карта"
         verbose_name_plural = "Карты"
         permissions = [
             ("can_view_blocked", "Может просматривать заблокированные карты"),
         ]
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='field_user_recent_idx'),
+            models.Index(fields=['created_at'], condition=Q(is_blocked=False), name='field_open_recent_idx'),
+            models.Index(fields=['updated_at'], condition=Q(is_blocked=True), name='field_blocked_recent_idx'),
+        ]
 
     def __str__(self) -> str:
         """
@@ -294,13 +443,25 @@ class Wall(models.Model):
     :attribute created_by: Пользователь, создавший стену.
     :type created_by: :class:`main_app.models.User`
     """
-    field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='walls')
+    field = models.ForeignKey(Field, on_delete=models.CASCADE, db_index=False, related_name='walls')
     x = models.IntegerField()
     y = models.IntegerField()
     width = models.IntegerField(default=1)
     height = models.IntegerField(default=1)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute indexes: Покрывающий индекс для загрузки стен поля: координаты и размеры
+            читаются из индекса без обращения к таблице. Он же заменяет индекс внешнего ключа.
+        :type indexes: List[:class:`django.db.models.Index`]
+        """
+        indexes = [
+            models.Index(fields=['field', 'x', 'y', 'width', 'height'], name='wall_field_cells_idx'),
+        ]
+
     def __str__(self) -> str:
         """
         Возвращает строковое представление стены.
@@ -322,34 +483,132 @@ class Comment(models.Model):
     :type text: str
     :attribute created_at: Дата и время создания комментария.
     :type created_at: :class:`django.db.models.DateTimeField`
-    :attribute likes: Пользователи, лайкнувшие комментарий.
-    :type likes: :class:`django.db.models.ManyToManyField`
     :attribute reports: Пользователи, сообщившие о нарушении.
     :type reports: :class:`django.db.models.ManyToManyField`
     :attribute is_blocked: Флаг, указывающий, заблокирован ли комментарий.
     :type is_blocked: bool
+    :attribute parent: Комментарий, на который дан ответ (``None`` для начала ветки).
+    :type parent: Optional[:class:`main_app.models.Comment`]
+    :attribute path: Материализованный путь: ID предков и самого комментария в base36
+        фиксированной ширины через ``/``. Лексикографический порядок путей совпадает
+        с порядком обхода дерева, поэтому поддерево — один диапазон индекса.
+    :type path: str
+    :attribute depth: Глубина вложенности (0 для начала ветки).
+    :type depth: int
     """
+    PATH_SEGMENT_WIDTH = 8
+    PATH_SEPARATOR = '/'
+    PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
     field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    likes = models.ManyToManyField(User, related_name='liked_comments', blank=True)
     reports = models.ManyToManyField(User, related_name='reported_comments', blank=True)
     is_blocked = models.BooleanField(default=False, verbose_name="Заблокировано")
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    path = models.CharField(max_length=255, blank=True, default='')
+    depth = models.PositiveSmallIntegerField(default=0)
+
+    @classmethod
+    def path_segment(cls, pk: int) -> str:
+        """
+        Кодирует ID комментария в сегмент пути фиксированной ширины.
+
+        :param pk: ID комментария.
+        :type pk: int
+        :returns: ID в base36, дополненный нулями слева.
+        :rtype: str
+        """
+        digits: List[str] = []
+        while pk:
+            pk, digit = divmod(pk, len(cls.PATH_DIGITS))
+            digits.append(cls.PATH_DIGITS[digit])
+        return ''.join(reversed(digits)).rjust(cls.PATH_SEGMENT_WIDTH, '0')
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Сохраняет комментарий, вычисляя глубину и материализованный путь нового ответа;
+        создание комментария учитывается в статистике автора.
+
+        :raises ValidationError: Если родитель относится к другому полю или превышена
+            глубина ``COMMENT_MAX_DEPTH``.
+        """
+        if self.pk is None and self.parent_id is not None:
+            if self.parent.field_id != self.field_id:
+                raise ValidationError('Ответ должен относиться к тому же полю')
+            self.depth = self.parent.depth + 1
+            if self.depth > settings.COMMENT_MAX_DEPTH:
+                raise ValidationError('Превышена максимальная глубина ответов')
+        adding: bool = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                UserStats.bump(self.author_id, comments_written=1)
+            if not self.path:
+                prefix: str = self.parent.path + self.PATH_SEPARATOR if self.parent_id is not None else ''
+                self.path = prefix + self.path_segment(self.pk)
+                Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+    def subtree(self) -> 'models.QuerySet[Comment]':
+        """
+        Возвращает комментарий со всеми ответами в порядке отображения.
+
+        :returns: Набор комментариев, отсортированный по пути.
+        :rtype: :class:`django.db.models.QuerySet`[:class:`main_app.models.Comment`]
+        """
+        return Comment.objects.filter(field_id=self.field_id, path__gte=self.path,
+                                      path__lt=self.path + '0').order_by('path')
+
+    @classmethod
+    def threads(cls, field: Field, page_number: Any = 1) -> Tuple[Page, List['Comment']]:
+        """
+        Возвращает страницу веток комментариев поля вместе со всеми ответами.
+
+        Ветки идут от новых к старым, ответы внутри ветки — в порядке дерева.
+        Ответы всех веток страницы загружаются одним запросом по диапазону путей;
+        заблокированные комментарии скрываются вместе с ответами на них.
+
+        :param field: Поле.
+        :type field: :class:`main_app.models.Field`
+        :param page_number: Номер страницы веток.
+        :type page_number: Any
+        :returns: Страница начальных комментариев и плоский список комментариев для отображения.
+        :rtype: Tuple[:class:`django.core.paginator.Page`, List[:class:`main_app.models.Comment`]]
+        """
+        roots = cls.objects.filter(field=field, depth=0, is_blocked=False).order_by('-created_at', '-id')
+        page: Page = Paginator(roots, settings.COMMENT_THREADS_PER_PAGE).get_page(page_number)
+        paths: List[str] = [root.path for root in page.object_list]
+        if not paths:
+            return page, []
+        threads: Dict[str, List[Comment]] = {path: [] for path in paths}
+        hidden: Set[str] = set()
+        rows = cls.objects.filter(field=field, path__gte=min(paths), path__lt=max(paths) + '0').select_related(
+            'author').order_by('path')
+        for comment in rows:
+            segments: List[str] = comment.path.split(cls.PATH_SEPARATOR)
+            ancestors: List[str] = [cls.PATH_SEPARATOR.join(segments[:size]) for size in range(1, len(segments))]
+            if segments[0] not in threads or any(ancestor in hidden for ancestor in ancestors):
+                continue
+            if comment.is_blocked:
+                hidden.add(comment.path)
+                continue
+            threads[segments[0]].append(comment)
+        return page, [comment for path in paths for comment in threads[path]]
 
     def block(self) -> None:
         """
         Блокирует комментарий, устанавливая флаг ``is_blocked`` в ``True``.
         """
         self.is_blocked = True
-        self.save()
+        self.save(update_fields=['is_blocked'])
 
     def unblock(self) -> None:
         """
         Разблокирует комментарий, устанавливая флаг ``is_blocked`` в ``False``.
         """
         self.is_blocked = False
-        self.save()
+        self.save(update_fields=['is_blocked'])
 
     def safe_block(self) -> bool:
         """
@@ -367,6 +626,50 @@ class Comment(models.Model):
             logger.error("Ошибка блокировки Comment %s: %s", self.id, str(e))
             return False
 
+    def safe_unblock(self) -> bool:
+        """
+        Безопасно разблокирует комментарий, обновляя только поле ``is_blocked``.
+
+        :returns: ``True``, если разблокировка успешна, иначе ``False``.
+        :rtype: bool
+        :raises Exception: Если происходит ошибка при сохранении изменений.
+        """
+        try:
+            self.unblock()
+            return True
+        except Exception as e:
+            logger.error("Ошибка разблокировки Comment %s: %s", self.id, str(e))
+            return False
+
+    def toggle_like(self, user: User) -> Tuple[bool, int]:
+        """
+        Ставит или снимает лайк пользователя.
+
+        :param user: Пользователь.
+        :type user: :class:`main_app.models.User`
+        :returns: Стоит ли теперь лайк и количество лайков.
+        :rtype: Tuple[bool, int]
+        """
+        return Reaction.toggle(Reaction.COMMENT, self.pk, user, Reaction.LIKE)
+
+    def add_report(self, user: User) -> int:
+        """
+        Добавляет жалобу пользователя, если он ещё не жаловался.
+
+        Жалоба учитывается очередью модерации и счётчиком автомодерации
+        (см. :meth:`main_app.models.ReportQueueEntry.submit`); количество жалоб
+        берётся из элемента очереди.
+
+        :param user: Пользователь.
+        :type user: :class:`main_app.models.User`
+        :returns: Количество жалоб.
+        :rtype: int
+        """
+        entry: Optional[ReportQueueEntry] = ReportQueueEntry.submit(Reaction.COMMENT, self.pk, user)
+        if entry is None:
+            entry = ReportQueueEntry.objects.filter(target_type=Reaction.COMMENT, target_id=self.pk).first()
+        return entry.reports if entry is not None else self.reports.count()
+
     class Meta:
         """
         Мета-данные для модели.
@@ -377,10 +680,19 @@ class Comment(models.Model):
         :type verbose_name: str
         :attribute verbose_name_plural: Название модели во множественном числе.
         :type verbose_name_plural: str
+        :attribute indexes: Индексы для выборки поддеревьев, страниц веток и комментариев автора
+            и частичный индекс для списка заблокированных комментариев в порядке создания.
+        :type indexes: List[:class:`django.db.models.Index`]
         """
         ordering = ['-created_at']
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(fields=['field', 'path'], name='comment_field_path_idx'),
+            models.Index(fields=['field', 'depth', '-created_at'], name='comment_field_roots_idx'),
+            models.Index(fields=['author', 'created_at', 'id'], name='comment_author_recent_idx'),
+            models.Index(fields=['created_at'], condition=Q(is_blocked=True), name='comment_blocked_recent_idx'),
+        ]
 
     def __str__(self) -> str:
         """
@@ -398,7 +710,7 @@ class Comment(models.Model):
         :returns: Количество лайков.
         :rtype: int
         """
-        return self.likes.count()
+        return ReactionCount.get(Reaction.COMMENT, self.pk, Reaction.LIKE)
 
     def reports_count(self) -> int:
         """
@@ -409,104 +721,315 @@ class Comment(models.Model):
         """
         return self.reports.count()
 
-class LikeField(models.Model):
+class Reaction(models.Model):
     """
-    Модель лайка для поля.
-
-    :attribute user: Пользователь, поставивший лайк.
+    Модель реакции пользователя (лайка или избранного) на поле или комментарий.
+
+    Все реакции хранятся в одной таблице. Уникальное ограничение
+    (тип цели, цель, вид, пользователь) служит индексом для проверок и подсчёта,
+    составные индексы по времени — для выборок «последние лайки поля»,
+    «лайки с момента» и списков профиля. Цель задаётся типом и ID без внешнего
+    ключа; реакции удалённых объектов отсекаются соединением с их таблицей.
+
+    :attribute target_type: Тип объекта реакции (``field`` или ``comment``).
+    :type target_type: str
+    :attribute target_id: ID объекта реакции.
+    :type target_id: int
+    :attribute user: Пользователь, поставивший реакцию.
     :type user: :class:`main_app.models.User`
-    :attribute field: Поле, к которому относится лайк.
-    :type field: :class:`main_app.models.Field`
-    :attribute created_at: Дата и время создания лайка.
+    :attribute kind: Вид реакции (``like`` или ``favorite``).
+    :type kind: str
+    :attribute created_at: Дата и время реакции.
     :type created_at: :class:`django.db.models.DateTimeField`
     """
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    field = models.ForeignKey(Field, on_delete=models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add=True)
+    FIELD = 'field'
+    COMMENT = 'comment'
+    TARGET_TYPES = [
+        (FIELD, 'Карта'),
+        (COMMENT, 'Комментарий'),
+    ]
+    LIKE = 'like'
+    FAVORITE = 'favorite'
+    KINDS = [
+        (LIKE, 'Лайк'),
+        (FAVORITE, 'Избранное'),
+    ]
+
+    target_type = models.CharField(max_length=16, choices=TARGET_TYPES)
+    target_id = models.PositiveIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reactions', db_index=False)
+    kind = models.CharField(max_length=16, choices=KINDS)
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         """
         Мета-данные для модели.
 
-        :attribute unique_together: Уникальность комбинации полей.
-        :type unique_together: Tuple[str, str]
+        :attribute constraints: Одна реакция каждого вида от пользователя на объект.
+        :type constraints: List[:class:`django.db.models.UniqueConstraint`]
+        :attribute indexes: Индексы для выборок по объекту и по пользователю в порядке времени.
+        :type indexes: List[:class:`django.db.models.Index`]
         """
-        unique_together = ('user', 'field')
+        verbose_name = "Реакция"
+        verbose_name_plural = "Реакции"
+        constraints = [
+            models.UniqueConstraint(fields=['target_type', 'target_id', 'kind', 'user'],
+                                    name='reaction_unique_target_user'),
+        ]
+        indexes = [
+            models.Index(fields=['target_type', 'target_id', 'kind', '-created_at'],
+                         name='reaction_target_recent_idx'),
+            models.Index(fields=['user', 'target_type', 'kind', 'created_at', 'id'],
+                         name='reaction_user_recent_idx'),
+        ]
 
-    def __str__(self) -> str:
+    @classmethod
+    def for_target(cls, target_type: str, target_id: int, kind: str) -> 'models.QuerySet[Reaction]':
         """
-        Возвращает строковое представление лайка.
-
-        :returns: Описание лайка с пользователем и названием поля.
-        :rtype: str
+        Возвращает реакции на объект, начиная с последних.
+
+        :param target_type: Тип объекта.
+        :type target_type: str
+        :param target_id: ID объекта.
+        :type target_id: int
+        :param kind: Вид реакции.
+        :type kind: str
+        :returns: Набор реакций.
+        :rtype: :class:`django.db.models.QuerySet`[:class:`main_app.models.Reaction`]
         """
-        return f"Like by {self.user.username} on {self.field.title}"
-
-class FavoriteField(models.Model):
-    """
-    Модель избранного для поля.
+        return cls.objects.filter(target_type=target_type, target_id=target_id, kind=kind).order_by('-created_at')
 
-    :attribute user: Пользователь, добавивший поле в избранное.
-    :type user: :class:`main_app.models.User`
-    :attribute field: Поле, добавленное в избранное.
-    :type field: :class:`main_app.models.Field`
-    :attribute created_at: Дата и время добавления в избранное.
-    :type created_at: :class:`django.db.models.DateTimeField`
-    """
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    field = models.ForeignKey(Field, on_delete=models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add=True)
+    @classmethod
+    def since(cls, target_type: str, target_id: int, kind: str, moment: Any) -> 'models.QuerySet[Reaction]':
+        """
+        Возвращает реакции на объект, поставленные не раньше указанного момента.
+
+        :param target_type: Тип объекта.
+        :type target_type: str
+        :param target_id: ID объекта.
+        :type target_id: int
+        :param kind: Вид реакции.
+        :type kind: str
+        :param moment: Начало интервала.
+        :type moment: :class:`datetime.datetime`
+        :returns: Набор реакций.
+        :rtype: :class:`django.db.models.QuerySet`[:class:`main_app.models.Reaction`]
+        """
+        return cls.for_target(target_type, target_id, kind).filter(created_at__gte=moment)
 
-    class Meta:
+    @classmethod
+    def target_ids(cls, user: User, target_type: str, kind: str) -> 'models.QuerySet[int]':
         """
-        Мета-данные для модели.
+        Возвращает ID объектов, на которые пользователь поставил реакцию, начиная с последних.
+
+        :param user: Пользователь.
+        :type user: :class:`main_app.models.User`
+        :param target_type: Тип объекта.
+        :type target_type: str
+        :param kind: Вид реакции.
+        :type kind: str
+        :returns: Набор ID объектов.
+        :rtype: :class:`django.db.models.QuerySet`[int]
+        """
+        return cls.objects.filter(user=user, target_type=target_type, kind=kind).order_by(
+            '-created_at').values_list('target_id', flat=True)
 
-        :attribute unique_together: Уникальность комбинации полей.
-        :type unique_together: Tuple[str, str]
+    @classmethod
+    def toggle(cls, target_type: str, target_id: int, user: User, kind: str) -> Tuple[bool, int]:
         """
-        unique_together = ('user', 'field')
+        Ставит или снимает реакцию пользователя.
+
+        Удаляется строка по уникальному индексу; если удалять было нечего,
+        строка вставляется. Счётчик объекта (:class:`ReactionCount`) и
+        статистика пользователей обновляются в той же транзакции на фактическое
+        изменение, количество читается из счётчика.
+
+        :param target_type: Тип объекта.
+        :type target_type: str
+        :param target_id: ID объекта.
+        :type target_id: int
+        :param user: Пользователь.
+        :type user: :class:`main_app.models.User`
+        :param kind: Вид реакции.
+        :type kind: str
+        :returns: Новое состояние реакции и количество реакций на объект.
+        :rtype: Tuple[bool, int]
+        """
+        lookup: Dict[str, Any] = {'target_type': target_type, 'target_id': target_id, 'kind': kind}
+        with transaction.atomic():
+            deleted, _ = cls.objects.filter(user=user, **lookup).delete()
+            if not deleted:
+                cls.objects.bulk_create([cls(user=user, **lookup)], ignore_conflicts=True)
+            delta: int = -1 if deleted else 1
+            if kind == cls.LIKE:
+                UserStats.bump_owner(target_type, target_id, likes_received=delta)
+            else:
+                UserStats.bump(user.pk, favorites=delta)
+            count: int = ReactionCount.bump(target_type, target_id, kind, delta)
+        return not deleted, count
 
     def __str__(self) -> str:
         """
-        Возвращает строковое представление избранного.
+        Возвращает строковое представление реакции.
 
-        :returns: Описание избранного с пользователем и названием поля.
+        :returns: Описание реакции с пользователем и объектом.
         :rtype: str
         """
-        return f"Favorite by {self.user.username} on {self.field.title}"
+        return f"{self.get_kind_display()} от {self.user.username} на {self.target_type} {self.target_id}"
 
-class LikeComment(models.Model):
-    """
-    Модель лайка для комментария.
 
-    :attribute user: Пользователь, поставивший лайк.
-    :type user: :class:`main_app.models.User`
-    :attribute comment: Комментарий, к которому относится лайк.
-    :type comment: :class:`main_app.models.Comment`
-    :attribute created_at: Дата и время создания лайка.
-    :type created_at: :class:`django.db.models.DateTimeField`
+class ReactionCount(models.Model):
     """
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    comment = models.ForeignKey(Comment, on_delete=models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add=True)
+    Денормализованное количество реакций каждого вида на объект.
+
+    Счётчик меняется выражением ``F('count') + delta`` в транзакции, которая
+    вставляет или удаляет реакцию (:meth:`Reaction.toggle` и запись буфера
+    :func:`main_app.reactions.flush`), поэтому чтение количества — одна строка
+    по уникальному индексу вместо подсчёта реакций. Каскадные удаления реакций
+    вместе с пользователями счётчик не меняют — расхождения исправляет
+    :meth:`reconcile` (команда ``reconcile_reaction_counts``).
+
+    :attribute target_type: Тип объекта (``field`` или ``comment``).
+    :type target_type: str
+    :attribute target_id: ID объекта.
+    :type target_id: int
+    :attribute kind: Вид реакции (``like`` или ``favorite``).
+    :type kind: str
+    :attribute count: Количество реакций.
+    :type count: int
+    """
+    target_type = models.CharField(max_length=16, choices=Reaction.TARGET_TYPES)
+    target_id = models.PositiveIntegerField()
+    kind = models.CharField(max_length=16, choices=Reaction.KINDS)
+    count = models.IntegerField(default=0)
 
     class Meta:
         """
         Мета-данные для модели.
 
-        :attribute unique_together: Уникальность комбинации полей.
-        :type unique_together: Tuple[str, str]
+        :attribute constraints: Один счётчик каждого вида на объект.
+        :type constraints: List[:class:`django.db.models.UniqueConstraint`]
+        """
+        verbose_name = "Количество реакций"
+        verbose_name_plural = "Количества реакций"
+        constraints = [
+            models.UniqueConstraint(fields=['target_type', 'target_id', 'kind'], name='reaction_count_unique_target'),
+        ]
+
+    @classmethod
+    def bump(cls, target_type: str, target_id: int, kind: str, delta: int) -> int:
+        """
+        Изменяет счётчик объекта и возвращает новое значение.
+
+        Вызывается внутри транзакции, изменяющей реакции. Строка счётчика
+        создаётся при первой реакции на объект.
+
+        :param target_type: Тип объекта.
+        :type target_type: str
+        :param target_id: ID объекта.
+        :type target_id: int
+        :param kind: Вид реакции.
+        :type kind: str
+        :param delta: Изменение количества.
+        :type delta: int
+        :returns: Количество реакций после изменения.
+        :rtype: int
+        """
+        counter = cls.objects.filter(target_type=target_type, target_id=target_id, kind=kind)
+        if not counter.update(count=models.F('count') + delta):
+            cls.objects.bulk_create([cls(target_type=target_type, target_id=target_id, kind=kind)],
+                                    ignore_conflicts=True)
+            counter.update(count=models.F('count') + delta)
+        return counter.values_list('count', flat=True).get()
+
+    @classmethod
+    def bump_many(cls, target_type: str, kind: str, deltas: Dict[int, int]) -> None:
+        """
+        Изменяет счётчики нескольких объектов одного типа.
+
+        :param target_type: Тип объектов.
+        :type target_type: str
+        :param kind: Вид реакции.
+        :type kind: str
+        :param deltas: Изменение количества для каждого ID объекта.
+        :type deltas: Dict[int, int]
+        """
+        deltas = {target_id: delta for target_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        cls.objects.bulk_create([cls(target_type=target_type, target_id=target_id, kind=kind) for target_id in deltas],
+                                ignore_conflicts=True)
+        for target_id, delta in deltas.items():
+            cls.objects.filter(target_type=target_type, target_id=target_id, kind=kind).update(
+                count=models.F('count') + delta)
+
+    @classmethod
+    def counts(cls, target_type: str, target_ids: List[int], kinds: Tuple[str, ...]) -> Dict[Tuple[int, str], int]:
+        """
+        Возвращает количества реакций для набора объектов одним запросом.
+
+        :param target_type: Тип объектов.
+        :type target_type: str
+        :param target_ids: ID объектов.
+        :type target_ids: List[int]
+        :param kinds: Виды реакций.
+        :type kinds: Tuple[str, ...]
+        :returns: Количество для каждой пары (ID объекта, вид); отсутствующие пары равны нулю.
+        :rtype: Dict[Tuple[int, str], int]
+        """
+        return {(target_id, kind): count for target_id, kind, count in cls.objects.filter(
+            target_type=target_type, target_id__in=target_ids, kind__in=kinds).values_list(
+            'target_id', 'kind', 'count')}
+
+    @classmethod
+    def get(cls, target_type: str, target_id: int, kind: str) -> int:
+        """
+        Возвращает количество реакций на объект.
+
+        :param target_type: Тип объекта.
+        :type target_type: str
+        :param target_id: ID объекта.
+        :type target_id: int
+        :param kind: Вид реакции.
+        :type kind: str
+        :returns: Количество реакций.
+        :rtype: int
+        """
+        return cls.counts(target_type, [target_id], (kind,)).get((target_id, kind), 0)
+
+    @classmethod
+    def reconcile(cls) -> int:
+        """
+        Пересчитывает счётчики по таблице реакций и исправляет расхождения.
+
+        :returns: Количество исправленных строк.
+        :rtype: int
         """
-        unique_together = ('user', 'comment')
+        expected: Dict[Tuple[str, int, str], int] = {
+            (row['target_type'], row['target_id'], row['kind']): row['total']
+            for row in Reaction.objects.values('target_type', 'target_id', 'kind').annotate(
+                total=models.Count('id')).order_by()}
+        stored: Dict[Tuple[str, int, str], int] = {
+            (target_type, target_id, kind): count
+            for target_type, target_id, kind, count in cls.objects.values_list(
+                'target_type', 'target_id', 'kind', 'count')}
+        wrong: Dict[Tuple[str, int, str], int] = {key: expected.get(key, 0) for key in expected.keys() | stored.keys()
+                                                   if expected.get(key, 0) != stored.get(key)}
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(target_type=target_type, target_id=target_id, kind=kind, count=count)
+                 for (target_type, target_id, kind), count in wrong.items()],
+                update_conflicts=True, unique_fields=['target_type', 'target_id', 'kind'], update_fields=['count'])
+        return len(wrong)
 
     def __str__(self) -> str:
         """
-        Возвращает строковое представление лайка комментария.
+        Возвращает строковое представление счётчика.
 
-        :returns: Описание лайка с пользователем и ID комментария.
+        :returns: Описание счётчика с объектом и количеством.
         :rtype: str
         """
-        return f"Like by {self.user.username} on comment {self.comment.id}"
+        return f"{self.get_kind_display()}: {self.target_type} {self.target_id} — {self.count}"
 
 class ReportComment(models.Model):
     """
@@ -547,5 +1070,1679 @@ class FieldReport(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_resolved = models.BooleanField(default=False)
 
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute constraints: Одна нерассмотренная жалоба пользователя на поле. Частичный
+            уникальный индекс отсекает повторную жалобу при вставке, без предварительной проверки,
+            и служит для закрытия жалоб на поле и пересборки очереди.
+        :type constraints: List[:class:`django.db.models.UniqueConstraint`]
+        :attribute indexes: Индекс по статусу для списков жалоб на рассмотрении.
+        :type indexes: List[:class:`django.db.models.Index`]
+        """
+        constraints = [
+            models.UniqueConstraint(fields=['field', 'user'], condition=Q(is_resolved=False),
+                                    name='fieldreport_open_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='fieldreport_status_idx'),
+        ]
+
     def __str__(self):
         return f"Жалоба на {self.field.title} ({self.get_reason_display()})"
+
+
+class ReportCounter(models.Model):
+    """
+    Счётчик жалоб на объект в скользящем окне автомодерации.
+
+    Счётчик обновляется на каждой жалобе нового пользователя и никогда не
+    пересчитывается по таблицам жалоб. Как и лимиты запросов
+    (:mod:`main_app.ratelimit`), скользящее окно приближается двумя
+    фиксированными: жалобы текущего окна учитываются полностью, а жалобы
+    предыдущего — с весом, равным доле, ещё не вышедшей из скользящего окна,
+    поэтому всплеск жалоб на границе окон не обнуляется. Окна идут подряд
+    от первой жалобы. Пороги задаются настройкой ``AUTO_MODERATION_RULES``
+    для каждого типа объекта.
+
+    :attribute target_type: Тип объекта (``field`` или ``comment``).
+    :type target_type: str
+    :attribute target_id: ID объекта.
+    :type target_id: int
+    :attribute window_start: Начало текущего окна.
+    :type window_start: :class:`django.db.models.DateTimeField`
+    :attribute reporters: Количество разных пользователей, пожаловавшихся в текущем окне.
+    :type reporters: int
+    :attribute previous_reporters: Количество пожаловавшихся в предыдущем окне.
+    :type previous_reporters: int
+    :attribute auto_hidden: Скрыт ли объект автомодерацией.
+    :type auto_hidden: bool
+    """
+    target_type = models.CharField(max_length=16, choices=Reaction.TARGET_TYPES)
+    target_id = models.PositiveIntegerField()
+    window_start = models.DateTimeField(default=timezone.now)
+    reporters = models.PositiveIntegerField(default=0)
+    previous_reporters = models.PositiveIntegerField(default=0)
+    auto_hidden = models.BooleanField(default=False)
+
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute constraints: Один счётчик на объект.
+        :type constraints: List[:class:`django.db.models.UniqueConstraint`]
+        """
+        verbose_name = "Счётчик жалоб"
+        verbose_name_plural = "Счётчики жалоб"
+        constraints = [
+            models.UniqueConstraint(fields=['target_type', 'target_id'], name='report_counter_unique_target'),
+        ]
+
+    @staticmethod
+    def target_model(target_type: str) -> Any:
+        """
+        Возвращает модель объекта по его типу.
+
+        :param target_type: Тип объекта.
+        :type target_type: str
+        :returns: Класс модели.
+        :rtype: Type[:class:`django.db.models.Model`]
+        :raises KeyError: Если тип неизвестен.
+        """
+        return {Reaction.FIELD: Field, Reaction.COMMENT: Comment}[target_type]
+
+    @classmethod
+    def register(cls, target_type: str, target_id: int) -> Optional['ModerationAction']:
+        """
+        Учитывает жалобу нового пользователя и скрывает объект при достижении порога.
+
+        Вызывается внутри транзакции, в которой сохраняется жалоба; строка
+        счётчика блокируется до конца транзакции. Скрытие записывается
+        в журнал автоматических действий для проверки модератором.
+
+        :param target_type: Тип объекта.
+        :type target_type: str
+        :param target_id: ID объекта.
+        :type target_id: int
+        :returns: Запись о скрытии, если объект был скрыт этой жалобой.
+        :rtype: Optional[:class:`main_app.models.ModerationAction`]
+        """
+        rule: Optional[Dict[str, int]] = getattr(settings, 'AUTO_MODERATION_RULES', {}).get(target_type)
+        now = timezone.now()
+        with transaction.atomic(savepoint=False):
+            counter, _ = cls.objects.select_for_update().get_or_create(
+                target_type=target_type, target_id=target_id, defaults={'window_start': now})
+            counter.reporters += 1
+            reporters: float = counter.reporters
+            if rule is not None:
+                reporters = counter.slide(now, rule['window'])
+            action: Optional[ModerationAction] = None
+            if rule is not None and not counter.auto_hidden and reporters >= rule['reporters']:
+                counter.auto_hidden = True
+                model: Any = cls.target_model(target_type)
+                changes: Dict[str, Any] = {'is_blocked': True}
+                if model is Field:
+                    changes['updated_at'] = now
+                if model.objects.filter(pk=target_id, is_blocked=False).update(**changes):
+                    action = ModerationAction.objects.create(
+                        target_type=target_type, target_id=target_id, action=ModerationAction.HIDE,
+                        reporters=int(reporters), window=rule['window'], created_at=now)
+                    ModerationLogEntry.record(None, ModerationLogEntry.BLOCK, [(target_type, target_id)],
+                                              note='автомодерация')
+                    logger.info("Auto-moderation hid %s %s after %s reports",
+                                target_type, target_id, int(reporters))
+            counter.save(update_fields=['window_start', 'reporters', 'previous_reporters', 'auto_hidden'])
+        return action
+
+    def slide(self, now: Any, window: int) -> float:
+        """
+        Сдвигает окна к моменту жалобы и возвращает взвешенное количество пожаловавшихся.
+
+        Последняя жалоба уже должна быть учтена в ``reporters``: если она пришла
+        в следующем окне, она переносится в новое текущее окно.
+
+        :param now: Момент жалобы.
+        :type now: :class:`datetime.datetime`
+        :param window: Длина окна в секундах.
+        :type window: int
+        :returns: Жалобы текущего окна плюс взвешенные жалобы предыдущего.
+        :rtype: float
+        """
+        passed: int = int((now - self.window_start).total_seconds() // window)
+        if passed > 0:
+            self.previous_reporters = self.reporters - 1 if passed == 1 else 0
+            self.reporters = 1
+            self.window_start += timedelta(seconds=passed * window)
+        remaining: float = window - (now - self.window_start).total_seconds()
+        return self.previous_reporters * remaining / window + self.reporters
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление счётчика.
+
+        :returns: Описание счётчика с объектом и количеством жалоб.
+        :rtype: str
+        """
+        return f"{self.target_type} {self.target_id}: {self.reporters} жалоб"
+
+
+class ModerationAction(models.Model):
+    """
+    Автоматическое действие модерации, ожидающее проверки модератором.
+
+    :attribute target_type: Тип объекта (``field`` или ``comment``).
+    :type target_type: str
+    :attribute target_id: ID объекта.
+    :type target_id: int
+    :attribute action: Выполненное действие.
+    :type action: str
+    :attribute reporters: Количество пожаловавшихся пользователей на момент действия.
+    :type reporters: int
+    :attribute window: Длина окна правила в секундах.
+    :type window: int
+    :attribute created_at: Дата и время действия.
+    :type created_at: :class:`django.db.models.DateTimeField`
+    :attribute decision: Решение модератора (пусто, пока действие не проверено).
+    :type decision: str
+    :attribute reviewed_by: Модератор, проверивший действие.
+    :type reviewed_by: Optional[:class:`main_app.models.User`]
+    :attribute reviewed_at: Дата и время проверки.
+    :type reviewed_at: Optional[:class:`django.db.models.DateTimeField`]
+    """
+    HIDE = 'hide'
+    ACTIONS = [
+        (HIDE, 'Скрытие'),
+    ]
+    CONFIRMED = 'confirmed'
+    REVERTED = 'reverted'
+    DECISIONS = [
+        (CONFIRMED, 'Подтверждено'),
+        (REVERTED, 'Отменено'),
+    ]
+
+    target_type = models.CharField(max_length=16, choices=Reaction.TARGET_TYPES)
+    target_id = models.PositiveIntegerField()
+    action = models.CharField(max_length=16, choices=ACTIONS)
+    reporters = models.PositiveIntegerField()
+    window = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    decision = models.CharField(max_length=16, choices=DECISIONS, blank=True)
+    reviewed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='reviewed_moderation_actions')
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute ordering: Сортировка по убыванию даты действия.
+        :type ordering: List[str]
+        :attribute indexes: Индекс для очереди непроверенных действий.
+        :type indexes: List[:class:`django.db.models.Index`]
+        """
+        ordering = ['-created_at']
+        verbose_name = "Действие автомодерации"
+        verbose_name_plural = "Действия автомодерации"
+        indexes = [
+            models.Index(fields=['decision', '-created_at'], name='moderation_action_queue_idx'),
+        ]
+
+    @classmethod
+    def pending(cls) -> 'models.QuerySet[ModerationAction]':
+        """
+        Возвращает действия, ещё не проверенные модератором.
+
+        :returns: Набор действий, начиная с последних.
+        :rtype: :class:`django.db.models.QuerySet`[:class:`main_app.models.ModerationAction`]
+        """
+        return cls.objects.filter(decision='').order_by('-created_at')
+
+    def target(self) -> Optional[models.Model]:
+        """
+        Возвращает объект действия.
+
+        :returns: Поле или комментарий (``None``, если объект удалён).
+        :rtype: Optional[:class:`django.db.models.Model`]
+        """
+        return ReportCounter.target_model(self.target_type).objects.filter(pk=self.target_id).first()
+
+    def review(self, moderator: User, confirm: bool) -> None:
+        """
+        Записывает решение модератора.
+
+        Отмена скрытия возвращает объект и сбрасывает счётчик жалоб, чтобы
+        прежние жалобы не скрыли его снова.
+
+        :param moderator: Модератор.
+        :type moderator: :class:`main_app.models.User`
+        :param confirm: ``True``, чтобы подтвердить действие, ``False``, чтобы отменить.
+        :type confirm: bool
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            if not confirm:
+                ReportCounter.target_model(self.target_type).objects.filter(
+                    pk=self.target_id).update(is_blocked=False)
+                ReportCounter.objects.filter(target_type=self.target_type, target_id=self.target_id).update(
+                    reporters=0, previous_reporters=0, auto_hidden=False, window_start=now)
+            ModerationLogEntry.record(
+                moderator, ModerationLogEntry.REPORT_APPROVED if confirm else ModerationLogEntry.UNBLOCK,
+                [(self.target_type, self.target_id)], note='проверка автомодерации')
+            self.decision = self.CONFIRMED if confirm else self.REVERTED
+            self.reviewed_by = moderator
+            self.reviewed_at = now
+            self.save(update_fields=['decision', 'reviewed_by', 'reviewed_at'])
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление действия.
+
+        :returns: Описание действия с объектом.
+        :rtype: str
+        """
+        return f"{self.get_action_display()} {self.target_type} {self.target_id}"
+
+
+
+class ReportQueueEntry(models.Model):
+    """
+    Элемент очереди модерации: все жалобы на один объект.
+
+    Элемент обновляется при каждой жалобе и хранит количество жалоб, количество
+    разных пожаловавшихся и приоритет. Приоритет равен
+    ``log2(1 + reporters) + t / REPORT_QUEUE_HALF_LIFE``, где ``t`` — время
+    последней жалобы в секундах: порядок по нему совпадает с порядком по
+    ``(1 + reporters) · 2^(t / half_life)``, то есть удвоение числа
+    пожаловавшихся весит столько же, сколько жалоба на период полураспада
+    новее. Приоритет не зависит от текущего времени и не требует пересчёта,
+    поэтому очередь читается по частичному индексу приоритета без сортировки.
+
+    Элемент — сводка жалоб на объект: количество разных пожаловавшихся,
+    распределение причин, время первой и последней жалобы. Она обновляется при
+    каждой жалобе (см. :meth:`submit`), поэтому для подсчёта жалоб не нужно
+    просматривать сами жалобы.
+
+    :attribute target_type: Тип объекта (``field`` или ``comment``).
+    :type target_type: str
+    :attribute target_id: ID объекта.
+    :type target_id: int
+    :attribute reports: Количество жалоб.
+    :type reports: int
+    :attribute reporters: Количество разных пожаловавшихся пользователей.
+    :type reporters: int
+    :attribute reasons: Количество жалоб по причинам (у жалоб на комментарии причины нет).
+    :type reasons: Dict[str, int]
+    :attribute first_reported_at: Дата и время первой жалобы.
+    :type first_reported_at: :class:`django.db.models.DateTimeField`
+    :attribute last_reported_at: Дата и время последней жалобы.
+    :type last_reported_at: :class:`django.db.models.DateTimeField`
+    :attribute score: Приоритет в очереди.
+    :type score: float
+    :attribute is_resolved: Рассмотрены ли жалобы модератором.
+    :type is_resolved: bool
+    """
+    target_type = models.CharField(max_length=16, choices=Reaction.TARGET_TYPES)
+    target_id = models.PositiveIntegerField()
+    reports = models.PositiveIntegerField(default=0)
+    reporters = models.PositiveIntegerField(default=0)
+    reasons = models.JSONField(default=dict, blank=True)
+    first_reported_at = models.DateTimeField(default=timezone.now)
+    last_reported_at = models.DateTimeField(default=timezone.now)
+    score = models.FloatField(default=0)
+    is_resolved = models.BooleanField(default=False)
+
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute constraints: Один элемент очереди на объект.
+        :type constraints: List[:class:`django.db.models.UniqueConstraint`]
+        :attribute indexes: Частичный индекс по приоритету нерассмотренных элементов. Django
+            записывает ``is_resolved=False`` как ``NOT is_resolved``, и SQLite не может
+            использовать такое условие для составного индекса (``is_resolved``, ``score``),
+            а частичный индекс с тем же условием читается в порядке приоритета.
+        :type indexes: List[:class:`django.db.models.Index`]
+        """
+        verbose_name = "Элемент очереди жалоб"
+        verbose_name_plural = "Очередь жалоб"
+        constraints = [
+            models.UniqueConstraint(fields=['target_type', 'target_id'], name='report_queue_unique_target'),
+        ]
+        indexes = [
+            models.Index(fields=['score'], condition=Q(is_resolved=False), name='report_queue_priority_idx'),
+        ]
+
+    @staticmethod
+    def priority(reporters: int, moment: Any) -> float:
+        """
+        Вычисляет приоритет по количеству пожаловавшихся и времени последней жалобы.
+
+        :param reporters: Количество разных пожаловавшихся пользователей.
+        :type reporters: int
+        :param moment: Время последней жалобы.
+        :type moment: :class:`datetime.datetime`
+        :returns: Приоритет.
+        :rtype: float
+        """
+        return math.log2(1 + reporters) + moment.timestamp() / settings.REPORT_QUEUE_HALF_LIFE
+
+    @classmethod
+    def register(cls, target_type: str, target_id: int, new_reporter: bool, reason: str = '') -> 'ReportQueueEntry':
+        """
+        Учитывает жалобу на объект; рассмотренный элемент возвращается в очередь.
+
+        Вызывается внутри транзакции, в которой сохраняется жалоба.
+
+        :param target_type: Тип объекта.
+        :type target_type: str
+        :param target_id: ID объекта.
+        :type target_id: int
+        :param new_reporter: Жалуется ли пользователь на объект впервые.
+        :type new_reporter: bool
+        :param reason: Причина жалобы (пустая, если причины нет).
+        :type reason: str
+        :returns: Элемент очереди.
+        :rtype: :class:`main_app.models.ReportQueueEntry`
+        """
+        now = timezone.now()
+        with transaction.atomic(savepoint=False):
+            entry, _ = cls.objects.select_for_update().get_or_create(
+                target_type=target_type, target_id=target_id,
+                defaults={'first_reported_at': now, 'last_reported_at': now})
+            entry.reports += 1
+            entry.reporters += int(new_reporter)
+            if reason:
+                entry.reasons[reason] = entry.reasons.get(reason, 0) + 1
+            entry.last_reported_at = now
+            entry.score = cls.priority(entry.reporters, now)
+            entry.is_resolved = False
+            entry.save(update_fields=['reports', 'reporters', 'reasons', 'last_reported_at', 'score', 'is_resolved'])
+        return entry
+
+    @classmethod
+    def submit(cls, target_type: str, target_id: int, user: User, reason: str = '') -> Optional['ReportQueueEntry']:
+        """
+        Учитывает жалобу пользователя на объект.
+
+        Пожаловавшийся записывается в связь объекта с пользователями
+        (:attr:`main_app.models.Field.reporters` или :attr:`main_app.models.Comment.reports`),
+        и уникальность пары (объект, пользователь) в этой таблице определяет,
+        жалуется ли он впервые. Первая жалоба пользователя учитывается счётчиком
+        автомодерации. Каждая жалоба на поле хранится отдельной записью
+        :class:`main_app.models.FieldReport` и учитывается в очереди, а
+        повторная жалоба на комментарий не сохраняется и не учитывается.
+
+        :param target_type: Тип объекта.
+        :type target_type: str
+        :param target_id: ID объекта.
+        :type target_id: int
+        :param user: Пожаловавшийся пользователь.
+        :type user: :class:`main_app.models.User`
+        :param reason: Причина жалобы (пустая, если причины нет).
+        :type reason: str
+        :returns: Элемент очереди (``None``, если жалоба не учтена).
+        :rtype: Optional[:class:`main_app.models.ReportQueueEntry`]
+        """
+        through: Any = Field.reporters.through if target_type == Reaction.FIELD else Comment.reports.through
+        with transaction.atomic(savepoint=False):
+            try:
+                with transaction.atomic():
+                    through.objects.create(**{f'{target_type}_id': target_id, 'user_id': user.pk})
+                new_reporter: bool = True
+            except IntegrityError:
+                new_reporter = False
+            if new_reporter:
+                ReportCounter.register(target_type, target_id)
+            if not new_reporter and target_type == Reaction.COMMENT:
+                return None
+            return cls.register(target_type, target_id, new_reporter, reason)
+
+    def reason_counts(self) -> List[Tuple[str, int]]:
+        """
+        Возвращает распределение причин жалоб для отображения.
+
+        :returns: Названия причин и количество жалоб, начиная с самой частой.
+        :rtype: List[Tuple[str, int]]
+        """
+        labels: Dict[str, str] = dict(FieldReport.REASON_CHOICES)
+        return sorted(((labels.get(reason, reason), count) for reason, count in self.reasons.items()),
+                      key=lambda item: -item[1])
+
+    @classmethod
+    def pending(cls) -> 'models.QuerySet[ReportQueueEntry]':
+        """
+        Возвращает нерассмотренные элементы в порядке приоритета.
+
+        :returns: Набор элементов очереди.
+        :rtype: :class:`django.db.models.QuerySet`[:class:`main_app.models.ReportQueueEntry`]
+        """
+        return cls.objects.filter(is_resolved=False).order_by('-score', '-id')
+
+    @classmethod
+    def attach_targets(cls, entries: List['ReportQueueEntry']) -> List['ReportQueueEntry']:
+        """
+        Загружает объекты элементов с авторами одним запросом на тип и сохраняет их в ``target_object``.
+
+        :param entries: Элементы очереди.
+        :type entries: List[:class:`main_app.models.ReportQueueEntry`]
+        :returns: Те же элементы; ``target_object`` равен ``None`` для удалённых объектов.
+        :rtype: List[:class:`main_app.models.ReportQueueEntry`]
+        """
+        targets: Dict[str, Dict[int, models.Model]] = {}
+        for target_type, _ in Reaction.TARGET_TYPES:
+            ids: List[int] = [entry.target_id for entry in entries if entry.target_type == target_type]
+            if ids:
+                queryset: Any = ReportCounter.target_model(target_type).objects.all()
+                if target_type == Reaction.COMMENT:
+                    queryset = queryset.select_related('field', 'author')
+                else:
+                    queryset = queryset.select_related('user')
+                targets[target_type] = queryset.in_bulk(ids)
+        for entry in entries:
+            entry.target_object = targets.get(entry.target_type, {}).get(entry.target_id)
+        return entries
+
+    def resolve(self, block: bool, moderator: Optional[User] = None) -> None:
+        """
+        Закрывает элемент очереди и все нерассмотренные жалобы на объект.
+
+        :param block: ``True``, чтобы заблокировать объект и одобрить жалобы,
+            ``False``, чтобы отклонить жалобы.
+        :type block: bool
+        :param moderator: Модератор, рассмотревший жалобы.
+        :type moderator: Optional[:class:`main_app.models.User`]
+        """
+        with transaction.atomic():
+            if block:
+                model: Any = ReportCounter.target_model(self.target_type)
+                changes: Dict[str, Any] = {'is_blocked': True}
+                if model is Field:
+                    changes['updated_at'] = timezone.now()
+                model.objects.filter(pk=self.target_id).update(**changes)
+            if self.target_type == Reaction.FIELD:
+                FieldReport.objects.filter(field_id=self.target_id, is_resolved=False).update(
+                    is_resolved=True, status='approved' if block else 'rejected')
+            ModerationLogEntry.record(
+                moderator, ModerationLogEntry.REPORT_APPROVED if block else ModerationLogEntry.REPORT_REJECTED,
+                [(self.target_type, self.target_id)])
+            self.is_resolved = True
+            self.save(update_fields=['is_resolved'])
+
+    @classmethod
+    def settle_fields(cls, field_ids: List[int]) -> int:
+        """
+        Закрывает элементы полей, по которым не осталось нерассмотренных жалоб.
+
+        Нужен после рассмотрения жалоб по одной (страница жалобы, админ-панель).
+
+        :param field_ids: ID полей.
+        :type field_ids: List[int]
+        :returns: Количество закрытых элементов.
+        :rtype: int
+        """
+        open_reports: Any = FieldReport.objects.filter(field_id=models.OuterRef('target_id'), is_resolved=False)
+        return cls.objects.filter(target_type=Reaction.FIELD, target_id__in=field_ids, is_resolved=False).exclude(
+            models.Exists(open_reports)).update(is_resolved=True)
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """
+        Пересобирает очередь по нерассмотренным жалобам на поля и жалобам на незаблокированные комментарии.
+
+        У жалоб на комментарии нет ни даты, ни отметки о рассмотрении, поэтому
+        временем жалоб считается момент пересборки, а комментарии, по которым
+        после рассмотрения не появилось новых жалоб, в очередь не возвращаются.
+
+        :returns: Количество элементов в очереди.
+        :rtype: int
+        """
+        now = timezone.now()
+        open_reports: Any = FieldReport.objects.filter(is_resolved=False)
+        reasons: Dict[int, Dict[str, int]] = {}
+        for row in open_reports.values('field_id', 'reason').annotate(reports=models.Count('id')).order_by():
+            reasons.setdefault(row['field_id'], {})[row['reason']] = row['reports']
+        entries: List[ReportQueueEntry] = [
+            cls(target_type=Reaction.FIELD, target_id=row['field_id'], reports=row['reports'],
+                reporters=row['reporters'], reasons=reasons.get(row['field_id'], {}),
+                first_reported_at=row['first'], last_reported_at=row['last'],
+                score=cls.priority(row['reporters'], row['last']))
+            for row in open_reports.values('field_id').annotate(
+                reports=models.Count('id'), reporters=models.Count('user', distinct=True),
+                first=models.Min('created_at'), last=models.Max('created_at')).order_by()
+        ]
+        reviewed: Dict[int, int] = dict(cls.objects.filter(
+            target_type=Reaction.COMMENT, is_resolved=True).values_list('target_id', 'reports'))
+        entries += [
+            cls(target_type=Reaction.COMMENT, target_id=row['comment_id'], reports=row['reports'],
+                reporters=row['reports'], first_reported_at=now, last_reported_at=now,
+                score=cls.priority(row['reports'], now))
+            for row in Comment.reports.through.objects.filter(comment__is_blocked=False).values(
+                'comment_id').annotate(reports=models.Count('id')).order_by()
+            if row['reports'] > reviewed.get(row['comment_id'], 0)
+        ]
+        with transaction.atomic():
+            cls.objects.filter(is_resolved=False).update(is_resolved=True)
+            cls.objects.bulk_create(
+                entries, update_conflicts=True, unique_fields=['target_type', 'target_id'],
+                update_fields=['reports', 'reporters', 'reasons', 'first_reported_at', 'last_reported_at',
+                               'score', 'is_resolved'])
+        return len(entries)
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление элемента очереди.
+
+        :returns: Описание объекта с количеством жалоб.
+        :rtype: str
+        """
+        return f"{self.target_type} {self.target_id}: {self.reports} жалоб"
+
+
+class ModerationLogEntry(models.Model):
+    """
+    Запись журнала действий модерации.
+
+    Журнал только дополняется: записи создаются в той же транзакции, что и
+    действие, и не изменяются и не удаляются. Массовые действия записываются
+    одной пакетной вставкой. Действия автомодерации записываются без
+    модератора.
+
+    :attribute actor: Модератор (``None`` для автомодерации и удалённых модераторов).
+    :type actor: Optional[:class:`main_app.models.User`]
+    :attribute action: Действие.
+    :type action: str
+    :attribute target_type: Тип объекта (``field``, ``comment`` или ``user``).
+    :type target_type: str
+    :attribute target_id: ID объекта.
+    :type target_id: int
+    :attribute note: Источник действия или пояснение.
+    :type note: str
+    :attribute created_at: Дата и время действия.
+    :type created_at: :class:`django.db.models.DateTimeField`
+    """
+    BLOCK = 'block'
+    UNBLOCK = 'unblock'
+    BAN = 'ban'
+    REPORT_APPROVED = 'report_approved'
+    REPORT_REJECTED = 'report_rejected'
+    ACTIONS = [
+        (BLOCK, 'Блокировка'),
+        (UNBLOCK, 'Разблокировка'),
+        (BAN, 'Бан'),
+        (REPORT_APPROVED, 'Жалобы одобрены'),
+        (REPORT_REJECTED, 'Жалобы отклонены'),
+    ]
+    USER = 'user'
+    TARGET_TYPES = Reaction.TARGET_TYPES + [(USER, 'Пользователь')]
+
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_index=False,
+                              related_name='moderation_log')
+    action = models.CharField(max_length=16, choices=ACTIONS)
+    target_type = models.CharField(max_length=16, choices=TARGET_TYPES)
+    target_id = models.PositiveIntegerField()
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute indexes: Индексы для истории модератора, истории объекта и общей ленты
+            в порядке времени.
+        :type indexes: List[:class:`django.db.models.Index`]
+        """
+        verbose_name = "Запись журнала модерации"
+        verbose_name_plural = "Журнал модерации"
+        indexes = [
+            models.Index(fields=['actor', 'created_at', 'id'], name='moderation_log_actor_idx'),
+            models.Index(fields=['target_type', 'target_id', 'created_at', 'id'],
+                         name='moderation_log_target_idx'),
+            models.Index(fields=['created_at', 'id'], name='moderation_log_recent_idx'),
+        ]
+
+    @classmethod
+    def record(cls, actor: Optional[User], action: str, targets: List[Tuple[str, int]],
+               note: str = '') -> List['ModerationLogEntry']:
+        """
+        Записывает действие над объектами одной пакетной вставкой.
+
+        Вызывается внутри транзакции действия, чтобы запись и действие
+        сохранялись или откатывались вместе.
+
+        :param actor: Модератор (``None`` для автомодерации).
+        :type actor: Optional[:class:`main_app.models.User`]
+        :param action: Действие.
+        :type action: str
+        :param targets: Пары (тип, ID) объектов.
+        :type targets: List[Tuple[str, int]]
+        :param note: Источник действия или пояснение.
+        :type note: str
+        :returns: Созданные записи.
+        :rtype: List[:class:`main_app.models.ModerationLogEntry`]
+        """
+        now = timezone.now()
+        actor_id: Optional[int] = actor.pk if actor is not None else None
+        return cls.objects.bulk_create([
+            cls(actor_id=actor_id, action=action, target_type=target_type, target_id=target_id, note=note,
+                created_at=now)
+            for target_type, target_id in targets
+        ])
+
+    @classmethod
+    def page(cls, actor_id: Optional[int] = None, target: Optional[Tuple[str, int]] = None,
+             cursor: str = '') -> Tuple[List['ModerationLogEntry'], Optional[str]]:
+        """
+        Возвращает страницу журнала, начиная с последних записей.
+
+        :param actor_id: ID модератора для отбора его действий.
+        :type actor_id: Optional[int]
+        :param target: Тип и ID объекта для отбора его истории.
+        :type target: Optional[Tuple[str, int]]
+        :param cursor: Курсор из предыдущей страницы (пустой для первой).
+        :type cursor: str
+        :returns: Записи страницы с загруженными модераторами и курсор следующей страницы.
+        :rtype: Tuple[List[:class:`main_app.models.ModerationLogEntry`], Optional[str]]
+        :raises ValueError: Если курсор некорректен.
+        """
+        size: int = settings.MODERATION_LOG_PAGE_SIZE
+        entries: Any = cls.objects.filter(after(decode_cursor(cursor) if cursor else None))
+        if actor_id is not None:
+            entries = entries.filter(actor_id=actor_id)
+        if target is not None:
+            entries = entries.filter(target_type=target[0], target_id=target[1])
+        rows: List[ModerationLogEntry] = list(entries.select_related('actor').order_by(
+            '-created_at', '-id')[:size + 1])
+        next_cursor: Optional[str] = encode_cursor(rows[size - 1].created_at, rows[size - 1].id) \
+            if len(rows) > size else None
+        return rows[:size], next_cursor
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Создаёт запись; изменение существующей записи запрещено.
+
+        :raises ValueError: Если запись уже сохранена.
+        """
+        if not self._state.adding:
+            raise ValueError('Записи журнала модерации не изменяются')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Запрещает удаление записи.
+
+        :raises ValueError: Всегда.
+        """
+        raise ValueError('Записи журнала модерации не удаляются')
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление записи.
+
+        :returns: Описание действия с объектом.
+        :rtype: str
+        """
+        return f"{self.get_action_display()} {self.target_type} {self.target_id}"
+
+class TextFingerprint(models.Model):
+    """
+    Отпечаток SimHash текста комментария для поиска почти одинакового спама.
+
+    Отпечаток хранится вместе с полосами LSH (см. :mod:`main_app.simhash`);
+    каждая полоса проиндексирована вместе с датой, поэтому кандидаты среди
+    недавних текстов находятся точным совпадением хотя бы одной полосы.
+    Порог ``SPAM_SIMHASH_MAX_DISTANCE`` не может превышать
+    :data:`main_app.simhash.MAX_DISTANCE`: более далёкие отпечатки могут
+    не совпасть ни в одной полосе.
+
+    :attribute source_type: Тип текста (``comment`` или ``profile_comment``).
+    :type source_type: str
+    :attribute source_id: ID комментария.
+    :type source_id: int
+    :attribute fingerprint: Отпечаток как знаковое 64-битное число.
+    :type fingerprint: int
+    :attribute band0: Первая (старшая) полоса отпечатка; ``band1`` … ``band3`` — следующие полосы.
+    :type band0: int
+    :attribute created_at: Дата и время создания текста.
+    :type created_at: :class:`django.db.models.DateTimeField`
+    :attribute duplicate_of: Недавний текст, почти совпадающий с этим.
+    :type duplicate_of: Optional[:class:`main_app.models.TextFingerprint`]
+    :attribute distance: Расстояние Хэмминга до ``duplicate_of``.
+    :type distance: Optional[int]
+    """
+    COMMENT = 'comment'
+    PROFILE_COMMENT = 'profile_comment'
+    SOURCE_TYPES = [
+        (COMMENT, 'Комментарий'),
+        (PROFILE_COMMENT, 'Комментарий к профилю'),
+    ]
+
+    source_type = models.CharField(max_length=16, choices=SOURCE_TYPES)
+    source_id = models.PositiveIntegerField()
+    fingerprint = models.BigIntegerField()
+    band0 = models.PositiveIntegerField()
+    band1 = models.PositiveIntegerField()
+    band2 = models.PositiveIntegerField()
+    band3 = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='near_duplicates')
+    distance = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute constraints: Один отпечаток на текст.
+        :type constraints: List[:class:`django.db.models.UniqueConstraint`]
+        :attribute indexes: Индексы полос LSH для поиска среди недавних текстов.
+        :type indexes: List[:class:`django.db.models.Index`]
+        """
+        verbose_name = "Отпечаток текста"
+        verbose_name_plural = "Отпечатки текстов"
+        constraints = [
+            models.UniqueConstraint(fields=['source_type', 'source_id'], name='fingerprint_unique_source'),
+        ]
+        indexes = [
+            models.Index(fields=[f'band{index}', 'created_at'], name=f'fingerprint_band{index}_idx')
+            for index in range(simhash.BANDS)
+        ]
+
+    @staticmethod
+    def source_model(source_type: str) -> Any:
+        """
+        Возвращает модель текста по его типу.
+
+        :param source_type: Тип текста.
+        :type source_type: str
+        :returns: Класс модели.
+        :rtype: Type[:class:`django.db.models.Model`]
+        :raises KeyError: Если тип неизвестен.
+        """
+        return {TextFingerprint.COMMENT: Comment, TextFingerprint.PROFILE_COMMENT: ProfileComment}[source_type]
+
+    @classmethod
+    def build(cls, source_type: str, source_id: int, text: str,
+              created_at: Optional[Any] = None) -> Optional['TextFingerprint']:
+        """
+        Вычисляет отпечаток текста без сохранения.
+
+        :param source_type: Тип текста.
+        :type source_type: str
+        :param source_id: ID текста.
+        :type source_id: int
+        :param text: Текст.
+        :type text: str
+        :param created_at: Дата создания текста (по умолчанию — текущий момент).
+        :type created_at: Optional[:class:`datetime.datetime`]
+        :returns: Несохранённый отпечаток или ``None`` для слишком короткого текста.
+        :rtype: Optional[:class:`main_app.models.TextFingerprint`]
+        """
+        value: Optional[int] = simhash.fingerprint(text, getattr(settings, 'SPAM_MIN_TOKENS', 1))
+        if value is None:
+            return None
+        band_values: Dict[str, int] = {f'band{index}': band for index, band in enumerate(simhash.bands(value))}
+        return cls(source_type=source_type, source_id=source_id, fingerprint=simhash.to_signed(value),
+                   created_at=created_at or timezone.now(), **band_values)
+
+    def band_candidates(self, index: int) -> 'models.QuerySet[TextFingerprint]':
+        """
+        Возвращает недавние отпечатки с той же полосой, начиная с последних.
+
+        Запрос читает индекс одной полосы.
+
+        :param index: Номер полосы.
+        :type index: int
+        :returns: Набор отпечатков в окне ``SPAM_DUPLICATE_WINDOW`` секунд.
+        :rtype: :class:`django.db.models.QuerySet`[:class:`main_app.models.TextFingerprint`]
+        """
+        since = self.created_at - timedelta(seconds=settings.SPAM_DUPLICATE_WINDOW)
+        return TextFingerprint.objects.filter(
+            created_at__gte=since, **{f'band{index}': getattr(self, f'band{index}')}).exclude(
+            source_type=self.source_type, source_id=self.source_id).order_by('-created_at').only(
+            'id', 'source_type', 'source_id', 'fingerprint')
+
+    def find_similar(self) -> Optional[Tuple['TextFingerprint', int]]:
+        """
+        Ищет среди недавних отпечатков ближайший почти совпадающий.
+
+        Полосы проверяются отдельными запросами по их индексам. Расстояние
+        проверяется для каждого кандидата без ограничения их числа; в каждой
+        полосе берётся самый свежий подходящий отпечаток, а точное совпадение
+        заканчивает поиск.
+
+        :returns: Найденный отпечаток и расстояние до него или ``None``.
+        :rtype: Optional[Tuple[:class:`main_app.models.TextFingerprint`, int]]
+        """
+        limit: int = min(settings.SPAM_SIMHASH_MAX_DISTANCE, simhash.MAX_DISTANCE)
+        value: int = simhash.to_unsigned(self.fingerprint)
+        best: Optional[Tuple[TextFingerprint, int]] = None
+        for index in range(simhash.BANDS):
+            for candidate in self.band_candidates(index).iterator():
+                gap: int = simhash.distance(value, simhash.to_unsigned(candidate.fingerprint))
+                if gap <= limit:
+                    if best is None or gap < best[1]:
+                        best = (candidate, gap)
+                    break
+            if best is not None and best[1] == 0:
+                break
+        return best
+
+    @classmethod
+    def index(cls, source_type: str, source_id: int, text: str) -> Optional['TextFingerprint']:
+        """
+        Сохраняет отпечаток нового текста и помечает его, если он почти совпадает с недавним.
+
+        :param source_type: Тип текста.
+        :type source_type: str
+        :param source_id: ID текста.
+        :type source_id: int
+        :param text: Текст.
+        :type text: str
+        :returns: Сохранённый отпечаток или ``None`` для слишком короткого текста.
+        :rtype: Optional[:class:`main_app.models.TextFingerprint`]
+        """
+        record: Optional[TextFingerprint] = cls.build(source_type, source_id, text)
+        if record is None:
+            return None
+        match: Optional[Tuple[TextFingerprint, int]] = record.find_similar()
+        if match is not None:
+            record.duplicate_of, record.distance = match
+            logger.warning("Near-duplicate %s %s of %s %s (distance %s)", source_type, source_id,
+                           match[0].source_type, match[0].source_id, match[1])
+        record.save()
+        return record
+
+    @classmethod
+    def backfill(cls, source_type: str, batch_size: int = 500) -> int:
+        """
+        Индексирует существующие тексты, у которых ещё нет отпечатка, пачками.
+
+        Почти совпадающие тексты при этом не помечаются.
+
+        :param source_type: Тип текстов.
+        :type source_type: str
+        :param batch_size: Размер пачки.
+        :type batch_size: int
+        :returns: Количество созданных отпечатков.
+        :rtype: int
+        """
+        rows = cls.source_model(source_type).objects.order_by('id').values_list('id', 'text', 'created_at')
+        created: int = 0
+        last_id: int = 0
+        while True:
+            batch: List[Tuple[int, str, Any]] = list(rows.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return created
+            last_id = batch[-1][0]
+            indexed: Set[int] = set(cls.objects.filter(
+                source_type=source_type, source_id__in=[row[0] for row in batch]).values_list('source_id', flat=True))
+            records: List[TextFingerprint] = []
+            for source_id, text, created_at in batch:
+                if source_id not in indexed:
+                    record: Optional[TextFingerprint] = cls.build(source_type, source_id, text, created_at)
+                    if record is not None:
+                        records.append(record)
+            cls.objects.bulk_create(records, ignore_conflicts=True)
+            created += len(records)
+
+    @classmethod
+    def flagged(cls, limit: int = 20) -> List['TextFingerprint']:
+        """
+        Возвращает последние помеченные тексты с загруженными комментариями.
+
+        Каждому отпечатку добавляется атрибут ``source_object`` (``None``,
+        если текст удалён); комментарии загружаются одним запросом на тип.
+
+        :param limit: Максимальное количество записей.
+        :type limit: int
+        :returns: Список отпечатков.
+        :rtype: List[:class:`main_app.models.TextFingerprint`]
+        """
+        records: List[TextFingerprint] = list(cls.objects.filter(
+            duplicate_of__isnull=False).select_related('duplicate_of').order_by('-created_at')[:limit])
+        sources: Dict[str, Dict[int, Any]] = {}
+        for source_type, _ in cls.SOURCE_TYPES:
+            ids: List[int] = [record.source_id for record in records if record.source_type == source_type]
+            sources[source_type] = cls.source_model(source_type).objects.in_bulk(ids) if ids else {}
+        for record in records:
+            record.source_object = sources[record.source_type].get(record.source_id)
+        return records
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление отпечатка.
+
+        :returns: Описание отпечатка с типом и ID текста.
+        :rtype: str
+        """
+        return f"Отпечаток {self.source_type} {self.source_id}"
+
+
+class Submission(models.Model):
+    """
+    Модель решения (программы робота), отправленного пользователем для поля.
+
+    :attribute field: Поле, для которого отправлено решение.
+    :type field: :class:`main_app.models.Field`
+    :attribute user: Пользователь, отправивший решение.
+    :type user: :class:`main_app.models.User`
+    :attribute program: Текст программы.
+    :type program: str
+    :attribute is_solved: Флаг, указывающий, что программа решает задачу поля.
+    :type is_solved: bool
+    :attribute steps: Количество шагов исполнения (заполняется после проверки).
+    :type steps: Optional[int]
+    :attribute program_length: Длина программы в инструкциях (заполняется после проверки).
+    :type program_length: Optional[int]
+    :attribute created_at: Дата и время отправки решения.
+    :type created_at: :class:`django.db.models.DateTimeField`
+    :attribute graded_at: Дата и время проверки решения.
+    :type graded_at: Optional[:class:`django.db.models.DateTimeField`]
+    """
+    field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='submissions')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='submissions')
+    program = models.TextField()
+    is_solved = models.BooleanField(default=False)
+    steps = models.PositiveIntegerField(null=True, blank=True)
+    program_length = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    graded_at = models.DateTimeField(null=True, blank=True)
+
+    def grade(self, is_solved: bool, steps: int, program_length: int) -> None:
+        """
+        Сохраняет результат проверки решения и обновляет таблицу лидеров поля.
+
+        :param is_solved: Решает ли программа задачу поля.
+        :type is_solved: bool
+        :param steps: Количество шагов исполнения.
+        :type steps: int
+        :param program_length: Длина программы в инструкциях.
+        :type program_length: int
+        """
+        self.is_solved = is_solved
+        self.steps = steps
+        self.program_length = program_length
+        self.graded_at = timezone.now()
+        with transaction.atomic():
+            self.save(update_fields=['is_solved', 'steps', 'program_length', 'graded_at'])
+            if is_solved:
+                LeaderboardEntry.record(self)
+
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute ordering: Сортировка по убыванию даты отправки.
+        :type ordering: List[str]
+        :attribute indexes: Индекс для выборки лучших решений поля при перестроении таблицы лидеров.
+        :type indexes: List[:class:`django.db.models.Index`]
+        """
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['field', 'is_solved', 'steps', 'program_length'],
+                         name='submission_field_best_idx'),
+        ]
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление решения.
+
+        :returns: Описание решения с автором и названием поля.
+        :rtype: str
+        """
+        return f"Решение от {self.user.username} для {self.field.title}"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Запись ограниченной таблицы лидеров поля: лучший результат пользователя.
+
+    Таблица хранит не более ``LEADERBOARD_SIZE`` записей на поле и обновляется
+    инкрементально при проверке каждого решения, поэтому чтение рейтинга —
+    это выборка не более N строк по индексу.
+
+    :attribute field: Поле, к которому относится запись.
+    :type field: :class:`main_app.models.Field`
+    :attribute user: Пользователь, которому принадлежит результат.
+    :type user: :class:`main_app.models.User`
+    :attribute submission: Решение, давшее лучший результат.
+    :type submission: :class:`main_app.models.Submission`
+    :attribute steps: Количество шагов лучшего решения.
+    :type steps: int
+    :attribute program_length: Длина программы лучшего решения.
+    :type program_length: int
+    :attribute achieved_at: Дата и время отправки лучшего решения.
+    :type achieved_at: :class:`django.db.models.DateTimeField`
+    """
+    RANKING: Tuple[str, ...] = ('steps', 'program_length', 'achieved_at')
+
+    field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='leaderboard')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE)
+    steps = models.PositiveIntegerField()
+    program_length = models.PositiveIntegerField()
+    achieved_at = models.DateTimeField()
+
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute ordering: Сортировка по рейтингу: шаги, длина программы, время.
+        :type ordering: List[str]
+        :attribute constraints: Одна запись на пользователя в таблице поля.
+        :type constraints: List[:class:`django.db.models.UniqueConstraint`]
+        :attribute indexes: Индекс, совпадающий с порядком рейтинга.
+        :type indexes: List[:class:`django.db.models.Index`]
+        """
+        ordering = ['steps', 'program_length', 'achieved_at']
+        constraints = [
+            models.UniqueConstraint(fields=['field', 'user'], name='leaderboard_unique_field_user'),
+        ]
+        indexes = [
+            models.Index(fields=['field', 'steps', 'program_length', 'achieved_at'],
+                         name='leaderboard_rank_idx'),
+        ]
+
+    @staticmethod
+    def size() -> int:
+        """
+        Возвращает максимальное количество записей в таблице лидеров поля.
+
+        :returns: Значение настройки ``LEADERBOARD_SIZE`` (по умолчанию 10).
+        :rtype: int
+        """
+        return getattr(settings, 'LEADERBOARD_SIZE', 10)
+
+    def rank_key(self) -> Tuple[int, int, Any]:
+        """
+        Возвращает ключ сортировки записи (меньше — лучше).
+
+        :returns: Кортеж (шаги, длина программы, время достижения).
+        :rtype: Tuple[int, int, Any]
+        """
+        return self.steps, self.program_length, self.achieved_at
+
+    @classmethod
+    def record(cls, submission: 'Submission') -> bool:
+        """
+        Инкрементально учитывает проверенное решение в таблице лидеров поля.
+
+        Запись пользователя обновляется, только если новое решение лучше прежнего;
+        после вставки лишние записи за пределами первых N удаляются.
+
+        :param submission: Проверенное успешное решение.
+        :type submission: :class:`main_app.models.Submission`
+        :returns: ``True``, если решение попало в таблицу лидеров.
+        :rtype: bool
+        """
+        candidate = cls(
+            field_id=submission.field_id,
+            user_id=submission.user_id,
+            submission=submission,
+            steps=submission.steps,
+            program_length=submission.program_length,
+            achieved_at=submission.created_at,
+        )
+        with transaction.atomic():
+            entries: List['LeaderboardEntry'] = list(
+                cls.objects.select_for_update().filter(field_id=submission.field_id)
+            )
+            current = next((e for e in entries if e.user_id == submission.user_id), None)
+            if current is not None:
+                if candidate.rank_key() >= current.rank_key():
+                    return False
+                entries.remove(current)
+            limit = cls.size()
+            if len(entries) >= limit and candidate.rank_key() >= entries[limit - 1].rank_key():
+                return False
+            if current is not None:
+                candidate.pk = current.pk
+            candidate.save()
+            entries.append(candidate)
+            entries.sort(key=cls.rank_key)
+            overflow = [e.pk for e in entries[limit:]]
+            if overflow:
+                cls.objects.filter(pk__in=overflow).delete()
+        return candidate.pk not in overflow
+
+    @classmethod
+    def rebuild(cls, field: Field) -> int:
+        """
+        Перестраивает таблицу лидеров поля по всем успешным решениям.
+
+        :param field: Поле, для которого перестраивается таблица.
+        :type field: :class:`main_app.models.Field`
+        :returns: Количество записей в новой таблице.
+        :rtype: int
+        """
+        limit = cls.size()
+        best: Dict[int, Submission] = {}
+        submissions = (Submission.objects
+                       .filter(field=field, is_solved=True, steps__isnull=False, program_length__isnull=False)
+                       .order_by('steps', 'program_length', 'created_at'))
+        for submission in submissions.iterator():
+            if submission.user_id not in best:
+                best[submission.user_id] = submission
+                if len(best) == limit:
+                    break
+        with transaction.atomic():
+            cls.objects.filter(field=field).delete()
+            cls.objects.bulk_create([
+                cls(field=field, user_id=s.user_id, submission=s, steps=s.steps,
+                    program_length=s.program_length, achieved_at=s.created_at)
+                for s in best.values()
+            ])
+        return len(best)
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление записи таблицы лидеров.
+
+        :returns: Описание результата пользователя на поле.
+        :rtype: str
+        """
+        return f"{self.user.username}: {self.steps} шагов на {self.field.title}"
+
+
+class ExecutionReplay(models.Model):
+    """
+    Сжатая трасса исполнения решения для пошагового просмотра.
+
+    Хранит дельты состояний, сжатые блоками с полными контрольными точками
+    через каждые ``checkpoint_interval`` шагов (см. :mod:`main_app.replay`).
+
+    :attribute submission: Решение, к которому относится трасса.
+    :type submission: :class:`main_app.models.Submission`
+    :attribute data: Сжатые блоки трассы.
+    :type data: bytes
+    :attribute offsets: Смещения начала блоков в ``data``.
+    :type offsets: List[int]
+    :attribute step_count: Количество шагов в трассе.
+    :type step_count: int
+    :attribute checkpoint_interval: Расстояние между контрольными точками.
+    :type checkpoint_interval: int
+    :attribute raw_size: Размер трассы в виде JSON без сжатия, в байтах.
+    :type raw_size: int
+    :attribute created_at: Дата и время сохранения трассы.
+    :type created_at: :class:`django.db.models.DateTimeField`
+    """
+    submission = models.OneToOneField(Submission, on_delete=models.CASCADE, related_name='replay')
+    data = models.BinaryField()
+    offsets = models.JSONField(default=list)
+    step_count = models.PositiveIntegerField()
+    checkpoint_interval = models.PositiveIntegerField()
+    raw_size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def store(cls, submission: Submission, states: List[Dict[str, Any]],
+              interval: Optional[int] = None) -> 'ExecutionReplay':
+        """
+        Кодирует и сохраняет трассу исполнения решения.
+
+        :param submission: Решение, к которому относится трасса.
+        :type submission: :class:`main_app.models.Submission`
+        :param states: Состояния исполнителя по шагам.
+        :type states: List[Dict[str, Any]]
+        :param interval: Расстояние между контрольными точками (по умолчанию ``REPLAY_CHECKPOINT_INTERVAL``).
+        :type interval: Optional[int]
+        :returns: Сохранённая трасса.
+        :rtype: :class:`main_app.models.ExecutionReplay`
+        """
+        interval = interval or getattr(settings, 'REPLAY_CHECKPOINT_INTERVAL', DEFAULT_CHECKPOINT_INTERVAL)
+        data, offsets = encode_trace(states, interval)
+        replay, _ = cls.objects.update_or_create(
+            submission=submission,
+            defaults={
+                'data': data,
+                'offsets': offsets,
+                'step_count': len(states),
+                'checkpoint_interval': interval,
+                'raw_size': len(json.dumps(states, separators=(',', ':')).encode('utf-8')),
+            },
+        )
+        return replay
+
+    def states(self, start: int, count: int = 1) -> List[Dict[str, Any]]:
+        """
+        Возвращает состояния, начиная с шага ``start``, распаковывая трассу от ближайшей контрольной точки.
+
+        :param start: Номер первого шага.
+        :type start: int
+        :param count: Количество шагов.
+        :type count: int
+        :returns: Список состояний.
+        :rtype: List[Dict[str, Any]]
+        :raises IndexError: Если ``start`` выходит за пределы трассы.
+        """
+        return list(iter_states(bytes(self.data), self.offsets, self.checkpoint_interval,
+                                start, count, self.step_count))
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление трассы.
+
+        :returns: Описание трассы с количеством шагов.
+        :rtype: str
+        """
+        return f"Трасса решения {self.submission_id} ({self.step_count} шагов)"
+
+
+class UserStats(models.Model):
+    """
+    Материализованная статистика пользователя для страницы профиля.
+
+    Счётчики меняются на путях записи: создание поля и комментария
+    (:meth:`Field.save`, :meth:`Comment.save`), переключение реакций
+    (:meth:`Reaction.toggle` и запись буфера :func:`main_app.reactions.flush`).
+    Удаления и каскады не отслеживаются — расхождения исправляет периодическая
+    сверка :meth:`reconcile` (команда ``reconcile_user_stats``). Строка
+    создаётся при первом чтении полным подсчётом, поэтому инкременты
+    применяются только к уже существующим строкам.
+
+    :attribute user: Пользователь (первичный ключ).
+    :type user: :class:`main_app.models.User`
+    :attribute fields_created: Количество созданных полей.
+    :type fields_created: int
+    :attribute likes_received: Количество лайков на поля и комментарии пользователя.
+    :type likes_received: int
+    :attribute comments_written: Количество написанных комментариев.
+    :type comments_written: int
+    :attribute favorites: Количество полей в избранном пользователя.
+    :type favorites: int
+    :attribute reconciled_at: Дата и время последней сверки.
+    :type reconciled_at: Optional[:class:`django.db.models.DateTimeField`]
+    """
+    COUNTERS: Tuple[str, ...] = ('fields_created', 'likes_received', 'comments_written', 'favorites')
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    fields_created = models.IntegerField(default=0)
+    likes_received = models.IntegerField(default=0)
+    comments_written = models.IntegerField(default=0)
+    favorites = models.IntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute verbose_name: Название модели в единственном числе.
+        :type verbose_name: str
+        :attribute verbose_name_plural: Название модели во множественном числе.
+        :type verbose_name_plural: str
+        """
+        verbose_name = "Статистика пользователя"
+        verbose_name_plural = "Статистика пользователей"
+
+    @classmethod
+    def bump(cls, user_id: Optional[int], **deltas: int) -> None:
+        """
+        Изменяет счётчики пользователя на указанные величины.
+
+        :param user_id: ID пользователя (``None`` пропускается).
+        :type user_id: Optional[int]
+        :param deltas: Изменения счётчиков по именам.
+        :type deltas: int
+        """
+        changes: Dict[str, Any] = {name: models.F(name) + delta for name, delta in deltas.items() if delta}
+        if user_id is not None and changes:
+            cls.objects.filter(pk=user_id).update(**changes)
+
+    @classmethod
+    def bump_owner(cls, target_type: str, target_id: int, **deltas: int) -> None:
+        """
+        Изменяет счётчики владельца поля или автора комментария одним запросом.
+
+        :param target_type: Тип объекта (``field`` или ``comment``).
+        :type target_type: str
+        :param target_id: ID объекта.
+        :type target_id: int
+        :param deltas: Изменения счётчиков по именам.
+        :type deltas: int
+        """
+        owners = Field.objects.filter(pk=target_id).values('user_id') if target_type == Reaction.FIELD \
+            else Comment.objects.filter(pk=target_id).values('author_id')
+        cls.objects.filter(pk=models.Subquery(owners)).update(
+            **{name: models.F(name) + delta for name, delta in deltas.items()})
+
+    @classmethod
+    def compute(cls, user_ids: List[int]) -> Dict[int, Dict[str, int]]:
+        """
+        Подсчитывает статистику пользователей по исходным таблицам.
+
+        :param user_ids: ID пользователей.
+        :type user_ids: List[int]
+        :returns: Счётчики для каждого пользователя.
+        :rtype: Dict[int, Dict[str, int]]
+        """
+        stats: Dict[int, Dict[str, int]] = {user_id: dict.fromkeys(cls.COUNTERS, 0) for user_id in user_ids}
+        for row in Field.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+                total=models.Count('id')):
+            stats[row['user_id']]['fields_created'] = row['total']
+        for row in Comment.objects.filter(author_id__in=user_ids).values('author_id').annotate(
+                total=models.Count('id')):
+            stats[row['author_id']]['comments_written'] = row['total']
+        for row in Reaction.objects.filter(
+                user_id__in=user_ids, target_type=Reaction.FIELD, kind=Reaction.FAVORITE,
+                target_id__in=Field.objects.values('id')).values('user_id').annotate(total=models.Count('id')):
+            stats[row['user_id']]['favorites'] = row['total']
+        for target_type, owned in ((Reaction.FIELD, Field.objects.filter(user_id__in=user_ids)),
+                                   (Reaction.COMMENT, Comment.objects.filter(author_id__in=user_ids))):
+            owner_column: str = 'user_id' if target_type == Reaction.FIELD else 'author_id'
+            owner = models.Subquery(owned.model.objects.filter(pk=models.OuterRef('target_id')).values(owner_column))
+            for row in Reaction.objects.filter(
+                    target_type=target_type, kind=Reaction.LIKE, target_id__in=owned.values('id')).annotate(
+                    owner=owner).values('owner').annotate(total=models.Count('id')):
+                stats[row['owner']]['likes_received'] += row['total']
+        return stats
+
+    @classmethod
+    def for_user(cls, user: User) -> 'UserStats':
+        """
+        Возвращает статистику пользователя одним чтением по первичному ключу.
+
+        Если строки ещё нет, она создаётся полным подсчётом.
+
+        :param user: Пользователь.
+        :type user: :class:`main_app.models.User`
+        :returns: Статистика пользователя.
+        :rtype: :class:`main_app.models.UserStats`
+        """
+        stats: Optional[UserStats] = cls.objects.filter(pk=user.pk).first()
+        if stats is None:
+            cls.reconcile([user.pk])
+            stats = cls.objects.get(pk=user.pk)
+        return stats
+
+    @classmethod
+    def reconcile(cls, user_ids: Optional[List[int]] = None, batch_size: int = 500) -> int:
+        """
+        Сверяет счётчики с исходными таблицами и исправляет расхождения.
+
+        Строки пачки блокируются до подсчёта, а подсчёт и запись выполняются
+        в одной транзакции: инкремент :meth:`bump`, пришедший во время сверки,
+        ждёт её завершения и применяется к записанному значению, а не теряется.
+
+        :param user_ids: ID пользователей (по умолчанию — все пользователи).
+        :type user_ids: Optional[List[int]]
+        :param batch_size: Количество пользователей в пачке.
+        :type batch_size: int
+        :returns: Количество созданных или исправленных строк.
+        :rtype: int
+        """
+        users = User.objects.order_by('id').values_list('id', flat=True)
+        if user_ids is not None:
+            users = users.filter(id__in=user_ids)
+        corrected: int = 0
+        last_id: int = 0
+        while True:
+            batch: List[int] = list(users.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return corrected
+            last_id = batch[-1]
+            with transaction.atomic():
+                stored: Dict[int, Tuple[int, ...]] = {
+                    row[0]: row[1:] for row in cls.objects.select_for_update().filter(pk__in=batch).values_list(
+                        'pk', *cls.COUNTERS)}
+                expected: Dict[int, Dict[str, int]] = cls.compute(batch)
+                corrected += sum(1 for user_id, counters in expected.items()
+                                 if stored.get(user_id) != tuple(counters[name] for name in cls.COUNTERS))
+                now = timezone.now()
+                cls.objects.bulk_create(
+                    [cls(user_id=user_id, reconciled_at=now, **counters) for user_id, counters in expected.items()],
+                    update_conflicts=True, unique_fields=['user'], update_fields=[*cls.COUNTERS, 'reconciled_at'])
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление статистики.
+
+        :returns: Описание статистики с именем пользователя.
+        :rtype: str
+        """
+        return f"Статистика {self.user.username}"
+
+
+class BanCascade(models.Model):
+    """
+    Фоновая блокировка полей и комментариев заблокированного пользователя.
+
+    Задание обрабатывает сначала поля, затем комментарии пачками по
+    ``BAN_CASCADE_CHUNK_SIZE`` строк в порядке ID. Каждая пачка — отдельная
+    короткая транзакция, в которой вместе с блокировкой сохраняется позиция,
+    поэтому база не блокируется надолго, а прерванное задание продолжается
+    с последней пачки. Исполнитель захватывает задание арендой на
+    ``BAN_CASCADE_LEASE`` секунд и продлевает её после каждой пачки; задание
+    с истёкшей арендой подхватывает команда ``run_ban_cascades`` (в
+    ``docker-compose.yml`` — сервис ``cascades``). Позиция сохраняется только
+    при неизменном ``locked_until`` исполнителя: если аренду перехватил другой
+    исполнитель, пачка откатывается и исполнитель останавливается.
+
+    :attribute user: Заблокированный пользователь.
+    :type user: :class:`main_app.models.User`
+    :attribute stage: Текущий этап (``fields``, ``comments`` или ``done``).
+    :type stage: str
+    :attribute last_id: ID последней обработанной строки этапа.
+    :type last_id: int
+    :attribute total: Количество полей и комментариев пользователя (``None`` до начала работы).
+    :type total: Optional[int]
+    :attribute processed: Количество обработанных строк.
+    :type processed: int
+    :attribute blocked: Количество строк, заблокированных заданием.
+    :type blocked: int
+    :attribute created_at: Дата и время постановки задания.
+    :type created_at: :class:`django.db.models.DateTimeField`
+    :attribute locked_until: Окончание аренды исполнителя.
+    :type locked_until: Optional[:class:`django.db.models.DateTimeField`]
+    :attribute finished_at: Дата и время завершения.
+    :type finished_at: Optional[:class:`django.db.models.DateTimeField`]
+    """
+    FIELDS = 'fields'
+    COMMENTS = 'comments'
+    DONE = 'done'
+    STAGES = [
+        (FIELDS, 'Поля'),
+        (COMMENTS, 'Комментарии'),
+        (DONE, 'Завершено'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ban_cascades')
+    stage = models.CharField(max_length=16, choices=STAGES, default=FIELDS)
+    last_id = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+    blocked = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class LeaseLost(Exception):
+        """
+        Исключение, выбрасываемое, когда аренду задания захватил другой исполнитель.
+        """
+
+    class Meta:
+        """
+        Мета-данные для модели.
+
+        :attribute verbose_name: Название модели в единственном числе.
+        :type verbose_name: str
+        :attribute verbose_name_plural: Название модели во множественном числе.
+        :type verbose_name_plural: str
+        """
+        verbose_name = "Блокировка содержимого пользователя"
+        verbose_name_plural = "Блокировки содержимого пользователей"
+
+    @staticmethod
+    def stage_rows(stage: str, user_id: int) -> 'models.QuerySet':
+        """
+        Возвращает строки пользователя, обрабатываемые на этапе.
+
+        :param stage: Этап (``fields`` или ``comments``).
+        :type stage: str
+        :param user_id: ID пользователя.
+        :type user_id: int
+        :returns: Поля или комментарии пользователя.
+        :rtype: :class:`django.db.models.QuerySet`
+        """
+        if stage == BanCascade.FIELDS:
+            return Field.objects.filter(user_id=user_id)
+        return Comment.objects.filter(author_id=user_id)
+
+    @classmethod
+    def schedule(cls, user: User) -> 'BanCascade':
+        """
+        Ставит задание для пользователя или возвращает уже незавершённое.
+
+        :param user: Пользователь.
+        :type user: :class:`main_app.models.User`
+        :returns: Задание.
+        :rtype: :class:`main_app.models.BanCascade`
+        """
+        return cls.objects.filter(user=user, finished_at__isnull=True).first() or cls.objects.create(user=user)
+
+    @classmethod
+    def claim(cls, cascade_id: int) -> Optional['BanCascade']:
+        """
+        Захватывает задание, если оно не завершено и не занято другим исполнителем.
+
+        :param cascade_id: ID задания.
+        :type cascade_id: int
+        :returns: Захваченное задание или ``None``.
+        :rtype: Optional[:class:`main_app.models.BanCascade`]
+        """
+        now = timezone.now()
+        claimed: int = cls.objects.filter(
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now), pk=cascade_id, finished_at__isnull=True,
+        ).update(locked_until=now + timedelta(seconds=settings.BAN_CASCADE_LEASE))
+        return cls.objects.get(pk=cascade_id) if claimed else None
+
+    def step(self, chunk_size: Optional[int] = None) -> bool:
+        """
+        Обрабатывает одну пачку текущего этапа и продлевает аренду.
+
+        Позиция сохраняется условным ``UPDATE`` по аренде этого исполнителя
+        (``locked_until`` из :meth:`claim` или предыдущего шага); если строка
+        не обновилась, транзакция пачки откатывается.
+
+        :param chunk_size: Размер пачки (по умолчанию ``BAN_CASCADE_CHUNK_SIZE``).
+        :type chunk_size: Optional[int]
+        :returns: ``True``, если работа ещё осталась.
+        :rtype: bool
+        :raises BanCascade.LeaseLost: Если аренду захватил другой исполнитель.
+        """
+        size: int = chunk_size or settings.BAN_CASCADE_CHUNK_SIZE
+        now = timezone.now()
+        lease: Optional[Any] = self.locked_until
+        with transaction.atomic():
+            if self.total is None:
+                self.total = sum(self.stage_rows(stage, self.user_id).count() for stage in (self.FIELDS, self.COMMENTS))
+            rows: Any = self.stage_rows(self.stage, self.user_id)
+            ids: List[int] = list(rows.filter(id__gt=self.last_id).order_by('id').values_list('id', flat=True)[:size])
+            if ids:
+                changes: Dict[str, Any] = {'is_blocked': True}
+                if self.stage == self.FIELDS:
+                    changes['updated_at'] = now
+                self.blocked += rows.model.objects.filter(id__in=ids, is_blocked=False).update(**changes)
+                self.processed += len(ids)
+                self.last_id = ids[-1]
+            if len(ids) < size:
+                self.stage = self.COMMENTS if self.stage == self.FIELDS else self.DONE
+                self.last_id = 0
+            if self.stage == self.DONE:
+                self.finished_at = now
+                self.locked_until = None
+            else:
+                self.locked_until = now + timedelta(seconds=settings.BAN_CASCADE_LEASE)
+            saved: int = BanCascade.objects.filter(pk=self.pk, locked_until=lease, finished_at__isnull=True).update(
+                stage=self.stage, last_id=self.last_id, total=self.total, processed=self.processed,
+                blocked=self.blocked, locked_until=self.locked_until, finished_at=self.finished_at)
+            if not saved:
+                raise self.LeaseLost(self.pk)
+        return self.stage != self.DONE
+
+    @classmethod
+    def run(cls, cascade_id: int, chunk_size: Optional[int] = None) -> bool:
+        """
+        Захватывает задание и выполняет его до конца.
+
+        :param cascade_id: ID задания.
+        :type cascade_id: int
+        :param chunk_size: Размер пачки.
+        :type chunk_size: Optional[int]
+        :returns: ``True``, если задание выполнено этим вызовом.
+        :rtype: bool
+        """
+        cascade: Optional[BanCascade] = cls.claim(cascade_id)
+        if cascade is None:
+            return False
+        try:
+            while cascade.step(chunk_size):
+                pass
+        except cls.LeaseLost:
+            logger.warning("Ban cascade %s was taken over by another worker", cascade_id)
+            return False
+        logger.info("Ban cascade for user %s blocked %s of %s rows",
+                    cascade.user_id, cascade.blocked, cascade.processed)
+        return True
+
+    @classmethod
+    def run_pending(cls, chunk_size: Optional[int] = None) -> int:
+        """
+        Выполняет незавершённые задания, не занятые исполнителями.
+
+        :param chunk_size: Размер пачки.
+        :type chunk_size: Optional[int]
+        :returns: Количество выполненных заданий.
+        :rtype: int
+        """
+        ids: List[int] = list(cls.objects.filter(finished_at__isnull=True).order_by('id').values_list('id', flat=True))
+        return sum(cls.run(cascade_id, chunk_size) for cascade_id in ids)
+
+    @classmethod
+    def start(cls, cascade_id: int) -> threading.Thread:
+        """
+        Запускает выполнение задания в фоновом потоке.
+
+        Ошибка в потоке только записывается в журнал: задание с истёкшей
+        арендой продолжит команда ``run_ban_cascades``.
+
+        :param cascade_id: ID задания.
+        :type cascade_id: int
+        :returns: Запущенный поток.
+        :rtype: :class:`threading.Thread`
+        """
+        def work() -> None:
+            try:
+                cls.run(cascade_id)
+            except Exception as e:
+                logger.error("Ошибка фоновой блокировки содержимого, задание %s: %s", cascade_id, str(e))
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=work, name=f'ban-cascade-{cascade_id}', daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def progress(self) -> int:
+        """
+        Возвращает процент обработанных строк.
+
+        :returns: Процент от 0 до 100.
+        :rtype: int
+        """
+        if self.stage == self.DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(99, self.processed * 100 // self.total)
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление задания.
+
+        :returns: Описание задания с пользователем и прогрессом.
+        :rtype: str
+        """
+        return f"Блокировка содержимого {self.user_id}: {self.progress}%"
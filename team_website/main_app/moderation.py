@@ -0,0 +1,146 @@
+"""
+Массовые действия модерации над полями, комментариями и пользователями.
+
+Объекты задаются парами (тип, ID). Для каждого типа текущее состояние всех
+объектов читается одним запросом, а изменение применяется одним
+``UPDATE … WHERE id IN (…)`` только к объектам, состояние которых действительно
+меняется. Все типы обрабатываются в одной транзакции вместе с записью в журнал
+модерации (одна пакетная вставка), и для каждой пары возвращается свой результат.
+
+:mod:`main_app.moderation`
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from main_app.models import BanCascade, Comment, Field, ModerationLogEntry, User
+
+BLOCK: str = 'block'
+UNBLOCK: str = 'unblock'
+BAN: str = 'ban'
+ACTIONS: Tuple[str, ...] = (BLOCK, UNBLOCK, BAN)
+
+OK: str = 'ok'
+UNCHANGED: str = 'unchanged'
+NOT_FOUND: str = 'not_found'
+INVALID: str = 'invalid'
+UNSUPPORTED: str = 'unsupported'
+FORBIDDEN: str = 'forbidden'
+
+CONTENT_MODELS: Dict[str, Any] = {'field': Field, 'comment': Comment}
+SUPPORTED: Dict[str, Tuple[str, ...]] = {BLOCK: ('field', 'comment'), UNBLOCK: ('field', 'comment'), BAN: ('user',)}
+
+Item = Tuple[str, Optional[int]]
+
+_MAX_ID: int = 2 ** 63 - 1
+
+
+def parse_items(values: Iterable[str]) -> List[Item]:
+    """
+    Разбирает пары вида ``field:12``.
+
+    :param values: Строки с типом и ID через двоеточие.
+    :type values: Iterable[str]
+    :returns: Пары (тип, ID); у некорректной пары и у ID вне диапазона ключей базы ID равен ``None``.
+    :rtype: List[Tuple[str, Optional[int]]]
+    """
+    items: List[Item] = []
+    for value in values:
+        content_type, _, raw_id = value.partition(':')
+        try:
+            pk: Optional[int] = int(raw_id)
+        except ValueError:
+            pk = None
+        items.append((content_type, pk if pk is not None and 0 < pk <= _MAX_ID else None))
+    return items
+
+
+def _set_blocked(model: Any, ids: List[int], blocked: bool) -> Dict[int, str]:
+    current: Dict[int, bool] = dict(model.objects.filter(id__in=ids).values_list('id', 'is_blocked'))
+    changed: List[int] = [pk for pk, is_blocked in current.items() if is_blocked != blocked]
+    if changed:
+        changes: Dict[str, Any] = {'is_blocked': blocked}
+        if model is Field:
+            changes['updated_at'] = timezone.now()
+        model.objects.filter(id__in=changed).update(**changes)
+    return {pk: OK if pk in changed else UNCHANGED if pk in current else NOT_FOUND for pk in ids}
+
+
+def _ban(ids: List[int], moderator: User) -> Tuple[Dict[int, str], List[BanCascade]]:
+    users: Dict[int, Tuple[bool, bool]] = {
+        pk: (is_active, is_staff or is_superuser)
+        for pk, is_active, is_staff, is_superuser in User.objects.filter(id__in=ids).values_list(
+            'id', 'is_active', 'is_staff', 'is_superuser')}
+    results: Dict[int, str] = {}
+    for pk in ids:
+        if pk not in users:
+            results[pk] = NOT_FOUND
+        elif users[pk][1] or pk == moderator.pk:
+            results[pk] = FORBIDDEN
+        else:
+            results[pk] = OK if users[pk][0] else UNCHANGED
+    banned: List[int] = [pk for pk, status in results.items() if status == OK]
+    if not banned:
+        return results, []
+    User.objects.filter(id__in=banned).update(is_active=False)
+    scheduled: set = set(BanCascade.objects.filter(user_id__in=banned, finished_at__isnull=True).values_list(
+        'user_id', flat=True))
+    cascades: List[BanCascade] = BanCascade.objects.bulk_create(
+        [BanCascade(user_id=pk) for pk in banned if pk not in scheduled])
+    return results, cascades
+
+
+def apply(action: str, items: List[Item], moderator: User) -> Dict[str, Any]:
+    """
+    Применяет действие к объектам.
+
+    ``block`` и ``unblock`` применяются к полям и комментариям, ``ban`` —
+    к пользователям: аккаунты деактивируются сразу, а их содержимое
+    блокируется фоновыми заданиями :class:`main_app.models.BanCascade`.
+    Персонал и сам модератор не банятся.
+
+    :param action: Действие (``block``, ``unblock`` или ``ban``).
+    :type action: str
+    :param items: Пары (тип, ID).
+    :type items: List[Tuple[str, Optional[int]]]
+    :param moderator: Модератор.
+    :type moderator: :class:`main_app.models.User`
+    :returns: Результат для каждой пары в исходном порядке и количество изменённых объектов по типам.
+    :rtype: Dict[str, Any]
+    :raises ValueError: Если действие неизвестно.
+    """
+    if action not in ACTIONS:
+        raise ValueError(action)
+    grouped: Dict[str, List[int]] = {}
+    for content_type, pk in items:
+        if pk is not None and content_type in SUPPORTED[action]:
+            grouped.setdefault(content_type, []).append(pk)
+    statuses: Dict[str, Dict[int, str]] = {}
+    cascades: List[BanCascade] = []
+    with transaction.atomic():
+        for content_type, ids in grouped.items():
+            ids = list(dict.fromkeys(ids))
+            if content_type == 'user':
+                statuses[content_type], cascades = _ban(ids, moderator)
+            else:
+                statuses[content_type] = _set_blocked(CONTENT_MODELS[content_type], ids, action == BLOCK)
+        ModerationLogEntry.record(moderator, action, [
+            (content_type, pk) for content_type, by_id in statuses.items()
+            for pk, status in by_id.items() if status == OK], note='массовое действие')
+    if cascades and settings.BAN_CASCADE_BACKGROUND:
+        transaction.on_commit(lambda: [BanCascade.start(cascade.pk) for cascade in cascades])
+    results: List[Dict[str, Any]] = []
+    for content_type, pk in items:
+        if pk is None or content_type not in CONTENT_MODELS and content_type != 'user':
+            status: str = INVALID
+        elif content_type not in SUPPORTED[action]:
+            status = UNSUPPORTED
+        else:
+            status = statuses[content_type][pk]
+        results.append({'type': content_type, 'id': pk, 'status': status})
+    return {
+        'results': results,
+        'updated': {content_type: sum(status == OK for status in by_id.values())
+                    for content_type, by_id in statuses.items()},
+    }
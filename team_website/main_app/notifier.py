@@ -0,0 +1,134 @@
+"""
+Внутрипроцессный рассыльщик событий полей для SSE-потоков.
+
+Подписчики — асинхронные представления, каждое со своей очередью в своём
+цикле событий. Публикация вызывается из синхронного кода (после фиксации
+транзакции) и передаёт событие в очереди через ``call_soon_threadsafe``,
+поэтому синхронные обработчики не ждут медленных клиентов. Переполненная
+очередь теряет самое старое событие.
+
+События видны только подписчикам того же процесса; при нескольких процессах
+сервера клиент получает события, опубликованные его процессом.
+
+:mod:`main_app.notifier`
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, Set, Tuple
+
+Event = Tuple[str, Dict[str, Any]]
+
+
+class Subscription:
+    """
+    Подписка одного SSE-соединения на события поля.
+
+    :attribute field_id: ID поля.
+    :type field_id: int
+    :attribute queue: Очередь событий подписчика.
+    :type queue: :class:`asyncio.Queue`
+    """
+
+    def __init__(self, field_id: int, max_size: int) -> None:
+        """
+        Создаёт подписку в текущем цикле событий.
+
+        :param field_id: ID поля.
+        :type field_id: int
+        :param max_size: Максимальное количество недоставленных событий.
+        :type max_size: int
+        """
+        self.field_id: int = field_id
+        self.queue: 'asyncio.Queue[Event]' = asyncio.Queue(maxsize=max_size)
+        self.loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+    def offer(self, event: Event) -> None:
+        """
+        Кладёт событие в очередь, вытесняя самое старое при переполнении.
+
+        Вызывается только в цикле событий подписчика.
+
+        :param event: Имя события и данные.
+        :type event: Tuple[str, Dict[str, Any]]
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class FieldNotifier:
+    """
+    Реестр подписок на события полей.
+    """
+
+    def __init__(self) -> None:
+        """
+        Создаёт пустой реестр.
+        """
+        self._lock: threading.Lock = threading.Lock()
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+
+    def subscribe(self, field_id: int, max_size: int = 100) -> Subscription:
+        """
+        Подписывает текущий цикл событий на события поля.
+
+        :param field_id: ID поля.
+        :type field_id: int
+        :param max_size: Размер очереди подписчика.
+        :type max_size: int
+        :returns: Подписка.
+        :rtype: :class:`main_app.notifier.Subscription`
+        """
+        subscription = Subscription(field_id, max_size)
+        with self._lock:
+            self._subscriptions.setdefault(field_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Отменяет подписку.
+
+        :param subscription: Подписка.
+        :type subscription: :class:`main_app.notifier.Subscription`
+        """
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.field_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.field_id]
+
+    def subscriber_count(self, field_id: int) -> int:
+        """
+        Возвращает количество подписчиков поля.
+
+        :param field_id: ID поля.
+        :type field_id: int
+        :returns: Количество подписчиков.
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._subscriptions.get(field_id, ()))
+
+    def publish(self, field_id: int, event: str, data: Dict[str, Any]) -> None:
+        """
+        Рассылает событие всем подписчикам поля.
+
+        :param field_id: ID поля.
+        :type field_id: int
+        :param event: Имя события.
+        :type event: str
+        :param data: Данные события (сериализуемые в JSON).
+        :type data: Dict[str, Any]
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(field_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, (event, data))
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+
+notifier: FieldNotifier = FieldNotifier()
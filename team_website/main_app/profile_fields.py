@@ -0,0 +1,140 @@
+"""
+Постраничные списки полей профиля: созданные, понравившиеся и избранные.
+
+Страницы выбираются по курсору (см. :mod:`main_app.cursors`) через индексы,
+строки читаются проекцией ``values()`` с обрезанным на стороне базы описанием,
+а ссылки подставляются в шаблон URL, полученный одним вызовом ``reverse``.
+
+Готовые страницы кэшируются для каждого пользователя и типа списка. Ключи
+включают номер версии списка; :func:`invalidate` увеличивает номер, и все
+закэшированные страницы списка перестают читаться без перебора ключей.
+Списки реакций сбрасываются при переключении реакции и повторно — после
+записи буфера реакций в базу (см. :func:`main_app.reactions.flush`).
+
+:mod:`main_app.profile_fields`
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.db.models.functions import Substr
+from django.urls import reverse
+from main_app.cursors import Cursor, after, decode_cursor, encode_cursor
+from main_app.models import Field, Reaction
+
+MY: str = 'my'
+LIKED: str = 'liked'
+FAVORITES: str = 'favorites'
+LIST_TYPES: Dict[str, Optional[str]] = {MY: None, LIKED: Reaction.LIKE, FAVORITES: Reaction.FAVORITE}
+REACTION_LISTS: Dict[str, str] = {Reaction.LIKE: LIKED, Reaction.FAVORITE: FAVORITES}
+
+_URL_SENTINEL: int = 2147483647
+_COLUMNS: Tuple[str, ...] = ('id', 'title', 'excerpt', 'created_at')
+
+
+def _version_key(user_id: int, list_type: str) -> str:
+    return f'profile_fields:version:{user_id}:{list_type}'
+
+
+def _page_key(user_id: int, list_type: str, version: int, cursor: str) -> str:
+    return f'profile_fields:page:{user_id}:{list_type}:{version}:{cursor}'
+
+
+@lru_cache(maxsize=1)
+def field_url_template() -> str:
+    """
+    Возвращает шаблон URL страницы поля с местом для ID.
+
+    :returns: Шаблон для :meth:`str.format`.
+    :rtype: str
+    """
+    return reverse('card-detail', kwargs={'pk': _URL_SENTINEL}).replace(str(_URL_SENTINEL), '{}')
+
+
+def _fields() -> 'QuerySet[Field]':
+    return Field.objects.annotate(excerpt=Substr('description', 1, settings.PROFILE_FIELDS_DESCRIPTION_LENGTH))
+
+
+def build_page(user_id: int, list_type: str, cursor: Optional[Cursor]) -> Dict[str, Any]:
+    """
+    Выбирает страницу списка из базы.
+
+    :param user_id: ID пользователя.
+    :type user_id: int
+    :param list_type: Тип списка (``my``, ``liked`` или ``favorites``).
+    :type list_type: str
+    :param cursor: Позиция после предыдущей страницы (``None`` для первой).
+    :type cursor: Optional[Tuple[:class:`datetime.datetime`, int]]
+    :returns: Поля страницы и курсор следующей страницы (``None``, если её нет).
+    :rtype: Dict[str, Any]
+    """
+    size: int = settings.PROFILE_FIELDS_PAGE_SIZE
+    kind: Optional[str] = LIST_TYPES[list_type]
+    if kind is None:
+        rows: List[Dict[str, Any]] = list(_fields().filter(after(cursor), user_id=user_id).order_by(
+            '-created_at', '-id').values(*_COLUMNS)[:size + 1])
+        positions: List[Dict[str, Any]] = rows
+    else:
+        positions = list(Reaction.objects.filter(
+            after(cursor), user_id=user_id, target_type=Reaction.FIELD, kind=kind).order_by(
+            '-created_at', '-id').values('id', 'target_id', 'created_at')[:size + 1])
+        by_id: Dict[int, Dict[str, Any]] = {row['id']: row for row in _fields().filter(
+            id__in=[position['target_id'] for position in positions[:size]]).values(*_COLUMNS)}
+        rows = [by_id[position['target_id']] for position in positions[:size] if position['target_id'] in by_id]
+    has_more: bool = len(positions) > size
+    template: str = field_url_template()
+    return {
+        'fields': [{
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['excerpt'],
+            'created_at': row['created_at'].strftime("%d.%m.%Y"),
+            'url': template.format(row['id']),
+        } for row in rows[:size]],
+        'next_cursor': encode_cursor(positions[size - 1]['created_at'], positions[size - 1]['id'])
+        if has_more else None,
+    }
+
+
+def page(user_id: int, list_type: str, cursor: str = '') -> Dict[str, Any]:
+    """
+    Возвращает страницу списка из кэша, выбирая её из базы при промахе.
+
+    :param user_id: ID пользователя.
+    :type user_id: int
+    :param list_type: Тип списка.
+    :type list_type: str
+    :param cursor: Курсор из ``next_cursor`` предыдущей страницы (пустой для первой).
+    :type cursor: str
+    :returns: Поля страницы и курсор следующей страницы.
+    :rtype: Dict[str, Any]
+    :raises KeyError: Если тип списка неизвестен.
+    :raises ValueError: Если курсор некорректен.
+    """
+    if list_type not in LIST_TYPES:
+        raise KeyError(list_type)
+    position: Optional[Cursor] = decode_cursor(cursor) if cursor else None
+    version: int = cache.get(_version_key(user_id, list_type), 0)
+    key: str = _page_key(user_id, list_type, version, cursor)
+    result: Optional[Dict[str, Any]] = cache.get(key)
+    if result is None:
+        result = build_page(user_id, list_type, position)
+        cache.set(key, result, settings.PROFILE_FIELDS_CACHE_TIMEOUT)
+    return result
+
+
+def invalidate(user_id: int, *list_types: str) -> None:
+    """
+    Сбрасывает закэшированные страницы списков пользователя.
+
+    :param user_id: ID пользователя.
+    :type user_id: int
+    :param list_types: Типы списков.
+    :type list_types: str
+    """
+    for list_type in list_types:
+        key: str = _version_key(user_id, list_type)
+        cache.add(key, 0, None)
+        cache.incr(key)
@@ -0,0 +1,122 @@
+"""
+Ограничение частоты запросов к пишущим и поисковым представлениям.
+
+Лимиты задаются настройкой ``RATE_LIMITS`` по представлению — полному имени
+функции или класса (например, ``'main_app.views.add_comment'``): для каждого
+представления указываются допустимое количество запросов ``limit`` за
+``window`` секунд. Ключ по представлению, а не по имени маршрута, даёт один
+общий счётчик всем маршрутам, ведущим к одному представлению. Запросы
+считаются для пользователя, а для анонимных запросов — для IP-адреса
+(``REMOTE_ADDR``). Счётчики хранятся в кэше ``default``; лимиты общие для
+всех процессов только с общим кэшем (Redis, см. ``REDIS_URL``).
+
+Используется скользящее окно из двух фиксированных: счётчик текущего окна
+увеличивается атомарным ``incr`` общего кэша, а счётчик предыдущего окна
+учитывается с весом, равным доле, ещё не вышедшей из скользящего окна. Проверка
+стоит три обращения к кэшу и не трогает базу.
+
+:mod:`main_app.ratelimit`
+"""
+
+import math
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+KEY_PREFIX: str = 'ratelimit'
+
+
+def client_key(request: HttpRequest) -> str:
+    """
+    Возвращает ключ клиента: ID пользователя или IP-адрес анонимного клиента.
+
+    :param request: HTTP-запрос.
+    :type request: :class:`django.http.HttpRequest`
+    :returns: Ключ клиента.
+    :rtype: str
+    """
+    user: Any = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def view_scope(view_func: Callable[..., Any]) -> str:
+    """
+    Возвращает полное имя представления, по которому ищется лимит.
+
+    :param view_func: Функция представления или результат ``as_view()``.
+    :type view_func: Callable
+    :returns: Модуль и квалифицированное имя функции или класса представления.
+    :rtype: str
+    """
+    view: Any = getattr(view_func, 'view_class', view_func)
+    return f'{view.__module__}.{view.__qualname__}'
+
+
+def hit(key: str, limit: int, window: int, now: Optional[float] = None) -> Tuple[bool, int]:
+    """
+    Учитывает запрос и проверяет, укладывается ли он в лимит.
+
+    :param key: Ключ счётчика (представление и клиент).
+    :type key: str
+    :param limit: Допустимое количество запросов за окно.
+    :type limit: int
+    :param window: Длина окна в секундах.
+    :type window: int
+    :param now: Текущее время (по умолчанию ``time.time()``).
+    :type now: Optional[float]
+    :returns: Разрешён ли запрос и через сколько секунд повторить отклонённый запрос.
+    :rtype: Tuple[bool, int]
+    """
+    now = time.time() if now is None else now
+    slot: int = int(now // window)
+    current_key: str = f'{KEY_PREFIX}:{key}:{slot}'
+    cache.add(current_key, 0, window * 2)
+    current: int = cache.incr(current_key)
+    previous: int = cache.get(f'{KEY_PREFIX}:{key}:{slot - 1}', 0)
+    remaining: float = window - (now - slot * window)
+    if previous * remaining / window + current <= limit:
+        return True, 0
+    if current > limit or not previous:
+        return False, max(1, math.ceil(remaining))
+    return False, max(1, math.ceil(remaining - (limit - current) * window / previous))
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """
+    Промежуточный слой, отклоняющий запросы сверх лимитов ``RATE_LIMITS``.
+
+    Работает после определения маршрута и аутентификации, поэтому должен стоять
+    в ``MIDDLEWARE`` после ``AuthenticationMiddleware``.
+    """
+
+    def process_view(self, request: HttpRequest, view_func: Callable[..., Any], view_args: Any,
+                     view_kwargs: Dict[str, Any]) -> Optional[HttpResponse]:
+        """
+        Проверяет лимит представления перед его вызовом.
+
+        :param request: HTTP-запрос.
+        :type request: :class:`django.http.HttpRequest`
+        :param view_func: Представление.
+        :type view_func: Callable
+        :param view_args: Позиционные аргументы представления.
+        :type view_args: Any
+        :param view_kwargs: Именованные аргументы представления.
+        :type view_kwargs: Dict[str, Any]
+        :returns: Ответ 429, если лимит превышен, иначе ``None``.
+        :rtype: Optional[:class:`django.http.HttpResponse`]
+        """
+        scope: str = view_scope(view_func)
+        rule: Optional[Dict[str, int]] = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+        if rule is None:
+            return None
+        allowed, retry_after = hit(f'{scope}:{client_key(request)}', rule['limit'], rule['window'])
+        if allowed:
+            return None
+        response: JsonResponse = JsonResponse({'error': 'Too many requests'}, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -0,0 +1,354 @@
+"""
+Буфер отложенной записи реакций (лайков и избранного) на поля.
+
+Переключение реакции не пишет в базу сразу. Для каждой пары (поле, пользователь)
+в кэше хранится счётчик переключений, засеянный состоянием из базы (0 или 1):
+переключение — атомарный ``incr``, текущее состояние — чётность счётчика,
+поэтому одновременные переключения одной пары не теряются и не расходятся
+со счётчиком поля. Дельта счётчика поля меняется на фактический переход,
+который дал этот ``incr``, а пара записывается в журнал операций с порядковым
+номером. Сброс (:func:`flush`) применяет чётность пар пачками в одной
+транзакции и уменьшает их счётчики на чётное число, не меняя состояния.
+Чтения объединяют данные базы с буфером, поэтому пользователь сразу видит
+результат своего действия.
+
+Переключение и сброс также сбрасывают кэш списков понравившихся и избранных
+полей профиля (см. :mod:`main_app.profile_fields`).
+
+Буфер работает только с кэшем, общим для всех процессов и атомарно выполняющим
+``incr`` с отрицательным шагом: бэкенд кэша ``default`` должен входить в
+``REACTION_BUFFER_BACKENDS`` (по умолчанию Redis, см. ``REDIS_URL``).
+С локальным кэшем процесса (LocMem) переключения разных воркеров gunicorn
+не видели бы друг друга и терялись бы при вытеснении, поэтому без общего кэша
+:func:`toggle` пишет в базу сразу через :meth:`main_app.models.Reaction.toggle`.
+
+Сброс запускается из самого пути переключения, когда с прошлого сброса прошло
+``REACTION_FLUSH_INTERVAL`` секунд или накопилось ``REACTION_FLUSH_BATCH``
+операций, а также командой ``flush_reactions --interval``, которая в
+``docker-compose.yml`` работает отдельным сервисом ``scheduler``.
+
+:mod:`main_app.reactions`
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from main_app import profile_fields
+from main_app.models import Field, Reaction, ReactionCount, User, UserStats
+
+KINDS: Tuple[str, ...] = (Reaction.LIKE, Reaction.FAVORITE)
+
+SEQUENCE_KEY: str = 'reactions:seq'
+FLUSHED_KEY: str = 'reactions:flushed'
+LAST_FLUSH_KEY: str = 'reactions:last_flush'
+LOCK_KEY: str = 'reactions:lock'
+LOCK_TIMEOUT: int = 60
+STATE_TIMEOUT: int = 86400
+
+Target = Tuple[str, int, int]
+
+
+def _flips_key(kind: str, field_id: int, user_id: int) -> str:
+    return f'reactions:flips:{kind}:{field_id}:{user_id}'
+
+
+def _delta_key(kind: str, field_id: int) -> str:
+    return f'reactions:delta:{kind}:{field_id}'
+
+
+def _op_key(sequence: int) -> str:
+    return f'reactions:op:{sequence}'
+
+
+def _gap_key(sequence: int) -> str:
+    return f'reactions:gap:{sequence}'
+
+
+def _stored(kind: str) -> Any:
+    return Reaction.objects.filter(target_type=Reaction.FIELD, kind=kind)
+
+
+def _incr(key: str, amount: int) -> int:
+    cache.add(key, 0, None)
+    return cache.incr(key, amount)
+
+
+def buffered() -> bool:
+    """
+    Проверяет, настроен ли общий кэш, с которым работает буфер.
+
+    :returns: ``True``, если бэкенд кэша ``default`` входит в ``REACTION_BUFFER_BACKENDS``.
+    :rtype: bool
+    """
+    return settings.CACHES['default']['BACKEND'] in settings.REACTION_BUFFER_BACKENDS
+
+
+def has_reacted(kind: str, field_id: int, user_id: Optional[int]) -> bool:
+    """
+    Проверяет, поставил ли пользователь реакцию, с учётом буфера.
+
+    :param kind: Вид реакции (``'like'`` или ``'favorite'``).
+    :type kind: str
+    :param field_id: ID поля.
+    :type field_id: int
+    :param user_id: ID пользователя (``None`` для анонимного).
+    :type user_id: Optional[int]
+    :returns: ``True``, если реакция стоит.
+    :rtype: bool
+    """
+    if user_id is None:
+        return False
+    flips: Optional[int] = cache.get(_flips_key(kind, field_id, user_id)) if buffered() else None
+    if flips is not None:
+        return flips % 2 == 1
+    return _stored(kind).filter(target_id=field_id, user_id=user_id).exists()
+
+
+def count(kind: str, field_id: int) -> int:
+    """
+    Возвращает количество реакций на поле с учётом несброшенных изменений.
+
+    :param kind: Вид реакции.
+    :type kind: str
+    :param field_id: ID поля.
+    :type field_id: int
+    :returns: Количество реакций.
+    :rtype: int
+    """
+    stored: int = ReactionCount.get(Reaction.FIELD, field_id, kind)
+    return stored + ((cache.get(_delta_key(kind, field_id)) or 0) if buffered() else 0)
+
+
+def bulk_state(field_ids: List[int], user_id: Optional[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Возвращает состояние реакций пользователя и счётчики для набора полей.
+
+    Данные базы читаются одним запросом к счётчикам
+    :class:`main_app.models.ReactionCount` с проверкой реакции пользователя по
+    уникальному индексу реакций, буфер — двумя обращениями к кэшу.
+
+    :param field_ids: ID полей.
+    :type field_ids: List[int]
+    :param user_id: ID пользователя (``None`` для анонимного).
+    :type user_id: Optional[int]
+    :returns: Для каждого поля — флаги ``is_liked``/``is_favorited`` и счётчики
+        ``likes_count``/``favorites_count``.
+    :rtype: Dict[int, Dict[str, Any]]
+    """
+    totals: Dict[Tuple[int, str], int] = {}
+    mine: Set[Tuple[int, str]] = set()
+    own = Reaction.objects.filter(target_type=OuterRef('target_type'), target_id=OuterRef('target_id'),
+                                  kind=OuterRef('kind'), user_id=user_id)
+    for target_id, kind, total, reacted in ReactionCount.objects.filter(
+            target_type=Reaction.FIELD, target_id__in=field_ids).annotate(mine=Exists(own)).values_list(
+            'target_id', 'kind', 'count', 'mine'):
+        totals[(target_id, kind)] = total
+        if reacted:
+            mine.add((target_id, kind))
+    deltas: Dict[str, int] = cache.get_many(
+        [_delta_key(kind, f) for f in field_ids for kind in KINDS]) if buffered() else {}
+    pending: Dict[str, int] = cache.get_many(
+        [_flips_key(kind, f, user_id) for f in field_ids for kind in KINDS]) if buffered() and user_id else {}
+    result: Dict[int, Dict[str, Any]] = {}
+    for field_id in field_ids:
+        state: Dict[str, Any] = {}
+        for kind, flag, counter in ((Reaction.LIKE, 'is_liked', 'likes_count'),
+                                    (Reaction.FAVORITE, 'is_favorited', 'favorites_count')):
+            flips: Optional[int] = pending.get(_flips_key(kind, field_id, user_id))
+            state[flag] = flips % 2 == 1 if flips is not None else (field_id, kind) in mine
+            state[counter] = totals.get((field_id, kind), 0) + deltas.get(_delta_key(kind, field_id), 0)
+        result[field_id] = state
+    return result
+
+
+def toggle(kind: str, field_id: int, user_id: int) -> Tuple[bool, int]:
+    """
+    Переключает реакцию пользователя, откладывая запись в базу.
+
+    Без общего кэша (см. :func:`buffered`) реакция записывается в базу сразу.
+
+    :param kind: Вид реакции.
+    :type kind: str
+    :param field_id: ID поля.
+    :type field_id: int
+    :param user_id: ID пользователя.
+    :type user_id: int
+    :returns: Новое состояние реакции и количество реакций на поле.
+    :rtype: Tuple[bool, int]
+    :raises KeyError: Если вид реакции неизвестен.
+    """
+    if kind not in KINDS:
+        raise KeyError(kind)
+    if not buffered():
+        result: Tuple[bool, int] = Reaction.toggle(Reaction.FIELD, field_id, User(pk=user_id), kind)
+        profile_fields.invalidate(user_id, profile_fields.REACTION_LISTS[kind])
+        return result
+    key: str = _flips_key(kind, field_id, user_id)
+    if cache.get(key) is None:
+        stored: bool = _stored(kind).filter(target_id=field_id, user_id=user_id).exists()
+        cache.add(key, int(stored), STATE_TIMEOUT)
+    value: bool = cache.incr(key) % 2 == 1
+    sequence: int = _incr(SEQUENCE_KEY, 1)
+    cache.set(_op_key(sequence), (kind, field_id, user_id), None)
+    _incr(_delta_key(kind, field_id), 1 if value else -1)
+    profile_fields.invalidate(user_id, profile_fields.REACTION_LISTS[kind])
+    maybe_flush()
+    return value, count(kind, field_id)
+
+
+def pending_operations() -> int:
+    """
+    Возвращает количество операций, ожидающих сброса.
+
+    :returns: Количество операций.
+    :rtype: int
+    """
+    return (cache.get(SEQUENCE_KEY) or 0) - (cache.get(FLUSHED_KEY) or 0)
+
+
+def maybe_flush() -> int:
+    """
+    Сбрасывает буфер, если истёк интервал или накопилась полная пачка.
+
+    :returns: Количество применённых изменений.
+    :rtype: int
+    """
+    now: float = time.time()
+    if cache.add(LAST_FLUSH_KEY, now, None) and pending_operations() < settings.REACTION_FLUSH_BATCH:
+        return 0
+    last_flush: float = cache.get(LAST_FLUSH_KEY) or 0
+    if now - last_flush < settings.REACTION_FLUSH_INTERVAL and pending_operations() < settings.REACTION_FLUSH_BATCH:
+        return 0
+    return flush()
+
+
+def _apply(kind: str, wanted: Dict[Tuple[int, int], bool]) -> Tuple[Dict[int, int], int]:
+    """
+    Приводит строки реакций к желаемым состояниям.
+
+    Пары с удалёнными за время буферизации полями или пользователями пропускаются.
+    Счётчики полей и статистика пользователей (лайки владельцев полей и избранное)
+    обновляются на фактическое изменение.
+
+    :param kind: Вид реакции.
+    :type kind: str
+    :param wanted: Желаемое состояние для каждой пары (поле, пользователь).
+    :type wanted: Dict[Tuple[int, int], bool]
+    :returns: Фактическое изменение количества реакций по полям и число изменённых строк.
+    :rtype: Tuple[Dict[int, int], int]
+    """
+    owners: Dict[int, int] = dict(Field.objects.filter(
+        id__in={field_id for field_id, _ in wanted}).values_list('id', 'user_id'))
+    field_ids: Set[int] = set(owners)
+    user_ids: Set[int] = set(User.objects.filter(
+        id__in={user_id for _, user_id in wanted}).values_list('id', flat=True))
+    wanted = {pair: value for pair, value in wanted.items() if pair[0] in field_ids and pair[1] in user_ids}
+    existing: Set[Tuple[int, int]] = set(_stored(kind).filter(
+        target_id__in=field_ids, user_id__in=user_ids).values_list('target_id', 'user_id'))
+    inserts: List[Tuple[int, int]] = [pair for pair, value in wanted.items() if value and pair not in existing]
+    deletes: Dict[int, List[int]] = {}
+    for (field_id, user_id), value in wanted.items():
+        if not value and (field_id, user_id) in existing:
+            deletes.setdefault(field_id, []).append(user_id)
+    Reaction.objects.bulk_create([Reaction(target_type=Reaction.FIELD, target_id=f, user_id=u, kind=kind)
+                                  for f, u in inserts], ignore_conflicts=True)
+    for field_id, users in deletes.items():
+        _stored(kind).filter(target_id=field_id, user_id__in=users).delete()
+    changes: Dict[int, int] = {}
+    stats: Dict[int, int] = {}
+    for field_id, user_id in inserts:
+        changes[field_id] = changes.get(field_id, 0) + 1
+        stats[user_id] = stats.get(user_id, 0) + 1
+    for field_id, users in deletes.items():
+        changes[field_id] = changes.get(field_id, 0) - len(users)
+        for user_id in users:
+            stats[user_id] = stats.get(user_id, 0) - 1
+    if kind == Reaction.LIKE:
+        stats = {}
+        for field_id, change in changes.items():
+            stats[owners[field_id]] = stats.get(owners[field_id], 0) + change
+    ReactionCount.bump_many(Reaction.FIELD, kind, changes)
+    counter: str = 'likes_received' if kind == Reaction.LIKE else 'favorites'
+    for user_id, change in stats.items():
+        UserStats.bump(user_id, **{counter: change})
+    return changes, len(inserts) + sum(len(users) for users in deletes.values())
+
+
+def _abandoned(sequence: int) -> bool:
+    """
+    Проверяет, что запись операции с выданным номером не появилась за ``LOCK_TIMEOUT`` секунд.
+
+    Время, когда сброс впервые не нашёл запись, хранится в кэше.
+
+    :param sequence: Порядковый номер операции.
+    :type sequence: int
+    :returns: ``True``, если номер можно пропустить.
+    :rtype: bool
+    """
+    now: float = time.time()
+    cache.add(_gap_key(sequence), now, STATE_TIMEOUT)
+    return now - (cache.get(_gap_key(sequence)) or now) >= LOCK_TIMEOUT
+
+
+def flush() -> int:
+    """
+    Применяет накопленные реакции к базе одной транзакцией.
+
+    Обрабатываются пары из операций до первого номера, запись которого ещё не
+    появилась в кэше: :func:`toggle` получает номер до записи операции, и
+    следующий сброс продолжит с этого номера. Номер, запись которого не появилась
+    за ``LOCK_TIMEOUT`` секунд (процесс упал между двумя шагами), пропускается.
+    Счётчики переключений уменьшаются на чётное число, поэтому переключения,
+    пришедшие во время сброса, сохраняют своё состояние и применяются следующим сбросом.
+
+    :returns: Количество применённых изменений строк.
+    :rtype: int
+    """
+    if not cache.add(LOCK_KEY, 1, LOCK_TIMEOUT):
+        return 0
+    try:
+        last: int = cache.get(SEQUENCE_KEY) or 0
+        start: int = cache.get(FLUSHED_KEY) or 0
+        cache.set(LAST_FLUSH_KEY, time.time(), None)
+        if last <= start:
+            return 0
+        ops: Dict[str, Target] = cache.get_many([_op_key(sequence) for sequence in range(start + 1, last + 1)])
+        end: int = start
+        while end < last and (_op_key(end + 1) in ops or _abandoned(end + 1)):
+            end += 1
+        if end == start:
+            return 0
+        op_keys: List[str] = [_op_key(sequence) for sequence in range(start + 1, end + 1)]
+        targets: Set[Target] = {ops[key] for key in op_keys if key in ops}
+        flip_keys: Dict[str, Target] = {_flips_key(*target): target for target in targets}
+        flips: Dict[str, int] = cache.get_many(list(flip_keys))
+        wanted: Dict[str, Dict[Tuple[int, int], bool]] = {kind: {} for kind in KINDS}
+        for key, value in flips.items():
+            kind, field_id, user_id = flip_keys[key]
+            wanted[kind][(field_id, user_id)] = value % 2 == 1
+        applied: Dict[Tuple[str, int], int] = {}
+        rows: int = 0
+        with transaction.atomic():
+            for kind, pairs in wanted.items():
+                if pairs:
+                    changes, changed_rows = _apply(kind, pairs)
+                    rows += changed_rows
+                    for field_id, change in changes.items():
+                        applied[(kind, field_id)] = change
+        for (kind, field_id), change in applied.items():
+            if change:
+                _incr(_delta_key(kind, field_id), -change)
+        for kind, pairs in wanted.items():
+            for user_id in {user_id for _, user_id in pairs}:
+                profile_fields.invalidate(user_id, profile_fields.REACTION_LISTS[kind])
+        for key, value in flips.items():
+            if value > 1:
+                cache.decr(key, value - value % 2)
+        cache.delete_many(op_keys + [_gap_key(sequence) for sequence in range(start + 1, end + 1)])
+        cache.set(FLUSHED_KEY, end, None)
+        return rows
+    finally:
+        cache.delete(LOCK_KEY)
@@ -0,0 +1,181 @@
+"""
+Сжатое хранение трасс исполнения программ с контрольными точками.
+
+Трасса — последовательность состояний исполнителя (словарей с позицией робота,
+счётчиком команд, переменными и закрашенными клетками). Она делится на блоки
+по ``interval`` шагов: каждый блок начинается с полного состояния (контрольной
+точки), за которым следуют дельты относительно предыдущего шага. Блоки
+сжимаются независимо, поэтому переход к шагу ``n`` распаковывает один блок
+и применяет не более ``interval - 1`` дельт, а не проигрывает трассу с нуля.
+
+:mod:`main_app.replay`
+"""
+
+import json
+import zlib
+from typing import Any, Dict, Iterator, List, Tuple
+
+State = Dict[str, Any]
+
+DEFAULT_CHECKPOINT_INTERVAL: int = 256
+
+
+def diff_states(previous: State, current: State) -> State:
+    """
+    Вычисляет дельту между двумя состояниями.
+
+    Вложенные словари (переменные, клетки) сравниваются поэлементно;
+    удалённый ключ кодируется значением ``None``.
+
+    :param previous: Предыдущее состояние.
+    :type previous: Dict[str, Any]
+    :param current: Текущее состояние.
+    :type current: Dict[str, Any]
+    :returns: Дельта, содержащая только изменившиеся ключи.
+    :rtype: Dict[str, Any]
+    """
+    delta: State = {}
+    for key in previous.keys() | current.keys():
+        old, new = previous.get(key), current.get(key)
+        if old == new:
+            continue
+        if isinstance(old, dict) and isinstance(new, dict):
+            delta[key] = {k: new.get(k) for k in old.keys() | new.keys() if old.get(k) != new.get(k)}
+        else:
+            delta[key] = new
+    return delta
+
+
+def apply_delta(state: State, delta: State) -> State:
+    """
+    Применяет дельту к состоянию и возвращает новое состояние.
+
+    :param state: Исходное состояние (не изменяется).
+    :type state: Dict[str, Any]
+    :param delta: Дельта, полученная :func:`diff_states`.
+    :type delta: Dict[str, Any]
+    :returns: Новое состояние.
+    :rtype: Dict[str, Any]
+    """
+    result: State = dict(state)
+    for key, value in delta.items():
+        old = state.get(key)
+        if isinstance(old, dict) and isinstance(value, dict):
+            merged = dict(old)
+            for item_key, item_value in value.items():
+                if item_value is None:
+                    merged.pop(item_key, None)
+                else:
+                    merged[item_key] = item_value
+            result[key] = merged
+        elif value is None:
+            result.pop(key, None)
+        else:
+            result[key] = value
+    return result
+
+
+def encode_trace(states: List[State], interval: int = DEFAULT_CHECKPOINT_INTERVAL) -> Tuple[bytes, List[int]]:
+    """
+    Кодирует трассу в сжатые блоки с контрольными точками.
+
+    :param states: Состояния исполнителя по шагам.
+    :type states: List[Dict[str, Any]]
+    :param interval: Количество шагов в блоке (расстояние между контрольными точками).
+    :type interval: int
+    :returns: Сжатые данные и смещения начала каждого блока.
+    :rtype: Tuple[bytes, List[int]]
+    :raises ValueError: Если интервал не положителен.
+    """
+    if interval < 1:
+        raise ValueError('Интервал контрольных точек должен быть положительным')
+    chunks: List[bytes] = []
+    offsets: List[int] = []
+    position = 0
+    for start in range(0, len(states), interval):
+        block = states[start:start + interval]
+        records = [block[0]] + [diff_states(prev, cur) for prev, cur in zip(block, block[1:])]
+        chunk = zlib.compress(json.dumps(records, separators=(',', ':')).encode('utf-8'), 6)
+        offsets.append(position)
+        chunks.append(chunk)
+        position += len(chunk)
+    return b''.join(chunks), offsets
+
+
+def _decode_block(data: bytes, offsets: List[int], block: int) -> List[State]:
+    """
+    Распаковывает один блок трассы.
+
+    :param data: Сжатые данные трассы.
+    :type data: bytes
+    :param offsets: Смещения блоков.
+    :type offsets: List[int]
+    :param block: Номер блока.
+    :type block: int
+    :returns: Контрольная точка и дельты блока.
+    :rtype: List[Dict[str, Any]]
+    """
+    end = offsets[block + 1] if block + 1 < len(offsets) else len(data)
+    return json.loads(zlib.decompress(bytes(data[offsets[block]:end])))
+
+
+def iter_states(data: bytes, offsets: List[int], interval: int, start: int, count: int,
+                step_count: int) -> Iterator[State]:
+    """
+    Последовательно восстанавливает состояния, начиная с шага ``start``.
+
+    Распаковка начинается с ближайшей контрольной точки не после ``start``.
+
+    :param data: Сжатые данные трассы.
+    :type data: bytes
+    :param offsets: Смещения блоков.
+    :type offsets: List[int]
+    :param interval: Расстояние между контрольными точками.
+    :type interval: int
+    :param start: Номер первого возвращаемого шага.
+    :type start: int
+    :param count: Максимальное количество возвращаемых шагов.
+    :type count: int
+    :param step_count: Общее количество шагов в трассе.
+    :type step_count: int
+    :returns: Итератор состояний.
+    :rtype: Iterator[Dict[str, Any]]
+    :raises IndexError: Если ``start`` выходит за пределы трассы.
+    """
+    if not 0 <= start < step_count:
+        raise IndexError('Шаг вне диапазона трассы')
+    stop = min(start + count, step_count)
+    block = start // interval
+    step = block * interval
+    while step < stop:
+        records = _decode_block(data, offsets, block)
+        state = records[0]
+        for index, record in enumerate(records):
+            if index:
+                state = apply_delta(state, record)
+            if step >= start:
+                yield state
+            step += 1
+            if step >= stop:
+                return
+        block += 1
+
+
+def seek(data: bytes, offsets: List[int], interval: int, step: int, step_count: int) -> State:
+    """
+    Возвращает состояние на шаге ``step``, распаковывая один блок.
+
+    :param data: Сжатые данные трассы.
+    :type data: bytes
+    :param offsets: Смещения блоков.
+    :type offsets: List[int]
+    :param interval: Расстояние между контрольными точками.
+    :type interval: int
+    :param step: Номер шага.
+    :type step: int
+    :param step_count: Общее количество шагов в трассе.
+    :type step_count: int
+    :returns: Состояние исполнителя.
+    :rtype: Dict[str, Any]
+    """
+    return next(iter_states(data, offsets, interval, step, 1, step_count))
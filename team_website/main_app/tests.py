@@ -1,25 +1,53 @@
 """
 Тесты для сайта команды AlgEdu
 """
+import asyncio
+import json
 import logging
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO
+from unittest import skipUnless
 from unittest.mock import MagicMock, patch
+from django.conf import settings
 from django.contrib.admin import AdminSite
 from django.contrib.messages.storage.fallback import FallbackStorage
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db.models import QuerySet
 from django.http import HttpResponseRedirect
-from django.test import TestCase, Client, RequestFactory
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, models
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse, resolve
 from main_app.admin import FieldReportAdmin
 from main_app.views import (IndexView, UserLoginView, ProfileUpdateView, ProfileView, UserRegisterView, FieldDetailView,
                             ReportFieldView, AboutPageView, GoalsPageView, FieldCreateView, ModerationPanelView,
                             ProfileFieldsAPIView, ResolveFieldReportView, ResolveCommentReportView, UnblockContentView,
                             BlockContentView, moderation_panel, FieldListView)
-from main_app.models import User, Field, Comment, ProfileComment, Wall, Cell, FieldReport
+from main_app.models import (User, Field, Comment, ProfileComment, Wall, Cell, FieldReport, Submission,
+                             ReportQueueEntry, BanCascade, ModerationLogEntry,
+                             LeaderboardEntry, ExecutionReplay, Reaction, ReactionCount, ReportCounter, ModerationAction,
+                             TextFingerprint, UserStats)
+from main_app import avatars, moderation, profile_fields, ratelimit, reactions, simhash, timeline
+from main_app.notifier import notifier
 from main_app.forms import FieldForm, ProfileUpdateForm, RegistrationForm
+from main_app.cursors import after
+from main_app.replay import encode_trace, seek
 from django.contrib.auth.password_validation import validate_password
 from django import forms
+from django.utils import timezone
 from django.utils.translation import gettext_lazy
+from PIL import Image
+
+
+def field_reactions(field, kind):
+    return Reaction.for_target(Reaction.FIELD, field.id, kind)
 
 
 class TemplateTests(TestCase):
@@ -182,17 +210,17 @@ class ModelTests(TestCase):
         self.assertFalse(self.field.is_blocked)
 
     def test_field_likes(self):
-        self.field.likes.add(self.user)
-        self.assertEqual(self.field.likes.count(), 1)
+        self.field.toggle_like(self.user)
+        self.assertEqual(Reaction.for_target(Reaction.FIELD, self.field.id, Reaction.LIKE).count(), 1)
 
     def test_field_favorites(self):
-        self.field.favorites.add(self.user)
-        self.assertEqual(self.field.favorites.count(), 1)
+        self.field.toggle_favorite(self.user)
+        self.assertEqual(Reaction.for_target(Reaction.FIELD, self.field.id, Reaction.FAVORITE).count(), 1)
 
     def test_comment_likes(self):
         comment = Comment.objects.create(field=self.field, author=self.user, text='Test')
-        comment.likes.add(self.user)
-        self.assertEqual(comment.likes.count(), 1)
+        comment.toggle_like(self.user)
+        self.assertEqual(comment.likes_count(), 1)
 
     def test_cell_default_blocked(self):
         cell = Cell.objects.create(field=self.field, x=1, y=1)
@@ -341,7 +369,8 @@ class ModerationPanelTests(TestCase):
         self.report2 = FieldReport.objects.create(
             status='approved',
             user=self.regular_user,
-            field=self.field
+            field=self.field,
+            is_resolved=True
         )
 
     def test_staff_access(self):
@@ -599,7 +628,8 @@ class FieldReportAdminTest(TestCase):
             field=self.field,
             user=self.user,
             reason='spam',
-            status='resolved'
+            status='resolved',
+            is_resolved=True
         )
 
     def test_moderate_reports_get(self):
@@ -631,3 +661,1554 @@ class FieldReportAdminTest(TestCase):
         request.user = self.user
         response = self.admin.moderate_reports(request)
         self.assertEqual(response.status_code, 200)
+
+
+@override_settings(LEADERBOARD_SIZE=2)
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner')
+        self.users = [User.objects.create_user(username=f'student{i}') for i in range(3)]
+        self.field = Field.objects.create(user=self.owner, title='Maze', description='Test')
+
+    def submit(self, user, steps, length, solved=True):
+        submission = Submission.objects.create(field=self.field, user=user, program='GO')
+        submission.grade(solved, steps, length)
+        return submission
+
+    def test_keeps_only_best_result_per_user(self):
+        self.submit(self.users[0], 10, 5)
+        self.submit(self.users[0], 12, 3)
+        self.submit(self.users[0], 8, 7)
+        entry = LeaderboardEntry.objects.get(field=self.field, user=self.users[0])
+        self.assertEqual((entry.steps, entry.program_length), (8, 7))
+
+    def test_table_is_bounded(self):
+        self.submit(self.users[0], 10, 5)
+        self.submit(self.users[1], 20, 5)
+        self.submit(self.users[2], 15, 5)
+        ranking = list(LeaderboardEntry.objects.filter(field=self.field).values_list('user__username', flat=True))
+        self.assertEqual(ranking, ['student0', 'student2'])
+
+    def test_unsolved_submission_ignored(self):
+        self.submit(self.users[0], 1, 1, solved=False)
+        self.assertFalse(LeaderboardEntry.objects.exists())
+
+    def test_rebuild_command_matches_incremental(self):
+        self.submit(self.users[0], 10, 5)
+        self.submit(self.users[1], 9, 5)
+        self.submit(self.users[2], 30, 5)
+        expected = list(LeaderboardEntry.objects.values_list('user_id', 'steps'))
+        LeaderboardEntry.objects.all().delete()
+        call_command('rebuild_leaderboards', stdout=MagicMock())
+        self.assertEqual(list(LeaderboardEntry.objects.values_list('user_id', 'steps')), expected)
+
+    def test_leaderboard_api(self):
+        self.submit(self.users[1], 9, 4)
+        response = self.client.get(reverse('field_leaderboard', args=[self.field.id]))
+        data = response.json()['leaderboard']
+        self.assertEqual(data[0]['username'], 'student1')
+        self.assertEqual(data[0]['rank'], 1)
+
+
+class ExecutionReplayTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher')
+        self.student = User.objects.create_user(username='student')
+        self.stranger = User.objects.create_user(username='stranger')
+        self.field = Field.objects.create(user=self.teacher, title='Maze', description='Test')
+        self.submission = Submission.objects.create(field=self.field, user=self.student, program='GO')
+        self.states = []
+        cells = {}
+        for step in range(100):
+            if step % 4 == 0:
+                cells = dict(cells, **{f'{step % 10},0': step % 3 + 1})
+            if step == 50:
+                cells = {}
+            self.states.append({'x': step % 10, 'y': 0, 'pc': step % 5, 'vars': {'i': step}, 'cells': cells})
+
+    def test_seek_restores_every_step(self):
+        data, offsets = encode_trace(self.states, 16)
+        self.assertEqual(len(offsets), 7)
+        for step, state in enumerate(self.states):
+            self.assertEqual(seek(data, offsets, 16, step, len(self.states)), state)
+
+    def test_stored_replay_is_smaller_than_json(self):
+        replay = ExecutionReplay.store(self.submission, self.states, interval=16)
+        self.assertLess(len(replay.data), replay.raw_size)
+        self.assertEqual(replay.states(40, 3), self.states[40:43])
+
+    def test_replay_api(self):
+        ExecutionReplay.store(self.submission, self.states, interval=16)
+        url = reverse('submission_replay', args=[self.submission.id])
+        self.client.force_login(self.teacher)
+        response = self.client.get(url, {'step': 98, 'count': 10})
+        self.assertEqual(response.json()['states'], self.states[98:])
+        self.assertEqual(self.client.get(url, {'step': 100}).status_code, 400)
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class ProgramDiagnosticsTests(TestCase):
+    PROGRAM = (
+        'LET a\n'
+        'a = 3\n'
+        'FOR a REPEAT\n'
+        '    GO RIGHT\n'
+        '    IF a > 2 THEN\n'
+        '        FILL RED\n'
+        '    ENDIF\n'
+        'ENDFOR\n'
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student')
+        self.client.force_login(self.user)
+        self.url = reverse('program_diagnostics')
+
+    def post(self, payload):
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def edit(self, version, line, start, end, text):
+        return self.post({'document': 'main', 'version': version, 'edit': {
+            'start': {'line': line, 'column': start}, 'end': {'line': line, 'column': end}, 'text': text}}).json()
+
+    def test_open_valid_program(self):
+        data = self.post({'document': 'main', 'text': self.PROGRAM}).json()
+        self.assertEqual(data['diagnostics'], [])
+        self.assertEqual(data['version'], 0)
+
+    def test_edit_inside_block_rechecks_only_enclosing_block(self):
+        self.post({'document': 'main', 'text': self.PROGRAM})
+        data = self.edit(0, 5, 13, 16, 'PURPLE')
+        self.assertEqual(data['relexed_lines'], 1)
+        self.assertEqual(data['checked_block'], [4, 6])
+        self.assertEqual(data['diagnostics'], [{'line': 5, 'column': 13, 'message': 'Ожидался цвет'}])
+        data = self.edit(1, 5, 13, 19, 'BLUE')
+        self.assertEqual(data['diagnostics'], [])
+
+    def test_unbalanced_edit_reports_structure_error(self):
+        self.post({'document': 'main', 'text': self.PROGRAM})
+        data = self.edit(0, 6, 4, 9, '')
+        self.assertIsNone(data['checked_block'])
+        self.assertIn('IF без ENDIF', [d['message'] for d in data['diagnostics']])
+
+    def test_stale_version_conflicts(self):
+        self.post({'document': 'main', 'text': self.PROGRAM})
+        self.assertEqual(self.post({'document': 'main', 'version': 5, 'edit': {}}).status_code, 409)
+
+    def test_edit_outside_line_is_rejected(self):
+        self.post({'document': 'main', 'text': self.PROGRAM})
+        for line, start, end in ((-1, 0, 0), (0, -1, 2), (0, 0, 1000), (100, 0, 0)):
+            response = self.post({'document': 'main', 'version': 0, 'edit': {
+                'start': {'line': line, 'column': start}, 'end': {'line': line, 'column': end}, 'text': 'x'}})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.edit(0, 0, 0, 0, '')['version'], 1)
+
+    @override_settings(DIAGNOSTICS_MAX_PROGRAM_SIZE=200)
+    def test_edit_cannot_grow_past_size_limit(self):
+        self.post({'document': 'main', 'text': 'LET x\n'})
+        response = self.post({'document': 'main', 'version': 0, 'edit': {
+            'start': {'line': 1, 'column': 0}, 'end': {'line': 1, 'column': 0}, 'text': 'x = 1\n' * 40}})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.edit(0, 1, 0, 0, 'x = 1')['version'], 1)
+
+
+class ReactionToggleTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.field = Field.objects.create(user=self.other, title='Field', description='Desc')
+        self.comment = Comment.objects.create(field=self.field, author=self.other, text='Text')
+        self.client.login(username='reader', password='testpass123')
+        cache.clear()
+
+    def test_toggle_like_returns_state_and_count(self):
+        self.field.toggle_like(self.other)
+        data = self.client.post(reverse('toggle_like', args=[self.field.pk])).json()
+        self.assertEqual(data, {'is_liked': True, 'likes_count': 2})
+        data = self.client.post(reverse('toggle_like', args=[self.field.pk])).json()
+        self.assertEqual(data, {'is_liked': False, 'likes_count': 1})
+        self.assertFalse(field_reactions(self.field, Reaction.LIKE).filter(user=self.user).exists())
+
+    def test_toggle_favorite(self):
+        data = self.client.post(reverse('toggle_favorite', args=[self.field.pk])).json()
+        self.assertEqual(data, {'is_favorited': True, 'favorites_count': 1})
+        reactions.flush()
+        self.assertEqual(self.field.toggle_favorite(self.user), (False, 0))
+
+    def test_toggle_does_not_load_related_users(self):
+        for index in range(20):
+            self.field.toggle_like(User.objects.create_user(username=f'fan{index}', password='testpass123'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.field.toggle_like(self.user), (True, 21))
+        self.assertFalse([query for query in queries.captured_queries if 'COUNT(' in query['sql'].upper()])
+
+    def test_counter_follows_toggles_and_reconcile(self):
+        fan = User.objects.create_user(username='fan', password='testpass123')
+        self.field.toggle_like(self.user)
+        self.field.toggle_like(fan)
+        self.comment.toggle_like(self.user)
+        self.assertEqual(ReactionCount.get(Reaction.FIELD, self.field.pk, Reaction.LIKE), 2)
+        self.assertEqual(self.field.toggle_like(self.user), (False, 1))
+        self.assertEqual(self.comment.likes_count(), 1)
+        fan.delete()
+        self.assertEqual(ReactionCount.get(Reaction.FIELD, self.field.pk, Reaction.LIKE), 1)
+        call_command('reconcile_reaction_counts', stdout=MagicMock())
+        self.assertEqual(ReactionCount.get(Reaction.FIELD, self.field.pk, Reaction.LIKE), 0)
+        self.assertEqual(ReactionCount.get(Reaction.COMMENT, self.comment.pk, Reaction.LIKE), 1)
+
+    def test_comment_like_and_repeated_report(self):
+        data = self.client.post(reverse('toggle_comment_like', args=[self.comment.pk])).json()
+        self.assertEqual((data['is_liked'], data['likes_count']), (True, 1))
+        self.client.post(reverse('report_comment', args=[self.comment.pk]))
+        data = self.client.post(reverse('report_comment', args=[self.comment.pk])).json()
+        self.assertEqual(data['reports_count'], 1)
+
+
+LOCAL_CACHE_BUFFER = override_settings(REACTION_BUFFER_BACKENDS=[settings.CACHES['default']['BACKEND']])
+
+
+@LOCAL_CACHE_BUFFER
+@override_settings(REACTION_FLUSH_INTERVAL=3600, REACTION_FLUSH_BATCH=1000)
+class ReactionBufferTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='fan', password='testpass123')
+        self.other = User.objects.create_user(username='author', password='testpass123')
+        self.field = Field.objects.create(user=self.other, title='Viral', description='Desc')
+        self.field.toggle_like(self.other)
+        cache.clear()
+
+    def test_toggle_is_visible_before_flush(self):
+        self.assertEqual(reactions.toggle('like', self.field.id, self.user.id), (True, 2))
+        self.assertFalse(field_reactions(self.field, Reaction.LIKE).filter(user=self.user).exists())
+        self.assertTrue(reactions.has_reacted('like', self.field.id, self.user.id))
+        self.client.login(username='fan', password='testpass123')
+        response = self.client.get(reverse('card-detail', args=[self.field.pk]))
+        self.assertTrue(response.context['is_liked'])
+        self.assertEqual(response.context['likes_count'], 2)
+
+    def test_flush_applies_net_state_in_one_batch(self):
+        reactions.toggle('like', self.field.id, self.user.id)
+        reactions.toggle('like', self.field.id, self.other.id)
+        reactions.toggle('favorite', self.field.id, self.user.id)
+        reactions.toggle('favorite', self.field.id, self.user.id)
+        reactions.toggle('favorite', self.field.id, self.user.id)
+        self.assertEqual(reactions.pending_operations(), 5)
+        self.assertEqual(reactions.flush(), 3)
+        self.assertEqual(reactions.pending_operations(), 0)
+        self.assertEqual(list(field_reactions(self.field, Reaction.LIKE).values_list('user', flat=True)), [self.user.id])
+        self.assertEqual(list(field_reactions(self.field, Reaction.FAVORITE).values_list('user', flat=True)), [self.user.id])
+        self.assertEqual(reactions.count('like', self.field.id), 1)
+        self.assertEqual(reactions.count('favorite', self.field.id), 1)
+        self.assertEqual(reactions.flush(), 0)
+
+    @override_settings(REACTION_FLUSH_BATCH=2)
+    def test_full_batch_triggers_flush(self):
+        reactions.toggle('like', self.field.id, self.user.id)
+        self.assertFalse(field_reactions(self.field, Reaction.LIKE).filter(user=self.user).exists())
+        reactions.toggle('favorite', self.field.id, self.user.id)
+        self.assertTrue(field_reactions(self.field, Reaction.LIKE).filter(user=self.user).exists())
+        self.assertTrue(field_reactions(self.field, Reaction.FAVORITE).filter(user=self.user).exists())
+
+    def test_flush_command(self):
+        reactions.toggle('like', self.field.id, self.user.id)
+        call_command('flush_reactions', stdout=MagicMock())
+        self.assertEqual(field_reactions(self.field, Reaction.LIKE).count(), 2)
+
+    def test_transition_comes_from_flip_counter(self):
+        for _ in range(3):
+            reactions.toggle('like', self.field.id, self.user.id)
+        self.assertEqual(reactions.toggle('like', self.field.id, self.other.id), (False, 1))
+        self.assertEqual(reactions.toggle('like', self.field.id, self.user.id), (False, 0))
+        self.assertEqual(reactions.toggle('like', self.field.id, self.user.id), (True, 1))
+        reactions.flush()
+        self.assertEqual(list(field_reactions(self.field, Reaction.LIKE).values_list('user', flat=True)), [self.user.id])
+        self.assertEqual(reactions.count('like', self.field.id), 1)
+
+    def test_toggle_during_flush_is_kept(self):
+        apply = reactions._apply
+
+        def apply_and_toggle(kind, wanted):
+            result = apply(kind, wanted)
+            reactions.toggle(kind, self.field.id, self.user.id)
+            return result
+
+        reactions.toggle('like', self.field.id, self.user.id)
+        with patch('main_app.reactions._apply', side_effect=apply_and_toggle):
+            reactions.flush()
+        self.assertTrue(field_reactions(self.field, Reaction.LIKE).filter(user=self.user).exists())
+        self.assertFalse(reactions.has_reacted('like', self.field.id, self.user.id))
+        self.assertEqual(reactions.count('like', self.field.id), 1)
+        reactions.flush()
+        self.assertFalse(field_reactions(self.field, Reaction.LIKE).filter(user=self.user).exists())
+        self.assertEqual(reactions.count('like', self.field.id), 1)
+
+    def test_flush_waits_for_unwritten_operation(self):
+        set_value = cache.set
+
+        def flush_before_operation(key, *args, **kwargs):
+            if key.startswith('reactions:op:'):
+                self.assertEqual(reactions.flush(), 0)
+            return set_value(key, *args, **kwargs)
+
+        with patch.object(cache, 'set', side_effect=flush_before_operation):
+            reactions.toggle('like', self.field.id, self.user.id)
+        self.assertEqual(reactions.pending_operations(), 1)
+        self.assertEqual(reactions.flush(), 1)
+        self.assertTrue(field_reactions(self.field, Reaction.LIKE).filter(user=self.user).exists())
+        self.assertEqual(reactions.count('like', self.field.id), 2)
+
+    def test_abandoned_operation_is_skipped_after_timeout(self):
+        reactions.toggle('like', self.field.id, self.user.id)
+        cache.incr(reactions.SEQUENCE_KEY)
+        reactions.toggle('favorite', self.field.id, self.user.id)
+        self.assertEqual(reactions.flush(), 1)
+        self.assertEqual(reactions.pending_operations(), 2)
+        self.assertFalse(field_reactions(self.field, Reaction.FAVORITE).exists())
+        later = time.time() + reactions.LOCK_TIMEOUT
+        with patch('main_app.reactions.time.time', return_value=later):
+            self.assertEqual(reactions.flush(), 1)
+        self.assertEqual(reactions.pending_operations(), 0)
+        self.assertTrue(field_reactions(self.field, Reaction.FAVORITE).filter(user=self.user).exists())
+
+    @override_settings(REACTION_BUFFER_BACKENDS=[])
+    def test_process_local_cache_writes_through(self):
+        self.assertFalse(reactions.buffered())
+        self.assertEqual(reactions.toggle('like', self.field.id, self.user.id), (True, 2))
+        self.assertTrue(field_reactions(self.field, Reaction.LIKE).filter(user=self.user).exists())
+        self.assertEqual(reactions.pending_operations(), 0)
+
+
+class ReactionModelTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='collector', password='testpass123')
+        self.fields = [Field.objects.create(user=self.user, title=f'Field {index}', description='Desc')
+                       for index in range(3)]
+        cache.clear()
+
+    def test_liked_since_uses_reaction_time(self):
+        other = User.objects.create_user(username='late', password='testpass123')
+        Reaction.objects.create(target_type=Reaction.FIELD, target_id=self.fields[0].id, user=self.user,
+                                kind=Reaction.LIKE, created_at=timezone.now() - timedelta(days=2))
+        self.fields[0].toggle_like(other)
+        since = Reaction.since(Reaction.FIELD, self.fields[0].id, Reaction.LIKE, timezone.now() - timedelta(days=1))
+        self.assertEqual(list(since.values_list('user', flat=True)), [other.id])
+
+    def test_profile_lists_follow_reaction_order(self):
+        self.fields[2].toggle_like(self.user)
+        self.fields[0].toggle_like(self.user)
+        self.fields[1].toggle_favorite(self.user)
+        self.client.login(username='collector', password='testpass123')
+        liked = self.client.get(reverse('profile_fields_api'), {'type': 'liked'}).json()['fields']
+        self.assertEqual([field['id'] for field in liked], [self.fields[0].id, self.fields[2].id])
+        favorites = self.client.get(reverse('profile_fields_api'), {'type': 'favorites'}).json()['fields']
+        self.assertEqual([field['id'] for field in favorites], [self.fields[1].id])
+
+
+class ReactionStateApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='viewer', password='testpass123')
+        self.author = User.objects.create_user(username='maker', password='testpass123')
+        self.fields = [Field.objects.create(user=self.author, title=f'Field {index}', description='Desc')
+                       for index in range(3)]
+        self.fields[0].toggle_like(self.user)
+        self.fields[0].toggle_like(self.author)
+        self.fields[1].toggle_favorite(self.author)
+        cache.clear()
+
+    def get(self, ids):
+        return self.client.get(reverse('reaction_states'), {'ids': ','.join(str(pk) for pk in ids)})
+
+    def test_states_for_viewer_in_one_query(self):
+        self.client.login(username='viewer', password='testpass123')
+        ids = [field.id for field in self.fields]
+        with self.assertNumQueries(3):
+            data = self.get(ids).json()['fields']
+        self.assertEqual(data[str(ids[0])], {'is_liked': True, 'likes_count': 2,
+                                             'is_favorited': False, 'favorites_count': 0})
+        self.assertEqual(data[str(ids[1])], {'is_liked': False, 'likes_count': 0,
+                                             'is_favorited': False, 'favorites_count': 1})
+        self.assertEqual(data[str(ids[2])]['likes_count'], 0)
+
+    def test_anonymous_gets_counts_only(self):
+        data = self.get([self.fields[0].id]).json()['fields']
+        self.assertEqual(data[str(self.fields[0].id)]['likes_count'], 2)
+        self.assertFalse(data[str(self.fields[0].id)]['is_liked'])
+
+    @LOCAL_CACHE_BUFFER
+    def test_buffered_toggle_is_merged(self):
+        reactions.toggle(Reaction.FAVORITE, self.fields[2].id, self.user.id)
+        self.client.login(username='viewer', password='testpass123')
+        state = self.get([self.fields[2].id]).json()['fields'][str(self.fields[2].id)]
+        self.assertTrue(state['is_favorited'])
+        self.assertEqual(state['favorites_count'], 1)
+
+    @override_settings(REACTION_STATE_MAX_IDS=2)
+    def test_limits_and_validation(self):
+        self.assertEqual(self.get([field.id for field in self.fields]).status_code, 400)
+        self.assertEqual(self.client.get(reverse('reaction_states'), {'ids': '1,x'}).status_code, 400)
+
+
+@override_settings(COMMENT_MAX_DEPTH=2, COMMENT_THREADS_PER_PAGE=2)
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='talker', password='testpass123')
+        self.field = Field.objects.create(user=self.user, title='Field', description='Desc')
+        self.client.login(username='talker', password='testpass123')
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(field=self.field, author=self.user, text=text, parent=parent)
+
+    def test_paths_follow_tree_order(self):
+        root = self.comment('root')
+        first = self.comment('first', root)
+        nested = self.comment('nested', first)
+        second = self.comment('second', root)
+        self.assertEqual(root.path, Comment.path_segment(root.id))
+        self.assertEqual(nested.path, f'{root.path}/{first.path.split("/")[1]}/{nested.path.split("/")[2]}')
+        self.assertEqual(nested.depth, 2)
+        with self.assertNumQueries(1):
+            self.assertEqual([c.text for c in root.subtree()], ['root', 'first', 'nested', 'second'])
+        self.assertEqual(list(first.subtree()), [first, nested])
+        self.assertEqual(second.depth, 1)
+
+    def test_depth_limit(self):
+        root = self.comment('root')
+        nested = self.comment('nested', self.comment('reply', root))
+        response = self.client.post(reverse('add_comment', args=[self.field.pk]),
+                                    json.dumps({'text': 'too deep', 'parent_id': nested.id}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('add_comment', args=[self.field.pk]),
+                                    json.dumps({'text': 'ok', 'parent_id': root.id}),
+                                    content_type='application/json')
+        self.assertEqual((response.json()['parent_id'], response.json()['depth']), (root.id, 1))
+
+    def test_threads_are_paginated_and_loaded_in_one_range_query(self):
+        old = self.comment('old')
+        self.comment('old reply', old)
+        middle = self.comment('middle')
+        hidden = self.comment('hidden', middle)
+        self.comment('under hidden', hidden)
+        hidden.safe_block()
+        self.comment('middle reply', middle)
+        self.comment('new')
+        with self.assertNumQueries(3):
+            page, comments = Comment.threads(self.field, 1)
+            self.assertEqual([c.text for c in comments], ['new', 'middle', 'middle reply'])
+        data = self.client.get(reverse('field_comments', args=[self.field.pk]), {'page': 2}).json()
+        self.assertEqual([c['text'] for c in data['comments']], ['old', 'old reply'])
+        self.assertEqual((data['page'], data['num_pages'], data['has_next']), (2, 2, False))
+
+
+class FieldEventsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='watcher', password='testpass123')
+        self.field = Field.objects.create(user=self.user, title='Live', description='Desc')
+
+    async def test_stream_delivers_published_events(self):
+        response = await self.async_client.get(reverse('field_events', args=[self.field.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        self.assertEqual(notifier.subscriber_count(self.field.pk), 1)
+        notifier.publish(self.field.pk, 'reactions', {'likes_count': 3})
+        self.assertEqual(await anext(stream), b'event: reactions\ndata: {"likes_count": 3}\n\n')
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(notifier.subscriber_count(self.field.pk), 0)
+
+    async def test_unknown_field(self):
+        response = await self.async_client.get(reverse('field_events', args=[self.field.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_add_comment_publishes_after_commit(self):
+        self.client.login(username='watcher', password='testpass123')
+        with patch('main_app.views.notifier') as mocked:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('add_comment', args=[self.field.pk]), json.dumps({'text': 'Hi'}),
+                                 content_type='application/json')
+        field_id, event, data = mocked.publish.call_args.args
+        self.assertEqual((field_id, event, data['text'], data['author']), (self.field.pk, 'comment', 'Hi', 'watcher'))
+
+    def test_full_queue_drops_oldest_event(self):
+        async def scenario():
+            subscription = notifier.subscribe(self.field.pk, max_size=2)
+            for count in range(3):
+                notifier.publish(self.field.pk, 'reactions', {'likes_count': count})
+            await asyncio.sleep(0)
+            notifier.unsubscribe(subscription)
+            return [subscription.queue.get_nowait()[1]['likes_count'] for _ in range(2)]
+        self.assertEqual(asyncio.run(scenario()), [1, 2])
+
+
+@override_settings(AUTO_MODERATION_RULES={'comment': {'reporters': 3, 'window': 3600},
+                                          'field': {'reporters': 2, 'window': 3600}})
+class AutoModerationTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.field = Field.objects.create(user=self.author, title='Spam', description='Desc')
+        self.comment = Comment.objects.create(field=self.field, author=self.author, text='Buy now')
+        self.reporters = [User.objects.create_user(username=f'reporter{i}', password='testpass123')
+                          for i in range(3)]
+        self.staff = User.objects.create_user(username='moderator', password='testpass123', is_staff=True)
+
+    def test_comment_hidden_at_threshold(self):
+        for reporter in self.reporters[:2]:
+            self.comment.add_report(reporter)
+        self.comment.refresh_from_db()
+        self.assertFalse(self.comment.is_blocked)
+        self.assertEqual(self.comment.add_report(self.reporters[2]), 3)
+        self.comment.refresh_from_db()
+        self.assertTrue(self.comment.is_blocked)
+        action = ModerationAction.pending().get()
+        self.assertEqual((action.target_type, action.target_id, action.reporters),
+                         (Reaction.COMMENT, self.comment.id, 3))
+
+    def test_repeated_reports_count_once(self):
+        for _ in range(3):
+            self.comment.add_report(self.reporters[0])
+        counter = ReportCounter.objects.get(target_type=Reaction.COMMENT, target_id=self.comment.id)
+        self.assertEqual(counter.reporters, 1)
+        self.assertFalse(ModerationAction.objects.exists())
+
+    def test_expired_window_starts_over(self):
+        self.comment.add_report(self.reporters[0])
+        self.comment.add_report(self.reporters[1])
+        ReportCounter.objects.update(window_start=timezone.now() - timedelta(hours=2))
+        self.comment.add_report(self.reporters[2])
+        counter = ReportCounter.objects.get(target_type=Reaction.COMMENT, target_id=self.comment.id)
+        self.assertEqual(counter.reporters, 1)
+        self.comment.refresh_from_db()
+        self.assertFalse(self.comment.is_blocked)
+
+    def test_previous_window_is_weighted(self):
+        self.comment.add_report(self.reporters[0])
+        self.comment.add_report(self.reporters[1])
+        ReportCounter.objects.update(window_start=timezone.now() - timedelta(minutes=65))
+        self.comment.add_report(self.reporters[2])
+        counter = ReportCounter.objects.get(target_type=Reaction.COMMENT, target_id=self.comment.id)
+        self.assertEqual((counter.previous_reporters, counter.reporters), (2, 1))
+        self.assertFalse(ModerationAction.objects.exists())
+        self.comment.add_report(User.objects.create_user(username='reporter3', password='testpass123'))
+        self.comment.refresh_from_db()
+        self.assertTrue(self.comment.is_blocked)
+        self.assertEqual(ModerationAction.pending().get().reporters, 3)
+
+    def test_report_does_not_recount(self):
+        self.comment.add_report(self.reporters[0])
+        with self.assertNumQueries(7):
+            self.comment.add_report(self.reporters[1])
+
+    def test_field_report_view_hides_field(self):
+        for reporter in self.reporters[:2]:
+            self.client.force_login(reporter)
+            self.client.post(reverse('report_field', args=[self.field.id]), {'reason': 'spam'})
+        self.field.refresh_from_db()
+        self.assertTrue(self.field.is_blocked)
+        self.assertEqual(ModerationAction.pending().get().target_type, Reaction.FIELD)
+
+    def test_already_blocked_target_is_not_logged(self):
+        self.comment.safe_block()
+        for reporter in self.reporters:
+            self.comment.add_report(reporter)
+        self.assertFalse(ModerationAction.objects.exists())
+
+    def test_revert_restores_and_resets_counter(self):
+        for reporter in self.reporters:
+            self.comment.add_report(reporter)
+        action = ModerationAction.pending().get()
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('moderation_panel'))
+        self.assertContains(response, reverse('review_moderation_action', args=[action.id]))
+        self.client.post(reverse('review_moderation_action', args=[action.id]), {'decision': 'revert'})
+        self.comment.refresh_from_db()
+        self.assertFalse(self.comment.is_blocked)
+        action.refresh_from_db()
+        self.assertEqual((action.decision, action.reviewed_by), (ModerationAction.REVERTED, self.staff))
+        counter = ReportCounter.objects.get(target_type=Reaction.COMMENT, target_id=self.comment.id)
+        self.assertEqual((counter.reporters, counter.auto_hidden), (0, False))
+
+    def test_confirm_keeps_hidden(self):
+        for reporter in self.reporters:
+            self.comment.add_report(reporter)
+        action = ModerationAction.pending().get()
+        self.client.force_login(self.staff)
+        self.client.post(reverse('review_moderation_action', args=[action.id]), {'decision': 'confirm'})
+        self.comment.refresh_from_db()
+        self.assertTrue(self.comment.is_blocked)
+        self.assertFalse(ModerationAction.pending().exists())
+
+    def test_review_requires_staff(self):
+        for reporter in self.reporters:
+            self.comment.add_report(reporter)
+        action = ModerationAction.pending().get()
+        self.client.force_login(self.reporters[0])
+        response = self.client.post(reverse('review_moderation_action', args=[action.id]), {'decision': 'revert'})
+        self.assertEqual(response.status_code, 403)
+
+
+class SimHashTests(TestCase):
+    def test_near_duplicates_are_close(self):
+        spam = 'Cheap robot solutions for every field, visit our site today and get a discount'
+        variant = 'Cheap robot solutions for every field, visit our site today and get a big discount!'
+        other = 'The wall in the corner blocks the shortest path, try going around the left side'
+        self.assertLessEqual(simhash.distance(simhash.fingerprint(spam), simhash.fingerprint(variant)),
+                             simhash.MAX_DISTANCE)
+        self.assertGreater(simhash.distance(simhash.fingerprint(spam), simhash.fingerprint(other)), 10)
+
+    def test_short_text_has_no_fingerprint(self):
+        self.assertIsNone(simhash.fingerprint('Nice map', min_tokens=5))
+
+    def test_bands_cover_fingerprint(self):
+        value = simhash.fingerprint('one two three four five')
+        restored = 0
+        for band in simhash.bands(value):
+            restored = (restored << simhash.BAND_BITS) | band
+        self.assertEqual(restored, value)
+        self.assertEqual(simhash.to_unsigned(simhash.to_signed(value)), value)
+
+
+@override_settings(SPAM_MIN_TOKENS=5, SPAM_SIMHASH_MAX_DISTANCE=3, SPAM_DUPLICATE_WINDOW=3600)
+class NearDuplicateTests(TestCase):
+    spam = 'Cheap robot solutions for every field, visit our site today and get a discount'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='spammer', password='testpass123')
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.fields = [Field.objects.create(user=self.owner, title=f'Field {i}', description='Desc')
+                       for i in range(2)]
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def post_comment(self, field, text):
+        return self.client.post(reverse('add_comment', args=[field.id]), json.dumps({'text': text}),
+                                content_type='application/json').json()
+
+    def test_comment_flagged_across_fields(self):
+        first = self.post_comment(self.fields[0], self.spam)
+        second = self.post_comment(self.fields[1], self.spam + ' now')
+        record = TextFingerprint.objects.get(source_type=TextFingerprint.COMMENT, source_id=second['comment_id'])
+        self.assertEqual(record.duplicate_of.source_id, first['comment_id'])
+        self.assertIsNone(TextFingerprint.objects.get(source_id=first['comment_id']).duplicate_of)
+
+    def test_profile_comment_matches_field_comment(self):
+        comment = self.post_comment(self.fields[0], self.spam)
+        self.client.post(reverse('add_profile_comment', args=[self.owner.username]), {'comment_text': self.spam})
+        record = TextFingerprint.objects.get(source_type=TextFingerprint.PROFILE_COMMENT)
+        self.assertEqual((record.duplicate_of.source_type, record.duplicate_of.source_id),
+                         (TextFingerprint.COMMENT, comment['comment_id']))
+
+    def test_distinct_and_old_texts_are_not_flagged(self):
+        self.post_comment(self.fields[0], self.spam)
+        TextFingerprint.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        self.post_comment(self.fields[1], self.spam)
+        self.post_comment(self.fields[1], 'The wall in the corner blocks the shortest path, try the left side')
+        self.assertFalse(TextFingerprint.objects.filter(duplicate_of__isnull=False).exists())
+
+    def test_lookup_uses_band_indexes(self):
+        self.post_comment(self.fields[0], self.spam)
+        record = TextFingerprint.build(TextFingerprint.COMMENT, 999, self.spam)
+        with self.assertNumQueries(1):
+            match = record.find_similar()
+        self.assertEqual(match[1], 0)
+
+    def test_exact_duplicate_found_behind_band_collisions(self):
+        original = self.post_comment(self.fields[0], self.spam)
+        record = TextFingerprint.build(TextFingerprint.COMMENT, 999, self.spam)
+        value = simhash.to_unsigned(record.fingerprint)
+        decoys = []
+        for index in range(5):
+            noisy = value ^ (0xFFFF << 16) ^ index
+            decoys.append(TextFingerprint(
+                source_type=TextFingerprint.COMMENT, source_id=1000 + index, fingerprint=simhash.to_signed(noisy),
+                created_at=timezone.now(), **{f'band{i}': band for i, band in enumerate(simhash.bands(noisy))}))
+        TextFingerprint.objects.bulk_create(decoys)
+        with self.assertNumQueries(1):
+            match = record.find_similar()
+        self.assertEqual((match[0].source_id, match[1]), (original['comment_id'], 0))
+
+    def test_backfill_indexes_existing_comments(self):
+        for index in range(5):
+            Comment.objects.create(field=self.fields[0], author=self.user, text=f'{self.spam} {index}')
+        Comment.objects.create(field=self.fields[0], author=self.user, text='Too short')
+        ProfileComment.objects.create(profile=self.owner, author=self.user, text=self.spam)
+        call_command('index_fingerprints', batch_size=2, stdout=MagicMock())
+        self.assertEqual(TextFingerprint.objects.count(), 6)
+        call_command('index_fingerprints', stdout=MagicMock())
+        self.assertEqual(TextFingerprint.objects.count(), 6)
+
+    def test_panel_lists_suspects(self):
+        self.post_comment(self.fields[0], self.spam)
+        self.post_comment(self.fields[1], self.spam)
+        staff = User.objects.create_user(username='moderator', password='testpass123', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('moderation_panel'))
+        self.assertEqual(len(response.context['spam_suspects']), 1)
+        self.assertContains(response, 'Похоже на спам (1)')
+
+
+@override_settings(RATE_LIMITS={'main_app.views.add_comment': {'limit': 3, 'window': 60},
+                                'main_app.views.search_fields': {'limit': 2, 'window': 60}})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', password='testpass123')
+        self.other = User.objects.create_user(username='reader', password='testpass123')
+        self.field = Field.objects.create(user=self.user, title='Field', description='Desc')
+        cache.clear()
+
+    def post_comment(self, index):
+        return self.client.post(reverse('add_comment', args=[self.field.id]),
+                                json.dumps({'text': f'Comment {index}'}), content_type='application/json')
+
+    def test_writes_limited_per_user(self):
+        self.client.force_login(self.user)
+        statuses = [self.post_comment(index).status_code for index in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(Comment.objects.count(), 3)
+        self.client.force_login(self.other)
+        self.assertEqual(self.post_comment(4).status_code, 200)
+
+    def test_rejection_has_retry_after(self):
+        self.client.force_login(self.user)
+        for index in range(3):
+            self.post_comment(index)
+        response = self.post_comment(3)
+        self.assertEqual(response.json(), {'error': 'Too many requests'})
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+
+    def test_anonymous_search_limited_per_ip(self):
+        url = reverse('search_api')
+        statuses = [self.client.get(url, {'q': 'x'}, REMOTE_ADDR='10.0.0.1').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(self.client.get(url, {'q': 'x'}, REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_routes_to_one_view_share_a_bucket(self):
+        self.client.force_login(self.user)
+        paths = [f'/cards/{self.field.id}/add-comment/', f'/api/field/{self.field.id}/add-comment/'] * 2
+        statuses = [self.client.post(path, json.dumps({'text': 'Comment'}), content_type='application/json').status_code
+                    for path in paths]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(ratelimit.view_scope(FieldDetailView.as_view()), 'main_app.views.FieldDetailView')
+
+    def test_unlisted_routes_are_not_counted(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse('index')).status_code, 200)
+
+    def test_previous_window_is_weighted(self):
+        self.assertEqual([ratelimit.hit('k', 4, 60, now=60.0)[0] for _ in range(4)], [True] * 4)
+        self.assertFalse(ratelimit.hit('k', 4, 60, now=125.0)[0])
+        self.assertTrue(ratelimit.hit('k', 4, 60, now=175.0)[0])
+
+    def test_benchmark_command(self):
+        output = MagicMock()
+        call_command('benchmark_ratelimit', requests=50, stdout=output)
+        self.assertIn('с лимитом', output.write.call_args_list[0][0][0])
+
+
+@override_settings(PROFILE_FIELDS_PAGE_SIZE=2, PROFILE_FIELDS_DESCRIPTION_LENGTH=5,
+                   REACTION_FLUSH_INTERVAL=3600, REACTION_FLUSH_BATCH=1000)
+class ProfileFieldsPageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='maker', password='testpass123')
+        self.fields = [Field.objects.create(user=self.user, title=f'Field {index}', description='Long description')
+                       for index in range(5)]
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def get(self, field_type, cursor=None):
+        params = {'type': field_type}
+        if cursor:
+            params['cursor'] = cursor
+        return self.client.get(reverse('profile_fields_api'), params).json()
+
+    def test_profile_page_loads_field_lists_with_reaction_badges(self):
+        response = self.client.get(reverse('profile_view', args=[self.user.username]))
+        self.assertContains(response, 'js/profile_fields.js')
+        self.assertContains(response, 'js/reaction_badges.js')
+        for field_type, container in (('my', 'fields-container'), ('liked', 'liked-fields-container'),
+                                      ('favorites', 'favorites-fields-container')):
+            self.assertContains(response, f'data-type="{field_type}"')
+            self.assertContains(response, f'id="{container}"')
+
+    def test_cursor_walks_all_pages(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            data = self.get('my', cursor)
+            seen += [field['id'] for field in data['fields']]
+            pages += 1
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [field.id for field in reversed(self.fields)])
+        self.assertEqual(pages, 3)
+
+    def test_projection_and_url_template(self):
+        field = self.get('my')['fields'][0]
+        self.assertEqual(field['description'], 'Long ')
+        self.assertEqual(field['url'], reverse('card-detail', kwargs={'pk': field['id']}))
+
+    def test_page_is_cached_until_create(self):
+        self.get('my')
+        with self.assertNumQueries(2):
+            self.get('my')
+        self.client.post(reverse('create_field'), {'title': 'Fresh', 'description': 'New', 'cols': 5, 'rows': 5})
+        self.assertEqual(self.get('my')['fields'][0]['title'], 'Fresh')
+
+    @LOCAL_CACHE_BUFFER
+    def test_reaction_lists_refresh_after_toggle_and_flush(self):
+        self.assertEqual(self.get('liked')['fields'], [])
+        self.client.post(reverse('toggle_like', args=[self.fields[1].id]))
+        self.client.post(reverse('toggle_favorite', args=[self.fields[2].id]))
+        self.get('liked')
+        reactions.flush()
+        self.assertEqual([field['id'] for field in self.get('liked')['fields']], [self.fields[1].id])
+        self.assertEqual([field['id'] for field in self.get('favorites')['fields']], [self.fields[2].id])
+
+    def test_cursor_round_trip(self):
+        moment = timezone.now()
+        self.assertEqual(profile_fields.decode_cursor(profile_fields.encode_cursor(moment, 7)), (moment, 7))
+
+    def test_invalid_cursor(self):
+        for cursor in ('oops', '99999999999999999999.1', '-99999999999999999999.1', '1.99999999999999999999'):
+            with self.assertRaises(ValueError):
+                profile_fields.decode_cursor(cursor)
+            response = self.client.get(reverse('profile_fields_api'), {'type': 'my', 'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+    def test_anonymous_and_unknown_type_are_empty(self):
+        self.assertEqual(self.get('unknown'), {'fields': [], 'next_cursor': None})
+        self.client.logout()
+        self.assertEqual(self.get('my'), {'fields': [], 'next_cursor': None})
+
+
+@override_settings(REACTION_FLUSH_INTERVAL=3600, REACTION_FLUSH_BATCH=1000)
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.fan = User.objects.create_user(username='fan', password='testpass123')
+        self.field = Field.objects.create(user=self.author, title='Field', description='Desc')
+        self.comment = Comment.objects.create(field=self.field, author=self.fan, text='Nice')
+        cache.clear()
+
+    def counters(self, user):
+        stats = UserStats.objects.get(pk=user.pk)
+        return tuple(getattr(stats, name) for name in UserStats.COUNTERS)
+
+    def test_first_read_computes_row(self):
+        self.field.toggle_like(self.fan)
+        self.assertEqual(UserStats.for_user(self.author).likes_received, 1)
+        self.assertFalse(UserStats.objects.filter(pk=self.fan.pk).exists())
+        UserStats.for_user(self.fan)
+        self.assertEqual(self.counters(self.fan), (0, 0, 1, 0))
+
+    def test_write_paths_update_counters(self):
+        UserStats.reconcile()
+        Field.objects.create(user=self.author, title='Second', description='Desc')
+        Comment.objects.create(field=self.field, author=self.author, text='Thanks')
+        self.comment.toggle_like(self.author)
+        self.field.toggle_favorite(self.fan)
+        self.assertEqual(self.counters(self.author), (2, 0, 1, 0))
+        self.assertEqual(self.counters(self.fan), (0, 1, 1, 1))
+        self.field.toggle_favorite(self.fan)
+        self.assertEqual(self.counters(self.fan), (0, 1, 1, 0))
+
+    @LOCAL_CACHE_BUFFER
+    def test_buffered_reactions_update_on_flush(self):
+        UserStats.reconcile()
+        self.client.force_login(self.fan)
+        self.client.post(reverse('toggle_like', args=[self.field.id]))
+        self.client.post(reverse('toggle_favorite', args=[self.field.id]))
+        self.assertEqual(self.counters(self.author)[1], 0)
+        reactions.flush()
+        self.assertEqual(self.counters(self.author)[1], 1)
+        self.assertEqual(self.counters(self.fan)[3], 1)
+
+    def test_profile_reads_single_row(self):
+        UserStats.reconcile()
+        self.client.force_login(self.fan)
+        response = self.client.get(reverse('profile_view', args=[self.author.username]))
+        self.assertEqual(response.context['stats'].fields_created, 1)
+        self.assertContains(response, 'Создано карт')
+
+    def test_reconcile_fixes_drift(self):
+        UserStats.reconcile()
+        Comment.objects.filter(pk=self.comment.pk).delete()
+        UserStats.objects.filter(pk=self.author.pk).update(likes_received=7)
+        output = MagicMock()
+        call_command('reconcile_user_stats', batch_size=1, stdout=output)
+        self.assertIn('2', output.write.call_args[0][0])
+        self.assertEqual(self.counters(self.author), (1, 0, 0, 0))
+        self.assertEqual(self.counters(self.fan), (0, 0, 0, 0))
+        self.assertEqual(UserStats.reconcile(), 0)
+
+    def test_reconcile_counts_inside_write_transaction(self):
+        depth = len(connection.atomic_blocks)
+        compute = UserStats.compute
+        depths = []
+
+        def compute_in_transaction(user_ids):
+            depths.append(len(connection.atomic_blocks))
+            return compute(user_ids)
+
+        with patch.object(UserStats, 'compute', side_effect=compute_in_transaction):
+            UserStats.reconcile(batch_size=1)
+        self.assertEqual(depths, [depth + 1] * User.objects.count())
+        self.assertEqual(self.counters(self.author), (1, 0, 0, 0))
+
+
+@override_settings(PROFILE_COMMENTS_PER_PAGE=3)
+class ProfileWallTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.guest = User.objects.create_user(username='guest', password='testpass123')
+        self.comments = [ProfileComment.objects.create(profile=self.owner, author=self.guest, text=f'Hello {index}')
+                         for index in range(7)]
+
+    def test_profile_renders_first_page_once(self):
+        self.client.force_login(self.guest)
+        response = self.client.get(reverse('profile_view', args=[self.owner.username]))
+        self.assertEqual([c.id for c in response.context['profile_comments']],
+                         [c.id for c in reversed(self.comments[-3:])])
+        self.assertEqual(response.content.decode().count('data-profile-comment="'), 3)
+        self.assertContains(response, 'data-profile-comments-more="')
+
+    def test_endpoint_walks_pages(self):
+        self.client.force_login(self.guest)
+        _, cursor = ProfileComment.wall(self.owner.id)
+        seen = []
+        while cursor:
+            data = self.client.get(reverse('profile_comments', args=[self.owner.username]),
+                                   {'cursor': cursor}).json()
+            seen += [comment['id'] for comment in data['comments']]
+            cursor = data['next_cursor']
+        self.assertEqual(seen, [c.id for c in reversed(self.comments[:4])])
+
+    def test_endpoint_html_respects_delete_rights(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        url = reverse('profile_comments', args=[self.owner.username])
+        self.client.force_login(other)
+        comment = self.client.get(url).json()['comments'][0]
+        self.assertNotIn('delete', comment['html'])
+        self.client.force_login(self.owner)
+        comment = self.client.get(url).json()['comments'][0]
+        self.assertIn(reverse('delete_profile_comment', args=[comment['id']]), comment['html'])
+
+    def test_wall_page_is_one_query(self):
+        with self.assertNumQueries(1):
+            comments, _ = ProfileComment.wall(self.owner.id)
+            [comment.author.username for comment in comments]
+
+    def test_invalid_cursor(self):
+        self.client.force_login(self.guest)
+        for cursor in ('x', '99999999999999999999.1'):
+            response = self.client.get(reverse('profile_comments', args=[self.owner.username]), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+
+class AvatarThumbnailTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='avatar', password='testpass123')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self, color='red', size=(800, 600)):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'PNG')
+        return SimpleUploadedFile('avatar.png', buffer.getvalue(), content_type='image/png')
+
+    def test_upload_builds_hashed_variants(self):
+        self.user.avatar = self.upload()
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(len(self.user.avatar_hash), avatars.HASH_LENGTH)
+        for size in avatars.SIZES:
+            for extension in avatars.FORMATS:
+                name = avatars.variant_name(self.user.avatar_hash, size, extension)
+                with default_storage.open(name) as file, Image.open(file) as image:
+                    self.assertEqual(image.size, (size, size))
+        self.assertTrue(self.user.avatar_thumbnails['32']['webp'].endswith(f'{self.user.avatar_hash}-32.webp'))
+
+    def test_new_avatar_gets_new_names(self):
+        self.user.avatar = self.upload('red')
+        self.user.save()
+        first = self.user.avatar_hash
+        self.user.avatar = self.upload('blue')
+        self.user.save()
+        self.assertNotEqual(self.user.avatar_hash, first)
+        self.user.avatar = None
+        self.user.save()
+        self.assertEqual(self.user.avatar_thumbnails, {})
+        self.assertEqual(User.objects.get(pk=self.user.pk).avatar_hash, '')
+
+    def test_lazy_build_for_existing_avatar(self):
+        self.user.avatar = self.upload()
+        self.user.save()
+        User.objects.filter(pk=self.user.pk).update(avatar_hash='')
+        user = User.objects.get(pk=self.user.pk)
+        self.assertIn('128', user.avatar_thumbnails)
+        self.assertEqual(User.objects.get(pk=self.user.pk).avatar_hash, self.user.avatar_hash)
+
+    def test_command_backfills(self):
+        self.user.avatar = self.upload()
+        self.user.save()
+        User.objects.filter(pk=self.user.pk).update(avatar_hash='')
+        call_command('build_avatar_thumbnails', stdout=MagicMock())
+        self.assertEqual(User.objects.get(pk=self.user.pk).avatar_hash, self.user.avatar_hash)
+
+    def test_thumbnail_served_immutable(self):
+        self.user.avatar = self.upload()
+        self.user.save()
+        self.client.force_login(self.user)
+        page = self.client.get(reverse('profile_view', args=[self.user.username]))
+        url = self.user.avatar_thumbnails['128']['webp']
+        self.assertContains(page, url)
+        self.assertNotContains(page, self.user.avatar.url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        response.close()
+        missing = self.client.get(url.replace('-128.', '-999.'))
+        self.assertNotIn('immutable', missing.get('Cache-Control', ''))
+
+    def test_broken_avatar_falls_back_to_original(self):
+        self.user.avatar = SimpleUploadedFile('avatar.png', b'not an image', content_type='image/png')
+        with self.assertLogs('main_app.models', level='ERROR'):
+            self.user.save()
+        self.assertEqual(self.user.avatar_hash, '')
+
+
+@override_settings(TIMELINE_PAGE_SIZE=3)
+class ActivityTimelineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='active', password='testpass123')
+        other = User.objects.create_user(username='other', password='testpass123')
+        base = timezone.now() - timedelta(days=1)
+        self.field = Field.objects.create(user=self.user, title='Mine', description='d')
+        foreign = Field.objects.create(user=other, title='Theirs', description='d')
+        Field.objects.filter(pk=self.field.pk).update(created_at=base)
+        comments = [Comment.objects.create(field=foreign, author=self.user, text=f'Comment {index}')
+                    for index in range(3)]
+        foreign_comment = Comment.objects.create(field=foreign, author=other, text='Their comment')
+        for index, comment in enumerate(comments):
+            Comment.objects.filter(pk=comment.pk).update(created_at=base + timedelta(minutes=index))
+        liked_field = Reaction.objects.create(target_type=Reaction.FIELD, target_id=foreign.id, user=self.user,
+                                              kind=Reaction.LIKE, created_at=base + timedelta(minutes=1))
+        liked_comment = Reaction.objects.create(target_type=Reaction.COMMENT, target_id=foreign_comment.id,
+                                                user=self.user, kind=Reaction.LIKE, created_at=base)
+        Reaction.objects.create(target_type=Reaction.FIELD, target_id=foreign.id, user=self.user,
+                                kind=Reaction.FAVORITE, created_at=base + timedelta(minutes=5))
+        Reaction.objects.create(target_type=Reaction.FIELD, target_id=10 ** 6, user=self.user,
+                                kind=Reaction.LIKE, created_at=base + timedelta(minutes=6))
+        self.expected = [
+            (timeline.COMMENT_POSTED, comments[2].id),
+            (timeline.FIELD_LIKED, liked_field.id),
+            (timeline.COMMENT_POSTED, comments[1].id),
+            (timeline.COMMENT_LIKED, liked_comment.id),
+            (timeline.COMMENT_POSTED, comments[0].id),
+            (timeline.FIELD_CREATED, self.field.id),
+        ]
+        self.client.force_login(self.user)
+
+    def test_pages_follow_merged_order(self):
+        seen, cursor, pages = [], '', 0
+        while cursor is not None:
+            data = self.client.get(reverse('activity_timeline'), {'cursor': cursor} if cursor else {}).json()
+            seen += [(item['type'], item['id']) for item in data['items']]
+            cursor = data['next_cursor']
+            pages += 1
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages, 2)
+
+    def test_items_link_to_fields(self):
+        items = {(item['type'], item['id']): item for item in timeline.page(self.user.id)['items']}
+        self.assertEqual(items[self.expected[0]]['title'], 'Comment 2')
+        self.assertEqual(items[self.expected[1]]['title'], 'Theirs')
+        self.assertTrue(items[self.expected[1]]['url'].startswith('/cards/'))
+
+    def test_one_query_per_source(self):
+        with self.assertNumQueries(len(timeline.SOURCES)):
+            timeline.page(self.user.id)
+
+    def test_invalid_cursor(self):
+        for cursor in ('x', '1.2.9', '99999999999999999999.1.0', '1.99999999999999999999.0'):
+            response = self.client.get(reverse('activity_timeline'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+
+@override_settings(MODERATION_QUEUE_PAGE_SIZE=2, AUTO_MODERATION_RULES={})
+class ReportQueueTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='moderator', password='testpass123', is_staff=True)
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reporters = [User.objects.create_user(username=f'reporter{index}', password='testpass123')
+                          for index in range(3)]
+        self.field = Field.objects.create(user=self.author, title='Reported', description='d')
+        self.comment = Comment.objects.create(field=self.field, author=self.author, text='Reported comment')
+        cache.clear()
+
+    def report_field(self, user, field=None):
+        self.client.force_login(user)
+        self.client.post(reverse('report_field', args=[(field or self.field).id]), {'reason': 'spam'})
+
+    def test_reports_grouped_per_target(self):
+        for reporter in self.reporters:
+            self.report_field(reporter)
+            self.comment.add_report(reporter)
+        FieldReport.objects.filter(user=self.reporters[0]).update(is_resolved=True)
+        self.report_field(self.reporters[0])
+        field_entry = ReportQueueEntry.objects.get(target_type=Reaction.FIELD)
+        self.assertEqual((field_entry.reports, field_entry.reporters), (4, 3))
+        comment_entry = ReportQueueEntry.objects.get(target_type=Reaction.COMMENT)
+        self.assertEqual((comment_entry.reports, comment_entry.reporters), (3, 3))
+
+    def test_priority_weighs_volume_and_recency(self):
+        now = timezone.now()
+        half_life = timedelta(seconds=settings.REPORT_QUEUE_HALF_LIFE)
+        self.assertGreater(ReportQueueEntry.priority(3, now), ReportQueueEntry.priority(1, now))
+        self.assertGreater(ReportQueueEntry.priority(1, now), ReportQueueEntry.priority(1, now - half_life / 2))
+        self.assertAlmostEqual(ReportQueueEntry.priority(1, now),
+                               ReportQueueEntry.priority(3, now - half_life))
+
+    def test_panel_pages_queue_by_priority(self):
+        other = Field.objects.create(user=self.author, title='Other', description='d')
+        for reporter in self.reporters:
+            self.report_field(reporter)
+        self.comment.add_report(self.reporters[0])
+        self.report_field(self.reporters[0], other)
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('moderation_panel'))
+        queue = response.context['report_queue']
+        self.assertEqual(queue.paginator.count, 3)
+        self.assertEqual([entry.target_object for entry in queue], [self.field, other])
+        self.assertContains(response, 'Очередь жалоб (3)')
+        response = self.client.get(reverse('moderation_panel'), {'page': 2})
+        self.assertEqual([entry.target_object for entry in response.context['report_queue']], [self.comment])
+        self.assertContains(response, 'Reported comment')
+
+    def test_resolve_entry_blocks_and_closes_reports(self):
+        for reporter in self.reporters:
+            self.report_field(reporter)
+        entry = ReportQueueEntry.objects.get()
+        self.client.force_login(self.staff)
+        self.client.post(reverse('resolve_report_queue_entry', args=[entry.id]), {'action': 'block'})
+        self.field.refresh_from_db()
+        self.assertTrue(self.field.is_blocked)
+        self.assertFalse(FieldReport.objects.filter(is_resolved=False).exists())
+        self.assertEqual(set(FieldReport.objects.values_list('status', flat=True)), {'approved'})
+        self.assertFalse(ReportQueueEntry.pending().exists())
+        self.comment.add_report(self.reporters[0])
+        self.report_field(self.reporters[1])
+        self.assertEqual(ReportQueueEntry.pending().count(), 2)
+
+    def test_single_report_resolution_settles_entry(self):
+        self.report_field(self.reporters[0])
+        report = FieldReport.objects.get()
+        self.client.force_login(self.staff)
+        self.client.post(reverse('resolve_field_report', args=[report.id]), {'action': 'ignore'})
+        self.assertFalse(ReportQueueEntry.pending().exists())
+
+    def test_rebuild_from_existing_reports(self):
+        for reporter in self.reporters[:2]:
+            FieldReport.objects.create(field=self.field, user=reporter, reason='spam')
+        self.comment.reports.add(self.reporters[0])
+        call_command('rebuild_report_queue', stdout=MagicMock())
+        entries = {entry.target_type: entry for entry in ReportQueueEntry.pending()}
+        self.assertEqual(entries[Reaction.FIELD].reporters, 2)
+        self.assertEqual(entries[Reaction.COMMENT].reports, 1)
+        entries[Reaction.COMMENT].resolve(block=False)
+        call_command('rebuild_report_queue', stdout=MagicMock())
+        self.assertEqual(list(ReportQueueEntry.pending().values_list('target_type', flat=True)), [Reaction.FIELD])
+
+
+class BanCascadeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='banned', password='testpass123')
+        other = User.objects.create_user(username='bystander', password='testpass123')
+        self.fields = [Field.objects.create(user=self.user, title=f'Field {index}', description='d')
+                       for index in range(5)]
+        self.foreign = Field.objects.create(user=other, title='Foreign', description='d')
+        self.comments = [Comment.objects.create(field=self.foreign, author=self.user, text=f'Comment {index}')
+                         for index in range(3)]
+        self.fields[0].block()
+
+    def test_ban_deactivates_now_and_defers_content(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertTrue(self.user.safe_ban())
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        self.assertEqual(Field.objects.filter(user=self.user, is_blocked=True).count(), 1)
+        cascade = BanCascade.objects.get(user=self.user)
+        self.assertIsNone(cascade.finished_at)
+        self.user.safe_ban()
+        self.assertEqual(BanCascade.objects.count(), 1)
+
+    @override_settings(BAN_CASCADE_CHUNK_SIZE=2)
+    def test_run_blocks_in_chunks(self):
+        cascade = BanCascade.schedule(self.user)
+        self.assertTrue(BanCascade.run(cascade.id))
+        cascade.refresh_from_db()
+        self.assertEqual((cascade.stage, cascade.total, cascade.processed, cascade.blocked), (BanCascade.DONE, 8, 8, 7))
+        self.assertEqual(cascade.progress, 100)
+        self.assertFalse(Field.objects.filter(user=self.user, is_blocked=False).exists())
+        self.assertFalse(Comment.objects.filter(author=self.user, is_blocked=False).exists())
+        self.foreign.refresh_from_db()
+        self.assertFalse(self.foreign.is_blocked)
+
+    def test_resumes_after_worker_dies(self):
+        cascade = BanCascade.claim(BanCascade.schedule(self.user).id)
+        self.assertTrue(cascade.step(chunk_size=3))
+        self.assertIsNone(BanCascade.claim(cascade.id))
+        self.assertEqual(BanCascade.run_pending(), 0)
+        BanCascade.objects.filter(pk=cascade.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        call_command('run_ban_cascades', '--chunk-size', '3', stdout=MagicMock())
+        cascade.refresh_from_db()
+        self.assertEqual((cascade.processed, cascade.total), (8, 8))
+        self.assertIsNotNone(cascade.finished_at)
+        self.assertFalse(Comment.objects.filter(author=self.user, is_blocked=False).exists())
+
+    def test_step_aborts_when_lease_is_taken_over(self):
+        stale = BanCascade.claim(BanCascade.schedule(self.user).id)
+        self.assertTrue(stale.step(chunk_size=2))
+        BanCascade.objects.filter(pk=stale.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        fresh = BanCascade.claim(stale.pk)
+        with self.assertRaises(BanCascade.LeaseLost):
+            stale.step(chunk_size=2)
+        self.assertEqual(Field.objects.filter(user=self.user, is_blocked=True).count(), 2)
+        self.assertTrue(fresh.step(chunk_size=2))
+        fresh.refresh_from_db()
+        self.assertEqual((fresh.processed, fresh.last_id), (4, self.fields[3].id))
+
+    def test_chunk_is_bounded(self):
+        cascade = BanCascade.claim(BanCascade.schedule(self.user).id)
+        cascade.step(chunk_size=2)
+        self.assertEqual(Field.objects.filter(user=self.user, is_blocked=True).count(), 2)
+        self.assertEqual((cascade.stage, cascade.progress), (BanCascade.FIELDS, 25))
+
+    def test_panel_shows_progress(self):
+        staff = User.objects.create_user(username='moderator', password='testpass123', is_staff=True)
+        BanCascade.schedule(self.user)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('moderation_panel'))
+        self.assertContains(response, 'Блокировка содержимого пользователей')
+        self.assertContains(response, 'banned')
+
+
+class BulkModerationTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='moderator', password='testpass123', is_staff=True)
+        self.spammers = [User.objects.create_user(username=f'spammer{index}', password='testpass123')
+                         for index in range(2)]
+        self.fields = [Field.objects.create(user=self.spammers[0], title=f'Spam {index}', description='d')
+                       for index in range(3)]
+        self.comments = [Comment.objects.create(field=self.fields[0], author=self.spammers[1], text=f'Spam {index}')
+                         for index in range(3)]
+        self.fields[2].block()
+        self.client.force_login(self.staff)
+
+    def post(self, action, items):
+        return self.client.post(reverse('bulk_moderation'), {'action': action, 'items': items})
+
+    def test_block_returns_per_item_results(self):
+        items = [f'field:{field.id}' for field in self.fields] + [f'comment:{self.comments[0].id}',
+                                                                   'field:999999', 'user:1', 'bogus']
+        data = self.post('block', items).json()
+        self.assertEqual([result['status'] for result in data['results']],
+                         ['ok', 'ok', 'unchanged', 'ok', 'not_found', 'unsupported', 'invalid'])
+        self.assertEqual(data['updated'], {'field': 2, 'comment': 1})
+        self.assertEqual(Field.objects.filter(is_blocked=True).count(), 3)
+        self.assertEqual(Comment.objects.filter(is_blocked=True).count(), 1)
+
+    def test_malformed_and_out_of_range_ids_are_invalid(self):
+        data = self.post('block', ['field:²', 'field:99999999999999999999', 'field:-1', 'user:0']).json()
+        self.assertEqual([result['status'] for result in data['results']], ['invalid'] * 4)
+        self.assertEqual(data['updated'], {})
+
+    def test_one_update_per_type(self):
+        items = [('field', field.id) for field in self.fields] + [('comment', c.id) for c in self.comments]
+        with CaptureQueriesContext(connection) as queries:
+            moderation.apply(moderation.BLOCK, items, self.staff)
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertTrue(all(' IN (' in sql for sql in updates))
+
+    def test_unblock(self):
+        data = self.post('unblock', [f'field:{self.fields[2].id}', f'field:{self.fields[0].id}']).json()
+        self.assertEqual([result['status'] for result in data['results']], ['ok', 'unchanged'])
+        self.fields[2].refresh_from_db()
+        self.assertFalse(self.fields[2].is_blocked)
+
+    def test_ban_schedules_cascades(self):
+        items = [f'user:{user.id}' for user in self.spammers] + [f'user:{self.staff.id}']
+        with self.captureOnCommitCallbacks() as callbacks:
+            data = self.post('ban', items).json()
+        self.assertEqual([result['status'] for result in data['results']], ['ok', 'ok', 'forbidden'])
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(User.objects.filter(id__in=[user.id for user in self.spammers], is_active=True).exists())
+        self.assertEqual(BanCascade.objects.filter(finished_at__isnull=True).count(), 2)
+        self.assertEqual(self.post('ban', items[:1]).json()['results'][0]['status'], 'unchanged')
+        self.assertEqual(BanCascade.objects.count(), 2)
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.post('delete', ['field:1']).status_code, 400)
+        self.assertEqual(self.post('block', []).status_code, 400)
+        with override_settings(MODERATION_BULK_MAX_ITEMS=1):
+            self.assertEqual(self.post('block', ['field:1', 'field:2']).status_code, 400)
+        self.client.force_login(self.spammers[0])
+        self.assertEqual(self.post('block', [f'field:{self.fields[0].id}']).status_code, 403)
+
+    def test_field_block_saves_only_flag(self):
+        field = self.fields[0]
+        Field.objects.filter(pk=field.pk).update(title='Changed elsewhere')
+        field.block()
+        field.refresh_from_db()
+        self.assertEqual((field.title, field.is_blocked), ('Changed elsewhere', True))
+
+
+class ModerationLogTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='moderator', password='testpass123', is_staff=True)
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.fields = [Field.objects.create(user=self.author, title=f'Field {index}', description='d')
+                       for index in range(3)]
+        self.comment = Comment.objects.create(field=self.fields[0], author=self.author, text='Comment')
+        self.client.force_login(self.staff)
+
+    def test_single_actions_are_logged(self):
+        self.client.post(reverse('block_content', args=['field', self.fields[0].id]))
+        self.client.post(reverse('unblock_content', args=['field', self.fields[0].id]))
+        self.client.post(reverse('block_content', args=['user', self.author.id]))
+        self.assertEqual(list(ModerationLogEntry.objects.order_by('id').values_list(
+            'actor__username', 'action', 'target_type', 'target_id')), [
+            ('moderator', 'block', 'field', self.fields[0].id),
+            ('moderator', 'unblock', 'field', self.fields[0].id),
+            ('moderator', 'ban', 'user', self.author.id),
+        ])
+
+    def test_comment_unblock_is_logged(self):
+        self.comment.block()
+        self.client.post(reverse('unblock_content', args=['comment', self.comment.id]))
+        self.comment.refresh_from_db()
+        self.assertFalse(self.comment.is_blocked)
+        self.assertTrue(ModerationLogEntry.objects.filter(
+            action=ModerationLogEntry.UNBLOCK, target_type='comment', target_id=self.comment.id).exists())
+
+    def test_bulk_action_is_one_insert(self):
+        items = [('field', field.id) for field in self.fields] + [('comment', self.comment.id)]
+        with CaptureQueriesContext(connection) as queries:
+            moderation.apply(moderation.BLOCK, items, self.staff)
+        inserts = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT INTO "main_app_moderationlogentry"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ModerationLogEntry.objects.filter(actor=self.staff, action='block').count(), 4)
+        moderation.apply(moderation.BLOCK, items, self.staff)
+        self.assertEqual(ModerationLogEntry.objects.count(), 4)
+
+    def test_report_resolution_is_logged(self):
+        reporter = User.objects.create_user(username='reporter', password='testpass123')
+        report = FieldReport.objects.create(field=self.fields[1], user=reporter, reason='spam')
+        ReportQueueEntry.register(Reaction.FIELD, self.fields[1].id, True)
+        entry = ReportQueueEntry.objects.get()
+        self.client.post(reverse('resolve_report_queue_entry', args=[entry.id]), {'action': 'ignore'})
+        self.assertTrue(ModerationLogEntry.objects.filter(
+            actor=self.staff, action=ModerationLogEntry.REPORT_REJECTED, target_id=self.fields[1].id).exists())
+        report.refresh_from_db()
+        self.assertEqual(report.status, 'rejected')
+
+    @override_settings(AUTO_MODERATION_RULES={'comment': {'reporters': 1, 'window': 3600}})
+    def test_auto_moderation_is_logged_without_actor(self):
+        ReportCounter.register(Reaction.COMMENT, self.comment.id)
+        entry = ModerationLogEntry.objects.get()
+        self.assertEqual((entry.actor, entry.action, entry.note), (None, 'block', 'автомодерация'))
+
+    def test_entries_are_append_only(self):
+        entry = ModerationLogEntry.record(self.staff, ModerationLogEntry.BLOCK, [('field', self.fields[0].id)])[0]
+        entry = ModerationLogEntry.objects.get(pk=entry.pk)
+        entry.note = 'changed'
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+    def test_action_rolls_back_with_failed_log(self):
+        with patch.object(ModerationLogEntry.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                moderation.apply(moderation.BLOCK, [('field', self.fields[0].id)], self.staff)
+        self.fields[0].refresh_from_db()
+        self.assertFalse(self.fields[0].is_blocked)
+
+    @override_settings(MODERATION_LOG_PAGE_SIZE=2)
+    def test_log_view_pages_and_filters(self):
+        other = User.objects.create_user(username='other', password='testpass123', is_staff=True)
+        for field in self.fields:
+            ModerationLogEntry.record(self.staff, ModerationLogEntry.BLOCK, [('field', field.id)])
+        ModerationLogEntry.record(other, ModerationLogEntry.UNBLOCK, [('field', self.fields[0].id)])
+        response = self.client.get(reverse('moderation_log'), {'actor': 'moderator'})
+        first = [entry.target_id for entry in response.context['entries']]
+        self.assertEqual(first, [self.fields[2].id, self.fields[1].id])
+        response = self.client.get(reverse('moderation_log'), {
+            'actor': 'moderator', 'cursor': response.context['next_cursor']})
+        self.assertEqual([entry.target_id for entry in response.context['entries']], [self.fields[0].id])
+        self.assertIsNone(response.context['next_cursor'])
+        response = self.client.get(reverse('moderation_log'), {
+            'target_type': 'field', 'target_id': self.fields[0].id})
+        self.assertEqual([entry.action for entry in response.context['entries']], ['unblock', 'block'])
+        for cursor in ('bad', '99999999999999999999.1'):
+            self.assertTemplateNotUsed(self.client.get(reverse('moderation_log'), {'cursor': cursor}),
+                                       'moderation/log.html')
+        for target_type, target_id in (('field', '²'), ('field', '99999999999999999999'), ('planet', '1'),
+                                       ('', '1'), ('field', '')):
+            response = self.client.get(reverse('moderation_log'), {'target_type': target_type, 'target_id': target_id})
+            self.assertTemplateNotUsed(response, 'moderation/log.html')
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(reverse('moderation_log')).status_code, 403)
+
+
+class ReportAggregateTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reporters = [User.objects.create_user(username=f'reporter{index}', password='testpass123')
+                          for index in range(3)]
+        self.field = Field.objects.create(user=self.author, title='Reported', description='d')
+        self.comment = Comment.objects.create(field=self.field, author=self.author, text='Reported comment')
+
+    def report_field(self, user, reason='spam'):
+        self.client.force_login(user)
+        return self.client.post(reverse('report_field', args=[self.field.id]), {'reason': reason})
+
+    def test_aggregate_counts_reporters_and_reasons(self):
+        self.report_field(self.reporters[0])
+        self.report_field(self.reporters[1], 'abuse')
+        FieldReport.objects.filter(user=self.reporters[0]).update(is_resolved=True)
+        self.report_field(self.reporters[0])
+        entry = ReportQueueEntry.objects.get(target_type=Reaction.FIELD)
+        self.assertEqual((entry.reports, entry.reporters), (3, 2))
+        self.assertEqual(entry.reasons, {'spam': 2, 'abuse': 1})
+        self.assertEqual(entry.reason_counts(), [('Спам', 2), ('Оскорбительное содержание', 1)])
+        self.assertLess(entry.first_reported_at, entry.last_reported_at)
+        self.assertEqual(set(self.field.reporters.all()), set(self.reporters[:2]))
+
+    def test_submission_is_one_write_and_one_upsert(self):
+        self.report_field(self.reporters[0])
+        self.client.force_login(self.reporters[1])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('report_field', args=[self.field.id]), {'reason': 'spam'})
+        self.assertRedirects(response, reverse('index'), fetch_redirect_response=False)
+        writes = [query['sql'].split(' ')[0] + ' ' + query['sql'].split('"')[1]
+                  for query in queries.captured_queries if query['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(writes, ['INSERT main_app_fieldreport', 'INSERT main_app_field_reporters',
+                                  'UPDATE main_app_reportcounter', 'UPDATE main_app_reportqueueentry'])
+        self.assertEqual(sum('FROM "main_app_field" ' in query['sql'] for query in queries.captured_queries), 1)
+        self.assertEqual(sum('FROM "main_app_fieldreport" ' in query['sql'] for query in queries.captured_queries), 0)
+
+    def test_duplicate_submission_shows_existing_report(self):
+        self.report_field(self.reporters[0])
+        self.client.force_login(self.reporters[0])
+        response = self.client.post(reverse('report_field', args=[self.field.id]), {'reason': 'abuse'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['existing_report'], FieldReport.objects.get())
+        self.assertContains(response, 'Вы уже отправили жалобу')
+        entry = ReportQueueEntry.objects.get(target_type=Reaction.FIELD)
+        self.assertEqual((entry.reports, entry.reporters, entry.reasons), (1, 1, {'spam': 1}))
+
+    def test_aggregate_integrity_error_is_not_reported_as_duplicate(self):
+        self.client.force_login(self.reporters[0])
+        with patch.object(ReportQueueEntry, 'submit', side_effect=IntegrityError('FOREIGN KEY constraint failed')):
+            with self.assertRaises(IntegrityError):
+                self.client.post(reverse('report_field', args=[self.field.id]), {'reason': 'spam'})
+        self.assertFalse(FieldReport.objects.exists())
+
+    def test_duplicate_comment_report_is_not_counted(self):
+        self.assertEqual(self.comment.add_report(self.reporters[0]), 1)
+        self.assertEqual(self.comment.add_report(self.reporters[1]), 2)
+        self.assertEqual(self.comment.add_report(self.reporters[0]), 2)
+        entry = ReportQueueEntry.objects.get(target_type=Reaction.COMMENT)
+        self.assertEqual((entry.reports, entry.reporters, entry.reasons), (2, 2, {}))
+        self.assertEqual(ReportCounter.objects.get(target_type=Reaction.COMMENT).reporters, 2)
+
+    def test_rebuild_restores_reasons(self):
+        FieldReport.objects.create(field=self.field, user=self.reporters[0], reason='spam')
+        FieldReport.objects.create(field=self.field, user=self.reporters[1], reason='other', description='x')
+        call_command('rebuild_report_queue', stdout=MagicMock())
+        self.assertEqual(ReportQueueEntry.objects.get().reasons, {'spam': 1, 'other': 1})
+
+    def test_panel_shows_reasons(self):
+        self.report_field(self.reporters[0], 'illegal')
+        staff = User.objects.create_user(username='moderator', password='testpass123', is_staff=True)
+        self.client.force_login(staff)
+        self.assertContains(self.client.get(reverse('moderation_panel')), 'Незаконный контент: 1')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite-specific')
+class QueryPlanTests(TestCase):
+    """
+    Планы частых запросов: каждый должен читать свой индекс без полного просмотра таблицы
+    и без сортировки во временном B-дереве.
+    """
+    def assertUsesIndex(self, queryset, index):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        for step in plan:
+            self.assertFalse(step.startswith('SCAN ') and ' USING ' not in step, f'Full scan: {plan}')
+            self.assertNotIn('TEMP B-TREE', step, f'Sort: {plan}')
+        self.assertTrue(any(index in step for step in plan), f'{index} not used: {plan}')
+
+    def test_open_fields_by_date(self):
+        self.assertUsesIndex(FieldListView().get_queryset()[:20], 'field_open_recent_idx')
+
+    def test_blocked_fields_by_update(self):
+        self.assertUsesIndex(Field.objects.filter(is_blocked=True).order_by('-updated_at')[:10],
+                             'field_blocked_recent_idx')
+
+    def test_blocked_comments_by_date(self):
+        self.assertUsesIndex(Comment.objects.filter(is_blocked=True).order_by('-created_at')[:10],
+                             'comment_blocked_recent_idx')
+
+    def test_fingerprint_band_lookup(self):
+        record = TextFingerprint.build(TextFingerprint.COMMENT, 1, 'one two three four five six')
+        for index in range(simhash.BANDS):
+            self.assertUsesIndex(record.band_candidates(index), f'fingerprint_band{index}_idx')
+
+    def test_unresolved_reports(self):
+        self.assertUsesIndex(FieldReport.objects.filter(is_resolved=False).values('field_id').annotate(
+            reports=models.Count('id')).order_by(), 'fieldreport_open_unique')
+        self.assertUsesIndex(FieldReport.objects.filter(field_id=1, user_id=1, is_resolved=False),
+                             'fieldreport_open_unique')
+
+    def test_pending_reports(self):
+        self.assertUsesIndex(FieldReport.objects.filter(status='pending').select_related('field', 'user'),
+                             'fieldreport_status_idx')
+
+    def test_field_walls(self):
+        self.assertUsesIndex(Wall.objects.filter(field_id=1).values('id', 'x', 'y', 'width', 'height'),
+                             'COVERING INDEX wall_field_cells_idx')
+
+    def test_moderation_queues(self):
+        self.assertUsesIndex(ReportQueueEntry.pending()[:25], 'report_queue_priority_idx')
+        self.assertUsesIndex(ModerationAction.pending()[:50], 'moderation_action_queue_idx')
+
+    def test_cursor_pages_seek_to_cursor(self):
+        position = after((timezone.now(), 10))
+        for queryset, index in (
+                (ProfileComment.objects.filter(position, profile_id=1), 'profile_comment_wall_idx'),
+                (Field.objects.filter(position, user_id=1), 'field_user_recent_idx'),
+                (Comment.objects.filter(position, author_id=1), 'comment_author_recent_idx'),
+                (Reaction.objects.filter(position, user_id=1, target_type=Reaction.FIELD, kind=Reaction.LIKE),
+                 'reaction_user_recent_idx'),
+                (ModerationLogEntry.objects.filter(position), 'moderation_log_recent_idx'),
+                (ModerationLogEntry.objects.filter(position, actor_id=1), 'moderation_log_actor_idx'),
+                (ModerationLogEntry.objects.filter(position, target_type=Reaction.FIELD, target_id=1),
+                 'moderation_log_target_idx')):
+            self.assertUsesIndex(queryset.order_by('-created_at', '-id')[:21], 'created_at<?)')
+            self.assertUsesIndex(queryset.order_by('-created_at', '-id')[:21], index)
@@ -0,0 +1,153 @@
+"""
+Лента действий пользователя: созданные поля, написанные комментарии и лайки.
+
+Каждый источник — отдельная выборка по индексу (пользователь, дата создания),
+уже упорядоченная по убыванию даты и ограниченная размером страницы. Выборки
+сливаются кучей (:func:`heapq.merge`), поэтому из каждой таблицы читается не
+больше страницы строк, а общая сортировка объединения не нужна.
+
+Курсор хранит позицию последнего элемента страницы в общем порядке
+(дата, номер источника, ID). Для каждого источника из неё строится условие
+«после курсора» по его индексу, поэтому страницы не повторяют и не теряют
+элементы при совпадении дат в разных таблицах.
+
+:mod:`main_app.timeline`
+"""
+
+import heapq
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Substr
+from django.utils import timezone
+from main_app.cursors import after, decode_cursor, encode_cursor
+from main_app.models import Comment, Field, Reaction
+from main_app.profile_fields import field_url_template
+
+FIELD_CREATED: str = 'field_created'
+COMMENT_POSTED: str = 'comment_posted'
+FIELD_LIKED: str = 'field_liked'
+COMMENT_LIKED: str = 'comment_liked'
+
+Position = Tuple[datetime, int, int]
+Entry = Tuple[datetime, int, int, Dict[str, Any]]
+
+
+def _excerpt(column: str) -> Substr:
+    return Substr(column, 1, settings.TIMELINE_EXCERPT_LENGTH)
+
+
+def _fields_created(user_id: int) -> QuerySet:
+    return Field.objects.filter(user_id=user_id).values('id', 'created_at', 'title', field_ref=F('id'))
+
+
+def _comments_posted(user_id: int) -> QuerySet:
+    return Comment.objects.filter(author_id=user_id).values('id', 'created_at', title=_excerpt('text'),
+                                                            field_ref=F('field_id'))
+
+
+def _fields_liked(user_id: int) -> QuerySet:
+    fields: QuerySet = Field.objects.filter(pk=OuterRef('target_id'))
+    return Reaction.objects.filter(Exists(fields), user_id=user_id, target_type=Reaction.FIELD,
+                                   kind=Reaction.LIKE).values(
+        'id', 'created_at', title=Subquery(fields.values('title')), field_ref=F('target_id'))
+
+
+def _comments_liked(user_id: int) -> QuerySet:
+    comments: QuerySet = Comment.objects.filter(pk=OuterRef('target_id')).order_by()
+    return Reaction.objects.filter(Exists(comments), user_id=user_id, target_type=Reaction.COMMENT,
+                                   kind=Reaction.LIKE).values(
+        'id', 'created_at', title=Subquery(comments.values(excerpt=_excerpt('text'))),
+        field_ref=Subquery(comments.values('field_id')))
+
+
+SOURCES: Tuple[Tuple[str, Callable[[int], QuerySet]], ...] = (
+    (FIELD_CREATED, _fields_created),
+    (COMMENT_POSTED, _comments_posted),
+    (FIELD_LIKED, _fields_liked),
+    (COMMENT_LIKED, _comments_liked),
+)
+
+
+def encode_position(moment: datetime, rank: int, row_id: int) -> str:
+    """
+    Кодирует позицию элемента ленты.
+
+    :param moment: Дата элемента.
+    :type moment: :class:`datetime.datetime`
+    :param rank: Номер источника в ``SOURCES``.
+    :type rank: int
+    :param row_id: ID строки источника.
+    :type row_id: int
+    :returns: Курсор.
+    :rtype: str
+    """
+    return f'{encode_cursor(moment, row_id)}.{rank}'
+
+
+def decode_position(cursor: str) -> Position:
+    """
+    Разбирает курсор ленты.
+
+    :param cursor: Курсор.
+    :type cursor: str
+    :returns: Дата, номер источника и ID последнего элемента предыдущей страницы.
+    :rtype: Tuple[:class:`datetime.datetime`, int, int]
+    :raises ValueError: Если курсор некорректен.
+    """
+    head, _, rank = cursor.rpartition('.')
+    moment, row_id = decode_cursor(head)
+    if not 0 <= int(rank) < len(SOURCES):
+        raise ValueError(cursor)
+    return moment, int(rank), row_id
+
+
+def _after(position: Optional[Position], rank: int) -> Q:
+    if position is None:
+        return Q()
+    moment, last_rank, row_id = position
+    if rank < last_rank:
+        return Q(created_at__lte=moment)
+    if rank > last_rank:
+        return Q(created_at__lt=moment)
+    return after((moment, row_id))
+
+
+def _stream(rank: int, rows: QuerySet) -> Iterator[Entry]:
+    for row in rows:
+        yield row['created_at'], rank, row['id'], row
+
+
+def page(user_id: int, cursor: str = '') -> Dict[str, Any]:
+    """
+    Возвращает страницу ленты действий пользователя, начиная с последних.
+
+    :param user_id: ID пользователя.
+    :type user_id: int
+    :param cursor: Курсор из ``next_cursor`` предыдущей страницы (пустой для первой).
+    :type cursor: str
+    :returns: Элементы страницы и курсор следующей страницы (``None``, если её нет).
+    :rtype: Dict[str, Any]
+    :raises ValueError: Если курсор некорректен.
+    """
+    position: Optional[Position] = decode_position(cursor) if cursor else None
+    size: int = settings.TIMELINE_PAGE_SIZE
+    streams: List[Iterator[Entry]] = [
+        _stream(rank, build(user_id).filter(_after(position, rank)).order_by('-created_at', '-id')[:size + 1])
+        for rank, (_, build) in enumerate(SOURCES)
+    ]
+    entries: List[Entry] = list(islice(heapq.merge(*streams, key=lambda entry: entry[:3], reverse=True), size + 1))
+    template: str = field_url_template()
+    last: Optional[Entry] = entries[size - 1] if len(entries) > size else None
+    return {
+        'items': [{
+            'type': SOURCES[rank][0],
+            'id': row['id'],
+            'title': row['title'],
+            'created_at': timezone.localtime(moment).strftime("%d.%m.%Y %H:%M"),
+            'url': template.format(row['field_ref']),
+        } for moment, rank, _, row in entries[:size]],
+        'next_cursor': encode_position(*last[:3]) if last else None,
+    }
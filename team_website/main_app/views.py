@@ -9,9 +9,12 @@ Django представления для обработки аутентифик
 :mod:`main_app.views`
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, List
+import os
+from typing import AsyncIterator, Dict, Any, Optional, List, Tuple
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
@@ -19,16 +22,28 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import UserPassesTestMixin, LoginRequiredMixin
 from django.contrib.auth.views import LoginView
 from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import IntegrityError, transaction
 from django.db.models import Q, QuerySet
-from django.http import HttpResponse, Http404, JsonResponse, HttpRequest
+from django.http import HttpResponse, Http404, JsonResponse, HttpRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy, reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
 from django.views.decorators.http import require_POST
 from django.views.generic import View, UpdateView, DetailView, CreateView, TemplateView, ListView
+from django.views.static import serve
 from django_registration.signals import user_registered
+from main_app.diagnostics import Document
 from main_app.forms import RegistrationForm, ProfileUpdateForm, FieldForm, FieldReportForm
-from main_app.models import User, Field, Comment, Wall, Cell, ProfileComment, FieldFile, FieldReport, ReportComment
+from main_app.models import (User, Field, Comment, Wall, Cell, ProfileComment, FieldFile, FieldReport, ReportComment,
+                             LeaderboardEntry, ExecutionReplay, Reaction, ReactionCount, ModerationAction,
+                             ReportQueueEntry, TextFingerprint, UserStats, BanCascade, ModerationLogEntry)
+from main_app import avatars, moderation, profile_fields, reactions, timeline
+from main_app.notifier import Subscription, notifier
 
 
 logger: logging.Logger = logging.getLogger(__name__)
@@ -192,9 +207,10 @@ class ProfileView(LoginRequiredMixin, DetailView):
         context: Dict[str, Any] = super().get_context_data(**kwargs)
         context['is_profile_page'] = True
         context['is_own_profile'] = self.object == self.request.user
-        context['profile_comments'] = ProfileComment.objects.filter(
-            profile=self.object
-        ).select_related('author').order_by('-created_at')
+        context['stats'] = UserStats.for_user(self.object)
+        context['profile_comments'], context['profile_comments_next'] = ProfileComment.wall(self.object.id)
+        context['profile_comments_total'] = ProfileComment.objects.filter(profile=self.object).count()
+        context['can_moderate_comments'] = context['is_own_profile'] or self.request.user.is_superuser
         return context
 
 
@@ -214,15 +230,66 @@ def add_profile_comment(request: HttpRequest, username: str) -> HttpResponse:
     if request.method == 'POST':
         text: str = request.POST.get('comment_text', '').strip()
         if text:
-            ProfileComment.objects.create(
+            comment: ProfileComment = ProfileComment.objects.create(
                 profile=profile_user,
                 author=request.user,
                 text=text
             )
+            TextFingerprint.index(TextFingerprint.PROFILE_COMMENT, comment.id, text)
             messages.success(request, 'Комментарий добавлен')
     return redirect('profile_view', username=username)
 
 
+@login_required
+def profile_comments(request: HttpRequest, username: str) -> JsonResponse:
+    """
+    Возвращает следующую страницу комментариев к профилю.
+
+    Каждый комментарий содержит готовую разметку того же шаблона, что и на
+    странице профиля.
+
+    :param request: HTTP-запрос с параметром ``cursor``.
+    :type request: :class:`django.http.HttpRequest`
+    :param username: Имя пользователя, к профилю которого относятся комментарии.
+    :type username: str
+    :returns: JSON-ответ с комментариями и курсором следующей страницы.
+    :rtype: :class:`django.http.JsonResponse`
+    """
+    profile_user: User = get_object_or_404(User, username=username)
+    try:
+        comments, next_cursor = ProfileComment.wall(profile_user.id, request.GET.get('cursor', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    can_moderate: bool = request.user == profile_user or request.user.is_superuser
+    return JsonResponse({
+        'comments': [{
+            'id': comment.id,
+            'author': comment.author.username,
+            'text': comment.text,
+            'created_at': comment.created_at.strftime("%Y-%m-%d %H:%M"),
+            'html': render_to_string('profile_comment.html', {
+                'comment': comment, 'can_moderate_comments': can_moderate}, request=request),
+        } for comment in comments],
+        'next_cursor': next_cursor,
+    })
+
+
+@login_required
+def activity_timeline(request: HttpRequest) -> JsonResponse:
+    """
+    Возвращает страницу ленты действий текущего пользователя (см. :mod:`main_app.timeline`).
+
+    :param request: HTTP-запрос с параметром ``cursor``.
+    :type request: :class:`django.http.HttpRequest`
+    :returns: JSON-ответ с элементами ленты и курсором следующей страницы.
+    :rtype: :class:`django.http.JsonResponse`
+    """
+    try:
+        return JsonResponse(timeline.page(request.user.id, request.GET.get('cursor', '')))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+
 @login_required
 def delete_profile_comment(request: HttpRequest, comment_id: int) -> HttpResponse:
     """
@@ -447,11 +514,18 @@ class FieldDetailView(DetailView):
         field: Field = self.get_object()
         if not field.cells.exists():
             self.create_cells(field)
+        comments_page, comment_threads = Comment.threads(field, self.request.GET.get('page', 1))
         context.update({
-            'is_liked': field.likes.filter(
-                id=self.request.user.id).exists() if self.request.user.is_authenticated else False,
-            'is_favorited': field.favorites.filter(
-                id=self.request.user.id).exists() if self.request.user.is_authenticated else False,
+            'comments_page': comments_page,
+            'comment_threads': comment_threads,
+            'comment_max_depth': settings.COMMENT_MAX_DEPTH,
+            'is_liked': reactions.has_reacted('like', field.id, self.request.user.id),
+            'is_favorited': reactions.has_reacted('favorite', field.id, self.request.user.id),
+            'likes_count': reactions.count('like', field.id),
+            'liked_comment_ids': set(Reaction.objects.filter(
+                user_id=self.request.user.id, target_type=Reaction.COMMENT, kind=Reaction.LIKE,
+                target_id__in=field.comments.values('id')
+            ).values_list('target_id', flat=True)) if self.request.user.is_authenticated else set(),
             'cols': field.cols,
             'rows': field.rows,
         })
@@ -518,6 +592,33 @@ class ReportFieldView(LoginRequiredMixin, CreateView):
         """
         return reverse_lazy('index')
 
+    def get_field(self) -> Field:
+        """
+        Возвращает поле, на которое подаётся жалоба; поле читается один раз за запрос.
+
+        :returns: Поле.
+        :rtype: :class:`main_app.models.Field`
+        :raises Http404: Если поле не найдено.
+        """
+        if not hasattr(self, '_field'):
+            self._field: Field = get_object_or_404(Field, id=self.kwargs['field_id'])
+        return self._field
+
+    def get_existing_report(self) -> Optional[FieldReport]:
+        """
+        Возвращает нерассмотренную жалобу пользователя на поле; запрос выполняется один раз за запрос.
+
+        :returns: Жалоба или ``None``.
+        :rtype: Optional[:class:`main_app.models.FieldReport`]
+        """
+        if not hasattr(self, '_existing_report'):
+            self._existing_report: Optional[FieldReport] = FieldReport.objects.filter(
+                field_id=self.kwargs['field_id'],
+                user=self.request.user,
+                is_resolved=False
+            ).first()
+        return self._existing_report
+
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         """
         Добавляет объект поля в контекст шаблона.
@@ -528,34 +629,43 @@ class ReportFieldView(LoginRequiredMixin, CreateView):
         :rtype: Dict[str, Any]
         """
         context: Dict[str, Any] = super().get_context_data(**kwargs)
-        field: Field = get_object_or_404(Field, id=self.kwargs['field_id'])
-        context['field'] = field
-        context['existing_report'] = FieldReport.objects.filter(
-            field_id=field.id,
-            user=self.request.user,
-            is_resolved=False
-        ).first()
+        context['field'] = self.get_field()
+        context['existing_report'] = self.get_existing_report()
         return context
 
     def form_valid(self, form: FieldReportForm) -> HttpResponse:
         """
         Обрабатывает валидную форму и создает жалобу.
 
+        Жалоба сохраняется вместе с обновлением сводки жалоб на поле
+        (см. :meth:`main_app.models.ReportQueueEntry.submit`). Повторную жалобу
+        отсекает ограничение ``fieldreport_open_unique``: при конфликте вставки
+        жалобы пользователю показывается уже отправленная жалоба. Ошибки
+        целостности при обновлении сводки не перехватываются.
+
         :param form: Заполненная форма жалобы.
         :type form: :class:`main_app.forms.FieldReportForm`
-        :returns: Перенаправление на URL успешной отправки.
+        :returns: Перенаправление на URL успешной отправки или страница с существующей жалобой.
         :rtype: :class:`django.http.HttpResponse`
         :raises ValidationError: Если данные формы невалидны.
         """
         try:
             self.validate_report(form.cleaned_data)
             report = form.save(commit=False)
-            report.field = get_object_or_404(Field, id=self.kwargs['field_id'])
+            report.field = self.get_field()
             report.user = self.request.user
-            report.save()
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        report.save()
+                except IntegrityError:
+                    form.add_error(None, 'Вы уже отправляли жалобу на это поле.')
+                    return self.render_to_response(self.get_context_data(form=form))
+                ReportQueueEntry.submit(Reaction.FIELD, report.field.id, report.user, report.reason)
+            self.object = report
             logger.info("A complaint has been created for the ID field: %s "
                         "from the user %s", report.field.id, report.user.username)
-            return super().form_valid(form)
+            return redirect(self.get_success_url())
         except Exception as e:
             logger.error("Error when creating a complaint: %s", str(e), exc_info=True)
             raise
@@ -575,13 +685,6 @@ class ReportFieldView(LoginRequiredMixin, CreateView):
             raise ValidationError('Укажите причину жалобы.')
         if reason == 'other' and not description:
             raise ValidationError('Для причины "Другое" необходимо описание.')
-        existing_report: bool = FieldReport.objects.filter(
-            field_id=self.kwargs['field_id'],
-            user=self.request.user,
-            is_resolved=False
-        ).exists()
-        if existing_report:
-            raise ValidationError('Вы уже отправляли жалобу на это поле.')
 
 def search_fields(request: HttpRequest) -> JsonResponse:
     """
@@ -639,24 +742,161 @@ class ModerationPanelView(StaffRequiredMixin, TemplateView):
         """
         Добавляет данные о жалобах и заблокированном контенте в контекст.
 
+        Жалобы показываются очередью по объектам в порядке приоритета,
+        постранично (параметр ``page``).
+
         :param kwargs: Дополнительные аргументы.
         :type kwargs: Any
         :returns: Контекст с данными для модерации.
         :rtype: Dict[str, Any]
         """
         context: Dict[str, Any] = super().get_context_data(**kwargs)
-        context['field_reports'] = FieldReport.objects.filter(
-            is_resolved=False
-        ).select_related('field', 'user')
+        queue: Page = Paginator(ReportQueueEntry.pending(), settings.MODERATION_QUEUE_PAGE_SIZE).get_page(
+            self.request.GET.get('page'))
+        queue.object_list = ReportQueueEntry.attach_targets(list(queue.object_list))
+        context['report_queue'] = queue
         context['blocked_fields'] = Field.objects.filter(
             is_blocked=True
         ).order_by('-updated_at')[:10]
         context['blocked_comments'] = Comment.objects.filter(
             is_blocked=True
         ).order_by('-created_at')[:10]
+        context['auto_actions'] = ModerationAction.pending()[:50]
+        context['ban_cascades'] = BanCascade.objects.filter(finished_at__isnull=True).select_related(
+            'user').order_by('created_at')[:20]
+        context['spam_suspects'] = TextFingerprint.flagged()
         return context
 
 
+class ModerationLogView(StaffRequiredMixin, TemplateView):
+    """
+    Представление для журнала действий модерации.
+
+    Параметр ``actor`` отбирает действия модератора по имени, параметры
+    ``target_type`` и ``target_id`` — историю объекта, параметр ``cursor`` —
+    страницу после предыдущей.
+
+    :attribute template_name: Шаблон журнала.
+    :type template_name: str
+    """
+    template_name: str = 'moderation/log.html'
+
+    def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Добавляет страницу журнала и параметры отбора в контекст.
+
+        :param kwargs: Дополнительные аргументы.
+        :type kwargs: Any
+        :returns: Контекст с записями журнала.
+        :rtype: Dict[str, Any]
+        :raises Http404: Если модератор не найден или параметры отбора некорректны.
+        """
+        context: Dict[str, Any] = super().get_context_data(**kwargs)
+        params: Dict[str, str] = {key: self.request.GET.get(key, '').strip()
+                                  for key in ('actor', 'target_type', 'target_id')}
+        actor_id: Optional[int] = None
+        if params['actor']:
+            actor_id = User.objects.filter(username=params['actor']).values_list('id', flat=True).first()
+            if actor_id is None:
+                raise Http404("Модератор не найден")
+        target: Optional[Tuple[str, int]] = None
+        if params['target_type'] or params['target_id']:
+            try:
+                target_id: int = int(params['target_id'])
+            except ValueError:
+                target_id = 0
+            if params['target_type'] not in dict(ModerationLogEntry.TARGET_TYPES) or not 0 < target_id < 2 ** 63:
+                raise Http404("Некорректный объект")
+            target = (params['target_type'], target_id)
+        try:
+            entries, next_cursor = ModerationLogEntry.page(actor_id, target, self.request.GET.get('cursor', ''))
+        except ValueError:
+            raise Http404("Некорректный курсор")
+        context.update({
+            'entries': entries,
+            'next_cursor': next_cursor,
+            'filters': params,
+            'query': urlencode({key: value for key, value in params.items() if value}),
+        })
+        return context
+
+
+class ReviewModerationActionView(StaffRequiredMixin, View):
+    """
+    Представление для проверки автоматического действия модерации.
+    """
+    def post(self, request: HttpRequest, action_id: int) -> HttpResponse:
+        """
+        Подтверждает или отменяет автоматическое действие.
+
+        :param request: HTTP-запрос.
+        :type request: :class:`django.http.HttpRequest`
+        :param action_id: ID действия.
+        :type action_id: int
+        :returns: Перенаправление на панель модерации.
+        :rtype: :class:`django.http.HttpResponse`
+        """
+        action: ModerationAction = get_object_or_404(ModerationAction, id=action_id, decision='')
+        decision: Optional[str] = request.POST.get('decision')
+        if decision == 'confirm':
+            action.review(request.user, confirm=True)
+            messages.success(request, 'Скрытие подтверждено')
+        elif decision == 'revert':
+            action.review(request.user, confirm=False)
+            messages.info(request, 'Скрытие отменено')
+        return redirect('moderation_panel')
+
+
+class BulkModerationView(StaffRequiredMixin, View):
+    """
+    Представление для массовых действий модерации (см. :mod:`main_app.moderation`).
+    """
+    def post(self, request: HttpRequest) -> JsonResponse:
+        """
+        Применяет действие ``action`` к объектам ``items`` (значения вида ``field:12``).
+
+        :param request: HTTP-запрос.
+        :type request: :class:`django.http.HttpRequest`
+        :returns: JSON-ответ с результатом для каждого объекта.
+        :rtype: :class:`django.http.JsonResponse`
+        """
+        action: str = request.POST.get('action', '')
+        values: List[str] = request.POST.getlist('items')
+        if action not in moderation.ACTIONS:
+            return JsonResponse({'error': 'Unknown action'}, status=400)
+        if not values or len(values) > settings.MODERATION_BULK_MAX_ITEMS:
+            return JsonResponse({'error': 'Invalid number of items'}, status=400)
+        result: Dict[str, Any] = moderation.apply(action, moderation.parse_items(values), request.user)
+        logger.info("Bulk %s by %s: %s", action, request.user.username, result['updated'])
+        return JsonResponse(result)
+
+
+class ResolveReportQueueEntryView(StaffRequiredMixin, View):
+    """
+    Представление для рассмотрения всех жалоб на объект из очереди модерации.
+    """
+    def post(self, request: HttpRequest, entry_id: int) -> HttpResponse:
+        """
+        Блокирует объект или отклоняет жалобы на него.
+
+        :param request: HTTP-запрос.
+        :type request: :class:`django.http.HttpRequest`
+        :param entry_id: ID элемента очереди.
+        :type entry_id: int
+        :returns: Перенаправление на панель модерации.
+        :rtype: :class:`django.http.HttpResponse`
+        """
+        entry: ReportQueueEntry = get_object_or_404(ReportQueueEntry, id=entry_id, is_resolved=False)
+        action: Optional[str] = request.POST.get('action')
+        if action == 'block':
+            entry.resolve(block=True, moderator=request.user)
+            messages.success(request, 'Объект заблокирован')
+        elif action == 'ignore':
+            entry.resolve(block=False, moderator=request.user)
+            messages.info(request, 'Жалобы отклонены')
+        return redirect('moderation_panel')
+
+
 class ResolveCommentReportView(StaffRequiredMixin, View):
     """
     Представление для обработки жалоб на комментарии.
@@ -734,15 +974,21 @@ class ResolveFieldReportView(StaffRequiredMixin, View):
         """
         report: FieldReport = get_object_or_404(FieldReport, id=report_id)
         action: Optional[str] = request.POST.get('action')
-        if action == 'block':
-            report.field.block()
-            report.status = 'approved'
-            messages.success(request, 'Карта заблокирована')
-        elif action == 'ignore':
-            report.status = 'rejected'
-            messages.info(request, 'Жалоба отклонена')
-        report.is_resolved = True
-        report.save()
+        with transaction.atomic():
+            if action == 'block':
+                report.field.block()
+                report.status = 'approved'
+                ModerationLogEntry.record(request.user, ModerationLogEntry.REPORT_APPROVED,
+                                          [('field', report.field_id)], note=f'жалоба #{report_id}')
+                messages.success(request, 'Карта заблокирована')
+            elif action == 'ignore':
+                report.status = 'rejected'
+                ModerationLogEntry.record(request.user, ModerationLogEntry.REPORT_REJECTED,
+                                          [('field', report.field_id)], note=f'жалоба #{report_id}')
+                messages.info(request, 'Жалоба отклонена')
+            report.is_resolved = True
+            report.save()
+            ReportQueueEntry.settle_fields([report.field_id])
         return redirect('moderation_panel')
 
 
@@ -871,15 +1117,15 @@ def toggle_like(request: HttpRequest, pk: int) -> JsonResponse:
     """
     try:
         field = Field.objects.get(id=pk)
-        if request.user in field.likes.all():
-            field.likes.remove(request.user)
-            logger.debug("User %s removed the like from the field %s", request.user.username, field.id)
-        else:
-            field.likes.add(request.user)
+        is_liked, likes_count = reactions.toggle('like', field.id, request.user.id)
+        notifier.publish(field.id, 'reactions', {'likes_count': likes_count})
+        if is_liked:
             logger.debug("User %s liked the field %s", request.user.username, field.id)
+        else:
+            logger.debug("User %s removed the like from the field %s", request.user.username, field.id)
         return JsonResponse({
-            'is_liked': request.user in field.likes.all(),
-            'likes_count': field.likes.count()
+            'is_liked': is_liked,
+            'likes_count': likes_count
         })
     except Exception as e:
         logger.error("Error when processing a like: %s", str(e), exc_info=True)
@@ -900,14 +1146,11 @@ def toggle_favorite(request: HttpRequest, pk: int) -> JsonResponse:
     :rtype: :class:`django.http.JsonResponse`
     """
     field: Field = Field.objects.get(id=pk)
-    if request.user in field.favorites.all():
-        field.favorites.remove(request.user)
-        is_favorited: bool = False
-    else:
-        field.favorites.add(request.user)
-        is_favorited: bool = True
+    is_favorited, favorites_count = reactions.toggle('favorite', field.id, request.user.id)
+    notifier.publish(field.id, 'reactions', {'favorites_count': favorites_count})
     return JsonResponse({
-        'is_favorited': is_favorited
+        'is_favorited': is_favorited,
+        'favorites_count': favorites_count
     })
 
 
@@ -934,19 +1177,32 @@ def add_comment(request: HttpRequest, pk: int) -> JsonResponse:
         if len(text) > 1000:
             return JsonResponse({'error': 'Comment is too long (max 1000 chars)'}, status=400)
         field: Field = get_object_or_404(Field, id=pk)
-        comment: Comment = Comment.objects.create(
-            field=field,
-            author=request.user,
-            text=text
-        )
+        parent: Optional[Comment] = None
+        if data.get('parent_id') is not None:
+            parent = Comment.objects.filter(id=data['parent_id'], field=field, is_blocked=False).first()
+            if parent is None:
+                return JsonResponse({'error': 'Parent comment not found'}, status=404)
+        try:
+            comment: Comment = Comment.objects.create(
+                field=field,
+                author=request.user,
+                text=text,
+                parent=parent
+            )
+        except ValidationError as e:
+            return JsonResponse({'error': e.messages[0]}, status=400)
+        TextFingerprint.index(TextFingerprint.COMMENT, comment.id, text)
         logger.info("Added comment ID %s to the field %s from %s", comment.id, field.id, request.user.username)
-        return JsonResponse({
-            'success': True,
+        payload: Dict[str, Any] = {
             'comment_id': comment.id,
+            'parent_id': comment.parent_id,
+            'depth': comment.depth,
             'author': comment.author.username,
             'text': comment.text,
             'created_at': comment.created_at.strftime("%Y-%m-%d %H:%M")
-        })
+        }
+        transaction.on_commit(lambda: notifier.publish(field.id, 'comment', payload))
+        return JsonResponse({'success': True, **payload})
     except Exception as e:
         logger.error("Error when adding a comment: %s", str(e), exc_info=True)
         return JsonResponse({'error': 'Internal server error'}, status=500)
@@ -963,8 +1219,8 @@ def field_detail(request: HttpRequest, pk: int) -> HttpResponse:
     :rtype: :class:`django.http.HttpResponse`
     """
     field: Field = Field.objects.get(id=pk)
-    is_liked: bool = request.user.is_authenticated and request.user in field.likes.all()
-    is_favorited: bool = request.user.is_authenticated and request.user in field.favorites.all()
+    is_liked: bool = reactions.has_reacted('like', field.id, request.user.id)
+    is_favorited: bool = reactions.has_reacted('favorite', field.id, request.user.id)
     return render(request, 'your_app/field_detail.html', {
         'field': field,
         'is_liked': is_liked,
@@ -1033,15 +1289,21 @@ def block_content(request: HttpRequest, content_type: str, content_id: int) -> H
             method = getattr(item, config['block_method'])
             success_msg: str = f"{config['name'].capitalize()} успешно заблокирован"
             log_action: str = 'блокировка'
+            entry_action: str = ModerationLogEntry.BAN if content_type == 'user' else ModerationLogEntry.BLOCK
         elif action == 'unblock' and config['unblock_method']:
             method = getattr(item, config['unblock_method'])
             success_msg: str = f"{config['name'].capitalize()} разблокирован"
             log_action: str = 'разблокировка'
+            entry_action = ModerationLogEntry.UNBLOCK
         else:
             messages.error(request, "Действие недоступно для этого типа контента")
             return redirect('admin-panel')
 
-        if method():
+        with transaction.atomic():
+            done: bool = method()
+            if done:
+                ModerationLogEntry.record(request.user, entry_action, [(content_type, item.pk)])
+        if done:
             logger.info("Content %s ID %s %s moderated by %s", content_type, content_id, log_action,
                         request.user.username)
             messages.success(request, success_msg)
@@ -1098,7 +1360,11 @@ class BlockContentView(View):
             config: Dict[str, Any] = content_types[content_type]
             item: Any = config['model'].objects.get(pk=content_id)
             if hasattr(item, config['block_method']):
-                getattr(item, config['block_method'])()
+                with transaction.atomic():
+                    if getattr(item, config['block_method'])():
+                        ModerationLogEntry.record(
+                            request.user, ModerationLogEntry.BAN if content_type == 'user' else ModerationLogEntry.BLOCK,
+                            [(content_type, item.pk)])
                 messages.success(request, f"{config['name'].capitalize()} успешно заблокирована")
             else:
                 messages.error(request, "Не удалось заблокировать")
@@ -1145,7 +1411,9 @@ class UnblockContentView(View):
             config: Dict[str, Any] = content_types[content_type]
             item: Any = config['model'].objects.get(pk=content_id)
             if hasattr(item, config['unblock_method']):
-                getattr(item, config['unblock_method'])()
+                with transaction.atomic():
+                    if getattr(item, config['unblock_method'])():
+                        ModerationLogEntry.record(request.user, ModerationLogEntry.UNBLOCK, [(content_type, item.pk)])
                 messages.success(request, f"{config['name'].capitalize()} успешно разблокирована")
             else:
                 messages.error(request, "Не удалось разблокировать")
@@ -1160,32 +1428,23 @@ class ProfileFieldsAPIView(View):
     """
     def get(self, request: HttpRequest) -> JsonResponse:
         """
-        Возвращает список полей пользователя в зависимости от типа запроса.
+        Возвращает страницу списка полей пользователя в зависимости от типа запроса.
+
+        Параметр ``type`` выбирает список (``my``, ``liked`` или ``favorites``),
+        параметр ``cursor`` — страницу после предыдущей (см. :mod:`main_app.profile_fields`).
 
         :param request: HTTP-запрос.
         :type request: :class:`django.http.HttpRequest`
-        :returns: JSON-ответ с данными о полях.
+        :returns: JSON-ответ с данными о полях и курсором следующей страницы.
         :rtype: :class:`django.http.JsonResponse`
         """
-        field_type: str = request.GET.get('type', 'my')
-        if field_type == 'my':
-            fields: QuerySet[Field] = Field.objects.filter(user=request.user)
-        elif field_type == 'liked':
-            fields: QuerySet[Field] = request.user.liked_cards.all()
-        elif field_type == 'favorites':
-            fields: QuerySet[Field] = request.user.favorited_cards.all()
-        else:
-            fields: QuerySet[Field] = Field.objects.none()
-        fields_data: List[Dict[str, Any]] = []
-        for field in fields:
-            fields_data.append({
-                'id': field.id,
-                'title': field.title,
-                'description': field.description,
-                'created_at': field.created_at.strftime("%d.%m.%Y"),
-                'url': field.get_absolute_url()
-            })
-        return JsonResponse({'fields': fields_data})
+        field_type: str = request.GET.get('type', profile_fields.MY)
+        if not request.user.is_authenticated or field_type not in profile_fields.LIST_TYPES:
+            return JsonResponse({'fields': [], 'next_cursor': None})
+        try:
+            return JsonResponse(profile_fields.page(request.user.id, field_type, request.GET.get('cursor', '')))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
 
 
 @require_POST
@@ -1203,16 +1462,12 @@ def toggle_comment_like(request: HttpRequest, pk: int) -> JsonResponse:
     """
     try:
         comment: Comment = Comment.objects.get(id=pk)
-        if request.user in comment.likes.all():
-            comment.likes.remove(request.user)
-            is_liked: bool = False
-        else:
-            comment.likes.add(request.user)
-            is_liked: bool = True
+        is_liked, likes_count = comment.toggle_like(request.user)
+        notifier.publish(comment.field_id, 'comment_reactions', {'comment_id': comment.id, 'likes_count': likes_count})
         return JsonResponse({
             'success': True,
             'is_liked': is_liked,
-            'likes_count': comment.likes.count()
+            'likes_count': likes_count
         })
     except Comment.DoesNotExist:
         return JsonResponse({'error': 'Комментарий не найден'}, status=404)
@@ -1233,11 +1488,9 @@ def report_comment(request: HttpRequest, pk: int) -> JsonResponse:
     """
     try:
         comment: Comment = Comment.objects.get(id=pk)
-        if request.user not in comment.reports.all():
-            comment.reports.add(request.user)
         return JsonResponse({
             'success': True,
-            'reports_count': comment.reports.count()
+            'reports_count': comment.add_report(request.user)
         })
     except Comment.DoesNotExist:
         return JsonResponse({'error': 'Комментарий не найден'}, status=404)
@@ -1333,6 +1586,223 @@ def get_field_state(request: HttpRequest, pk: int) -> JsonResponse:
     except Field.DoesNotExist:
         return JsonResponse({'error': 'Field not found'}, status=404)
 
+def field_leaderboard(request: HttpRequest, pk: int) -> JsonResponse:
+    """
+    Возвращает таблицу лидеров поля: лучшие решения по числу шагов и длине программы.
+
+    Данные читаются из предвычисленной таблицы :class:`main_app.models.LeaderboardEntry`,
+    которая содержит не более ``LEADERBOARD_SIZE`` записей на поле.
+
+    :param request: HTTP-запрос.
+    :type request: :class:`django.http.HttpRequest`
+    :param pk: ID поля.
+    :type pk: int
+    :returns: JSON-ответ с рейтингом решений.
+    :rtype: :class:`django.http.JsonResponse`
+    """
+    if not Field.objects.filter(id=pk, is_blocked=False).exists():
+        return JsonResponse({'error': 'Field not found'}, status=404)
+    entries = (LeaderboardEntry.objects.filter(field_id=pk)
+               .values('user__username', 'steps', 'program_length', 'achieved_at'))
+    leaderboard: List[Dict[str, Any]] = []
+    for rank, entry in enumerate(entries, start=1):
+        leaderboard.append({
+            'rank': rank,
+            'username': entry['user__username'],
+            'steps': entry['steps'],
+            'program_length': entry['program_length'],
+            'achieved_at': entry['achieved_at'].strftime("%d.%m.%Y %H:%M"),
+        })
+    return JsonResponse({'leaderboard': leaderboard})
+
+def field_comments(request: HttpRequest, pk: int) -> JsonResponse:
+    """
+    Возвращает страницу веток комментариев поля вместе с ответами.
+
+    Параметр ``page`` — номер страницы веток (по ``COMMENT_THREADS_PER_PAGE``).
+    Комментарии идут в порядке отображения; ``depth`` задаёт отступ.
+
+    :param request: HTTP-запрос.
+    :type request: :class:`django.http.HttpRequest`
+    :param pk: ID поля.
+    :type pk: int
+    :returns: JSON-ответ с комментариями и данными пагинации.
+    :rtype: :class:`django.http.JsonResponse`
+    """
+    field: Field = get_object_or_404(Field, id=pk, is_blocked=False)
+    page, comments = Comment.threads(field, request.GET.get('page', 1))
+    likes: Dict[Tuple[int, str], int] = ReactionCount.counts(
+        Reaction.COMMENT, [comment.id for comment in comments], (Reaction.LIKE,))
+    return JsonResponse({
+        'comments': [{
+            'id': comment.id,
+            'parent_id': comment.parent_id,
+            'depth': comment.depth,
+            'author': comment.author.username,
+            'text': comment.text,
+            'created_at': comment.created_at.strftime("%Y-%m-%d %H:%M"),
+            'likes_count': likes.get((comment.id, Reaction.LIKE), 0),
+        } for comment in comments],
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'has_next': page.has_next(),
+    })
+
+async def field_events(request: HttpRequest, pk: int) -> HttpResponse:
+    """
+    SSE-поток событий поля: новые комментарии и изменения счётчиков реакций.
+
+    Асинхронное представление: ожидающее соединение не занимает поток
+    обработчика. События поступают из :data:`main_app.notifier.notifier`;
+    при отсутствии событий каждые ``SSE_KEEPALIVE_INTERVAL`` секунд
+    отправляется комментарий-пинг.
+
+    :param request: HTTP-запрос.
+    :type request: :class:`django.http.HttpRequest`
+    :param pk: ID поля.
+    :type pk: int
+    :returns: Потоковый ответ ``text/event-stream`` или ошибка 404.
+    :rtype: :class:`django.http.HttpResponse`
+    """
+    if not await Field.objects.filter(id=pk, is_blocked=False).aexists():
+        return JsonResponse({'error': 'Field not found'}, status=404)
+
+    async def stream() -> AsyncIterator[str]:
+        subscription: Subscription = notifier.subscribe(pk, settings.SSE_QUEUE_SIZE)
+        try:
+            yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(subscription.queue.get(), settings.SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'event: {event}\ndata: {json.dumps(data)}\n\n'
+        finally:
+            notifier.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def reaction_states(request: HttpRequest) -> JsonResponse:
+    """
+    Возвращает лайки и избранное текущего пользователя и счётчики для набора полей.
+
+    Списки полей рендерятся одинаково для всех посетителей, а отметки
+    подставляются на клиенте одним запросом. Параметр ``ids`` — ID полей
+    через запятую, не больше ``REACTION_STATE_MAX_IDS``.
+
+    :param request: HTTP-запрос.
+    :type request: :class:`django.http.HttpRequest`
+    :returns: JSON-ответ с состояниями по ID полей или ошибкой.
+    :rtype: :class:`django.http.JsonResponse`
+    """
+    try:
+        field_ids: List[int] = list(dict.fromkeys(
+            int(value) for value in request.GET.get('ids', '').split(',') if value.strip()))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid field ids'}, status=400)
+    if len(field_ids) > settings.REACTION_STATE_MAX_IDS:
+        return JsonResponse({'error': f'Too many field ids (max {settings.REACTION_STATE_MAX_IDS})'}, status=400)
+    user_id: Optional[int] = request.user.id if request.user.is_authenticated else None
+    states: Dict[int, Dict[str, Any]] = reactions.bulk_state(field_ids, user_id)
+    return JsonResponse({'fields': {str(field_id): state for field_id, state in states.items()}})
+
+@login_required
+def submission_replay(request: HttpRequest, pk: int) -> JsonResponse:
+    """
+    Возвращает состояния исполнителя из сохранённой трассы решения для перемотки.
+
+    Параметры запроса: ``step`` — номер первого шага, ``count`` — количество шагов
+    (не больше ``REPLAY_MAX_STEPS_PER_REQUEST``). Трасса распаковывается от ближайшей
+    контрольной точки, а не с нулевого шага.
+
+    :param request: HTTP-запрос.
+    :type request: :class:`django.http.HttpRequest`
+    :param pk: ID решения.
+    :type pk: int
+    :returns: JSON-ответ с состояниями или ошибкой.
+    :rtype: :class:`django.http.JsonResponse`
+    """
+    try:
+        replay: ExecutionReplay = ExecutionReplay.objects.select_related(
+            'submission__field').get(submission_id=pk)
+    except ExecutionReplay.DoesNotExist:
+        return JsonResponse({'error': 'Replay not found'}, status=404)
+    submission = replay.submission
+    if request.user.id not in (submission.user_id, submission.field.user_id) and not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    try:
+        step: int = int(request.GET.get('step', 0))
+        count: int = int(request.GET.get('count', 1))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid step or count'}, status=400)
+    count = max(1, min(count, getattr(settings, 'REPLAY_MAX_STEPS_PER_REQUEST', 500)))
+    try:
+        states: List[Dict[str, Any]] = replay.states(step, count)
+    except IndexError:
+        return JsonResponse({'error': 'Step out of range'}, status=400)
+    return JsonResponse({
+        'step': step,
+        'step_count': replay.step_count,
+        'states': states,
+    })
+
+@require_POST
+@login_required
+def program_diagnostics(request: HttpRequest) -> JsonResponse:
+    """
+    Проверяет синтаксис программы робота для редактора.
+
+    Тело запроса — JSON. Открытие документа: ``{"document": id, "text": ...}``.
+    Правка: ``{"document": id, "version": n, "edit": {"start": {"line", "column"},
+    "end": {"line", "column"}, "text": ...}}``. Разбор документа хранится в кэше,
+    поэтому правка заново разбирает только затронутые строки и наименьший
+    охватывающий блок (см. :mod:`main_app.diagnostics`). Если версия не совпадает
+    с кэшированной, возвращается 409 и клиент должен прислать текст целиком.
+    Правка за пределами документа и текст длиннее ``DIAGNOSTICS_MAX_PROGRAM_SIZE``
+    (в том числе после правки) отклоняются с кодом 400, кэш при этом не меняется.
+
+    :param request: HTTP-запрос.
+    :type request: :class:`django.http.HttpRequest`
+    :returns: JSON-ответ с версией документа и списком ошибок.
+    :rtype: :class:`django.http.JsonResponse`
+    """
+    try:
+        data: Dict[str, Any] = json.loads(request.body)
+        document_id: str = str(data['document'])[:64]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    key: str = f'diagnostics:{request.user.id}:{document_id}'
+    timeout: int = getattr(settings, 'DIAGNOSTICS_CACHE_TIMEOUT', 3600)
+    max_size: int = getattr(settings, 'DIAGNOSTICS_MAX_PROGRAM_SIZE', 100000)
+    if 'text' in data:
+        text = str(data['text'])
+        if len(text) > max_size:
+            return JsonResponse({'error': 'Program is too long'}, status=400)
+        document: Document = Document(text)
+    else:
+        document = cache.get(key)
+        if document is None or data.get('version') != document.version:
+            return JsonResponse({'error': 'Document version mismatch'}, status=409)
+        try:
+            edit: Dict[str, Any] = data['edit']
+            document.apply_edit(int(edit['start']['line']), int(edit['start']['column']),
+                                int(edit['end']['line']), int(edit['end']['column']), str(edit.get('text', '')))
+        except (KeyError, TypeError, ValueError) as e:
+            return JsonResponse({'error': f'Invalid edit: {e}'}, status=400)
+        if document.size > max_size:
+            return JsonResponse({'error': 'Program is too long'}, status=400)
+    cache.set(key, document, timeout)
+    return JsonResponse({
+        'version': document.version,
+        'diagnostics': document.diagnostics(),
+        'relexed_lines': document.last_relexed,
+        'checked_block': document.last_region,
+    })
+
 def custom_logout(request: HttpRequest) -> HttpResponse:
     """
     Выполняет выход пользователя из системы.
@@ -1386,6 +1856,7 @@ class FieldCreateView(LoginRequiredMixin, CreateView):
                 )
                 field.file = field_file
             field.save()
+            profile_fields.invalidate(self.request.user.id, profile_fields.MY)
             logger.info("A new ID field has been created %s by the user {self.request.user.username}", field.id)
             return super().form_valid(form)
         except Exception as e:
@@ -1408,6 +1879,26 @@ def download_file(request: HttpRequest, pk: int) -> HttpResponse:
     response['Content-Disposition'] = f'attachment; filename="{field_file.name}"'
     return response
 
+def avatar_thumbnail(request: HttpRequest, path: str) -> HttpResponse:
+    """
+    Отдаёт уменьшенную копию аватара с бессрочным кэшированием.
+
+    Имена копий содержат хеш содержимого и никогда не переиспользуются для
+    другого изображения, поэтому ответ помечается как ``immutable``.
+
+    :param request: HTTP-запрос.
+    :type request: :class:`django.http.HttpRequest`
+    :param path: Имя копии в папке копий.
+    :type path: str
+    :returns: Ответ с изображением.
+    :rtype: :class:`django.http.HttpResponse`
+    :raises Http404: Если копии нет.
+    """
+    response: HttpResponse = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, avatars.THUMBNAIL_DIR))
+    if response.status_code == 200:
+        patch_cache_control(response, public=True, max_age=settings.AVATAR_CACHE_MAX_AGE, immutable=True)
+    return response
+
 class DocsView(TemplateView):
     template_name = 'docs/build/index.html'
 
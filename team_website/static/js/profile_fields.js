@@ -12,7 +12,7 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
-    function loadFields(fieldType) {
+    function loadFields(fieldType, cursor) {
         let containerId;
         switch(fieldType) {
             case 'my':
@@ -31,24 +31,45 @@ document.addEventListener('DOMContentLoaded', function() {
         const container = document.getElementById(containerId);
         if (!container) return;
         
-        container.innerHTML = '<p>Загрузка...</p>';
+        const moreButton = container.querySelector('.fields-more-btn');
+        if (moreButton) {
+            moreButton.remove();
+        }
+        if (!cursor) {
+            container.innerHTML = '<p>Загрузка...</p>';
+        }
+        const params = new URLSearchParams({type: fieldType});
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
         
-        fetch(`/api/profile/fields/?type=${fieldType}`)
+        fetch(`/api/profile/fields/?${params}`)
             .then(response => {
                 if (!response.ok) throw new Error('Ошибка загрузки');
                 return response.json();
             })
-            .then(data => renderFields(container, data.fields))
+            .then(data => {
+                renderFields(container, data.fields, Boolean(cursor));
+                if (data.next_cursor) {
+                    const button = document.createElement('button');
+                    button.className = 'fields-more-btn';
+                    button.textContent = 'Показать ещё';
+                    button.addEventListener('click', () => loadFields(fieldType, data.next_cursor));
+                    container.appendChild(button);
+                }
+            })
             .catch(error => {
                 console.error('Ошибка:', error);
                 container.innerHTML = '<div class="empty-tab-message"><p>Ошибка загрузки данных</p></div>';
             });
     }
 
-    function renderFields(container, fields) {
-        container.innerHTML = '';
+    function renderFields(container, fields, append) {
+        if (!append) {
+            container.innerHTML = '';
+        }
         
-        if (!fields || fields.length === 0) {
+        if (!append && (!fields || fields.length === 0)) {
             container.innerHTML = '<div class="empty-tab-message"><p>Нет карт для отображения</p></div>';
             return;
         }
@@ -60,12 +81,18 @@ document.addEventListener('DOMContentLoaded', function() {
                 <h3>${field.title}</h3>
                 <p>${field.description || 'Нет описания'}</p>
                 <small>Создано: ${field.created_at}</small>
+                <small class="hidden" data-reaction-field="${field.id}">
+                    ❤️ <span class="reaction-likes"></span> ⭐ <span class="reaction-favorites"></span>
+                </small>
             `;
             fieldElement.addEventListener('click', () => {
-                window.location.href = `/cards/${field.id}/`;
+                window.location.href = field.url;
             });
             container.appendChild(fieldElement);
         });
+        if (typeof loadReactionBadges === 'function') {
+            loadReactionBadges(container);
+        }
     }
 
     document.querySelectorAll('.fields-nav-btn').forEach(button => {
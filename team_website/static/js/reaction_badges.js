@@ -0,0 +1,36 @@
+// Подставляет лайки и избранное текущего пользователя в списки карт.
+// Списки рендерятся одинаково для всех посетителей, а отметки
+// запрашиваются одним запросом на каждые REACTION_BATCH карт.
+const REACTION_BATCH = 100;
+
+function loadReactionBadges(root) {
+    const badges = Array.from((root || document).querySelectorAll('[data-reaction-field]'));
+    const ids = Array.from(new Set(badges.map(badge => badge.getAttribute('data-reaction-field'))));
+
+    for (let start = 0; start < ids.length; start += REACTION_BATCH) {
+        const batch = ids.slice(start, start + REACTION_BATCH);
+        fetch(`/api/reactions/?ids=${batch.join(',')}`)
+            .then(response => {
+                if (!response.ok) throw new Error('Ошибка загрузки реакций');
+                return response.json();
+            })
+            .then(data => {
+                badges.forEach(badge => {
+                    const state = data.fields[badge.getAttribute('data-reaction-field')];
+                    if (!state) return;
+                    const likes = badge.querySelector('.reaction-likes');
+                    const favorites = badge.querySelector('.reaction-favorites');
+                    likes.textContent = state.likes_count;
+                    favorites.textContent = state.favorites_count;
+                    likes.classList.toggle('text-red-600', state.is_liked);
+                    favorites.classList.toggle('text-yellow-600', state.is_favorited);
+                    badge.classList.remove('hidden');
+                });
+            })
+            .catch(error => console.error('Ошибка:', error));
+    }
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    loadReactionBadges(document);
+});